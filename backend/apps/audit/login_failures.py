@@ -0,0 +1,191 @@
+"""
+Agregación de logins fallidos antes de escribirlos en la bitácora.
+
+Un ataque de credential stuffing generaba un INSERT de `AuditLog` por
+intento, en el camino crítico del login y sumado a las escrituras de Axes.
+`LoginFailureCollector` agrupa en memoria los fallos repetidos por
+``(username, IP)``: el grupo sigue abierto mientras lleguen fallos a menos de
+``AUDIT_LOGIN_FAILURE_WINDOW`` segundos del anterior (ventana deslizante) y
+se cierra al quedar en silencio o al cumplir ``AUDIT_LOGIN_FAILURE_MAX_SPAN``
+(para que un ataque sostenido también quede registrado periódicamente).
+
+Cada grupo cerrado se escribe como **una** entrada ``login_failed`` con
+``metadata.count`` y ``first_at`` / ``last_at``. El volcado lo hace un hilo
+temporizador del proceso a través de `writer.dispatch` (respeta
+``AUDIT_WRITE_MODE``), de modo que el request de login sólo toca memoria.
+
+El estado es por proceso: con N workers un ataque produce como mucho N
+entradas por ventana. Al terminar el intérprete (`atexit`) se vuelcan todos los
+grupos pendientes; sólo si el proceso muere de golpe se pierden como mucho los
+de la última ventana. ``AUDIT_LOGIN_FAILURE_WINDOW=0`` vuelve a
+escribir un evento por intento.
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection
+
+from . import writer
+from .models import AuditActionChoices, AuditLog
+
+logger = logging.getLogger(__name__)
+
+MAX_PENDING = 10_000
+
+
+@dataclass
+class _FailureGroup:
+    username: str | None
+    ip: str | None
+    user_agent: str
+    first: float
+    last: float
+    count: int = 1
+
+    def to_entry(self) -> AuditLog:
+        first = datetime.fromtimestamp(self.first, tz=dt_timezone.utc)
+        last = datetime.fromtimestamp(self.last, tz=dt_timezone.utc)
+        if self.count == 1:
+            description = f'Intento fallido de login: {self.username}'
+        else:
+            description = f'{self.count} intentos fallidos de login: {self.username}'
+        return AuditLog(
+            action=AuditActionChoices.LOGIN_FAILED,
+            description=description,
+            metadata={
+                'username': self.username,
+                'count': self.count,
+                'first_at': first.isoformat(),
+                'last_at': last.isoformat(),
+            },
+            ip_address=self.ip,
+            user_agent=self.user_agent,
+            created_at=first,
+        )
+
+
+class LoginFailureCollector:
+    """Agrupa fallos de login por ``(username, IP)`` y los vuelca en segundo plano."""
+
+    def __init__(self, *, window: float | None = None, max_span: float | None = None,
+                 clock=time.time, autostart: bool = True):
+        self._window = window
+        self._max_span = max_span
+        self._clock = clock
+        self._autostart = autostart
+        self._lock = threading.Lock()
+        self._open: dict[tuple, _FailureGroup] = {}
+        self._closed: list[_FailureGroup] = []
+        self._timer: threading.Timer | None = None
+
+    @property
+    def window(self) -> float:
+        if self._window is not None:
+            return self._window
+        return getattr(settings, 'AUDIT_LOGIN_FAILURE_WINDOW', 60)
+
+    @property
+    def max_span(self) -> float:
+        if self._max_span is not None:
+            return self._max_span
+        return getattr(settings, 'AUDIT_LOGIN_FAILURE_MAX_SPAN', 600)
+
+    def _expired(self, group: _FailureGroup, now: float) -> bool:
+        return now - group.last >= self.window or now - group.first >= self.max_span
+
+    def record(self, username: str | None, ip: str | None, user_agent: str = '') -> None:
+        """Cuenta un fallo; no toca la BD (salvo con la agregación desactivada)."""
+        if self.window <= 0:
+            writer.enqueue([_FailureGroup(username, ip, user_agent, self._clock(), self._clock()).to_entry()])
+            return
+        key = ((username or '').lower(), ip or '')
+        with self._lock:
+            now = self._clock()
+            group = self._open.get(key)
+            if group is not None and self._expired(group, now):
+                self._closed.append(self._open.pop(key))
+                group = None
+            if group is None:
+                self._open[key] = _FailureGroup(username, ip, user_agent, first=now, last=now)
+            else:
+                group.count += 1
+                group.last = now
+                group.user_agent = user_agent
+            overflow = len(self._open) >= MAX_PENDING
+            if overflow:
+                # Demasiadas combinaciones distintas: cerrar todo y volcar ya
+                self._closed.extend(self._open.values())
+                self._open.clear()
+        if self._autostart:
+            self._schedule(0 if overflow else self.window)
+
+    def collect(self, *, force: bool = False) -> list[_FailureGroup]:
+        """Retira los grupos cerrados (todos con ``force=True``)."""
+        with self._lock:
+            now = self._clock()
+            for key in [k for k, group in self._open.items() if force or self._expired(group, now)]:
+                self._closed.append(self._open.pop(key))
+            closed, self._closed = self._closed, []
+        return closed
+
+    def flush(self, *, force: bool = False) -> int:
+        """Escribe los grupos cerrados. Retorna cuántas entradas generó."""
+        entries = [group.to_entry() for group in self.collect(force=force)]
+        writer.dispatch(entries)
+        return len(entries)
+
+    def close(self) -> None:
+        """Cancela el temporizador y escribe todo lo pendiente (al terminar el proceso)."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not self.pending:
+            return
+        try:
+            self.flush(force=True)
+        except Exception as exc:  # noqa: BLE001
+            logger.exception('Error volcando logins fallidos al cerrar: %s', exc)
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._open) + len(self._closed)
+
+    # --- temporizador ---------------------------------------------------
+
+    def _schedule(self, delay: float) -> None:
+        with self._lock:
+            if self._timer is not None and delay > 0:
+                return
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(delay, self._tick)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _tick(self) -> None:
+        with self._lock:
+            self._timer = None
+        try:
+            self.flush()
+        except Exception as exc:  # noqa: BLE001
+            logger.exception('Error volcando logins fallidos agregados: %s', exc)
+        finally:
+            # El hilo del temporizador abre su propia conexión
+            connection.close()
+        if self.pending:
+            self._schedule(self.window)
+
+
+collector = LoginFailureCollector()
+# El temporizador es un hilo daemon: sin esto, lo acumulado se perdería al
+# apagar el worker.
+atexit.register(collector.close)
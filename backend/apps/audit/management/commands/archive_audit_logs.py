@@ -0,0 +1,77 @@
+"""Archiva y elimina los meses de bitácora fuera de la ventana de retención.
+
+Por defecto usa `SystemSettings.audit_retention_days` y
+`audit_archive_format`, y escribe en ``settings.AUDIT_ARCHIVE_DIR`` un archivo
+por mes (``audit-YYYY-MM.jsonl.gz`` o ``.parquet``) antes de eliminar la
+tabla del mes. Antes de archivar crea las particiones futuras (PostgreSQL) o
+rota las entradas vencidas a tablas mensuales (SQLite; ver
+`partitions.hot_window_days`), igual que la tarea ``audit.maintain_storage``.
+
+Ejemplos:
+    python manage.py archive_audit_logs --dry-run
+    python manage.py archive_audit_logs --retention-days 365
+    python manage.py archive_audit_logs --format parquet --output-dir /srv/archivo
+"""
+from __future__ import annotations
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.audit.partitions import (
+    ARCHIVE_FORMATS,
+    apply_retention,
+    ensure_partitions,
+    hot_window_days,
+    rotate_hot_rows,
+)
+from apps.settings_runtime.models import SystemSettings
+
+
+class Command(BaseCommand):
+    help = 'Archiva (JSONL gzip / Parquet) y elimina los meses de bitácora vencidos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, default=None,
+                            help='Días a conservar (por defecto, SystemSettings).')
+        parser.add_argument('--format', choices=ARCHIVE_FORMATS, default=None,
+                            help='Formato del archivo (por defecto, SystemSettings).')
+        parser.add_argument('--output-dir', default=None,
+                            help='Directorio destino (por defecto, AUDIT_ARCHIVE_DIR).')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Solo listar los meses que se archivarían.')
+
+    def handle(self, *args, **opts):
+        system = SystemSettings.load()
+        retention_days = opts['retention_days']
+        if retention_days is None:
+            retention_days = system.audit_retention_days
+        if not retention_days:
+            self.stdout.write('Retención deshabilitada (0 días): no hay nada que archivar.')
+            return
+
+        if not opts['dry_run']:
+            hot_days = hot_window_days(system.audit_hot_days, retention_days)
+            created = ensure_partitions()
+            rotated = rotate_hot_rows(hot_days)
+            if created:
+                self.stdout.write(f'Particiones creadas: {", ".join(created)}')
+            if rotated:
+                self.stdout.write(f'Entradas movidas a tablas mensuales: {rotated}')
+
+        try:
+            results = apply_retention(
+                retention_days=retention_days,
+                directory=opts['output_dir'],
+                fmt=opts['format'],
+                dry_run=opts['dry_run'],
+            )
+        except ImproperlyConfigured as exc:
+            raise CommandError(str(exc))
+
+        for result in results:
+            if opts['dry_run']:
+                self.stdout.write(f'  {result["partition"]} ({result["table"]})')
+            else:
+                self.stdout.write(f'  {result["partition"]}: {result["rows"]} entradas → {result["file"]}')
+        verb = 'a archivar' if opts['dry_run'] else 'archivados'
+        self.stdout.write(self.style.SUCCESS(f'Meses {verb}: {len(results)}'))
@@ -0,0 +1,27 @@
+"""Vuelca a la BD las entradas de auditoría acumuladas en el spool.
+
+Sólo aplica con ``AUDIT_WRITE_MODE=spool``. Equivale a la tarea Celery
+`audit.drain_spool`; útil para instalaciones sin Celery beat (programarlo en
+cron cada minuto).
+
+Ejemplos:
+    python manage.py drain_audit_spool
+    python manage.py drain_audit_spool --batch-size 1000
+"""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from apps.audit.writer import drain_spool
+
+
+class Command(BaseCommand):
+    help = 'Escribe en la bitácora las entradas pendientes del spool de auditoría.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Entradas por bulk_create.')
+
+    def handle(self, *args, **opts):
+        total = drain_spool(batch_size=opts['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Entradas de auditoría volcadas: {total}'))
@@ -0,0 +1,52 @@
+"""Reconstruye los resúmenes horarios de la bitácora (`AuditRollup`).
+
+La tarea ``audit.refresh_rollups`` sólo recalcula las últimas horas; este
+comando sirve para el llenado inicial o para corregir un rango histórico.
+Procesa el rango por días para no agrupar toda la bitácora de una vez.
+
+Ejemplos:
+    python manage.py rebuild_audit_rollups --since 2025-01-01
+    python manage.py rebuild_audit_rollups --since 2026-03-01 --until 2026-04-01
+"""
+from __future__ import annotations
+
+from datetime import datetime, time, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from apps.audit.models import AuditLog
+from apps.audit.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los resúmenes horarios de auditoría en un rango de fechas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--since', help='Fecha inicial YYYY-MM-DD (por defecto, la entrada más antigua).')
+        parser.add_argument('--until', help='Fecha final exclusiva YYYY-MM-DD (por defecto, ahora).')
+
+    def _parse(self, value, label):
+        day = parse_date(value) if value else None
+        if value and day is None:
+            raise CommandError(f'{label} debe tener formato YYYY-MM-DD.')
+        return timezone.make_aware(datetime.combine(day, time.min)) if day else None
+
+    def handle(self, *args, **opts):
+        end = self._parse(opts['until'], '--until') or timezone.now()
+        start = self._parse(opts['since'], '--since')
+        if start is None:
+            start = AuditLog.objects.aggregate(oldest=Min('created_at'))['oldest']
+            if start is None:
+                self.stdout.write('La bitácora está vacía.')
+                return
+
+        total = 0
+        cursor = start
+        while cursor < end:
+            step_end = min(cursor + timedelta(days=1), end)
+            total += rebuild_rollups(cursor, step_end)
+            cursor = step_end
+        self.stdout.write(self.style.SUCCESS(f'Filas de resumen generadas: {total}'))
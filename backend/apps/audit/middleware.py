@@ -1,17 +1,41 @@
 """
-Middleware que almacena el contexto de request (usuario, IP, user-agent) en
-un threading local para que los signals/handlers de `audit.services.log_event`
-puedan leerlo sin recibir `request` explícitamente.
+Middleware que expone el contexto del request (usuario, IP, user-agent) a
+los signals/handlers de `audit.services.log_event` sin recibir `request`
+explícitamente.
+
+El contexto vive en una `ContextVar`: bajo ASGI cada request (cada tarea de
+asyncio) tiene el suyo aunque compartan hilo, y `sync_to_async` lo propaga a
+las vistas síncronas. El middleware funciona en modo síncrono (WSGI) y
+asíncrono (ASGI) sin adaptadores.
+
+El usuario se resuelve al leer el contexto, no al entrar el request: así se
+ve el usuario autenticado por DRF (JWT), que se asigna dentro de la vista.
+
+También abre y vacía el buffer de `audit.writer`: los eventos registrados
+fuera de una transacción se escriben juntos al terminar el request.
 """
-import threading
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 
+from . import writer
 
-_local = threading.local()
+_current_request: ContextVar = ContextVar('audit_current_request', default=None)
 
 
 def get_current_request_context() -> dict:
     """Retorna el contexto actual del request; vacío si fuera de una request."""
-    return getattr(_local, 'context', {}) or {}
+    request = _current_request.get()
+    if request is None:
+        return {}
+    user = getattr(request, 'user', None)
+    return {
+        'user': user if (user is not None and getattr(user, 'is_authenticated', False)) else None,
+        'ip': _extract_ip(request),
+        'user_agent': request.META.get('HTTP_USER_AGENT', '')[:500],
+        'path': request.path,
+        'method': request.method,
+    }
 
 
 def _extract_ip(request) -> str | None:
@@ -23,19 +47,31 @@ def _extract_ip(request) -> str | None:
 
 
 class AuditContextMiddleware:
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        user = getattr(request, 'user', None)
-        _local.context = {
-            'user': user if (user is not None and getattr(user, 'is_authenticated', False)) else None,
-            'ip': _extract_ip(request),
-            'user_agent': request.META.get('HTTP_USER_AGENT', '')[:500],
-            'path': request.path,
-            'method': request.method,
-        }
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = _current_request.set(request)
+        writer.begin_request()
         try:
             return self.get_response(request)
         finally:
-            _local.context = {}
+            _current_request.reset(token)
+            writer.end_request()
+
+    async def __acall__(self, request):
+        token = _current_request.set(request)
+        writer.begin_request()
+        try:
+            return await self.get_response(request)
+        finally:
+            _current_request.reset(token)
+            # El volcado toca la BD: fuera del event loop
+            await sync_to_async(writer.end_request)()
@@ -0,0 +1,103 @@
+"""
+Convierte `audit_auditlog` en una tabla particionada por mes (sólo PostgreSQL).
+
+PostgreSQL no permite particionar una tabla existente: se renombra, se crea la
+tabla particionada con las mismas columnas, índices y FK, se copian las filas
+y se elimina la anterior. La clave primaria pasa a ser ``(id, created_at)``
+(la clave de partición debe formar parte de toda restricción única); ``id``
+sigue siendo único porque lo asigna una secuencia.
+
+En otros motores no hace nada: ver la rotación en `apps.audit.partitions`.
+"""
+from datetime import datetime, timezone
+
+from django.db import migrations
+
+TABLE = 'audit_auditlog'
+LEGACY = 'audit_auditlog_legacy'
+SEQUENCE = 'audit_auditlog_id_seq'
+MONTHS_AHEAD = 3
+
+
+def _add_months(value, months):
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_audit_log(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT indexname, indexdef FROM pg_indexes '
+            'WHERE schemaname = current_schema() AND tablename = %s',
+            [TABLE],
+        )
+        indexes = cursor.fetchall()
+        cursor.execute(
+            "SELECT conname FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'p'",
+            [TABLE],
+        )
+        pk_name = cursor.fetchone()[0]
+        cursor.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [TABLE],
+        )
+        foreign_keys = cursor.fetchall()
+
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {LEGACY}')
+        for name, _definition in indexes:
+            cursor.execute(f'ALTER INDEX {name} RENAME TO {name[:55]}_legacy')
+        cursor.execute(f'SELECT COALESCE(MAX(id), 0), MIN(created_at) FROM {LEGACY}')
+        max_id, oldest = cursor.fetchone()
+        cursor.execute(f'ALTER TABLE {LEGACY} ALTER COLUMN id DROP IDENTITY IF EXISTS')
+        cursor.execute(f'ALTER TABLE {LEGACY} ALTER COLUMN id DROP DEFAULT')
+        cursor.execute(f'DROP SEQUENCE IF EXISTS {SEQUENCE}')
+
+        cursor.execute(f'CREATE SEQUENCE {SEQUENCE} START WITH {max_id + 1}')
+        cursor.execute(
+            f'CREATE TABLE {TABLE} (LIKE {LEGACY} INCLUDING DEFAULTS, '
+            f'CONSTRAINT {pk_name} PRIMARY KEY (id, created_at)) '
+            f'PARTITION BY RANGE (created_at)'
+        )
+        cursor.execute(f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{SEQUENCE}')")
+        cursor.execute(f'ALTER SEQUENCE {SEQUENCE} OWNED BY {TABLE}.id')
+
+        cursor.execute(f'CREATE TABLE {TABLE}_default PARTITION OF {TABLE} DEFAULT')
+        now = datetime.now(timezone.utc)
+        start = (oldest or now).astimezone(timezone.utc).replace(
+            day=1, hour=0, minute=0, second=0, microsecond=0,
+        )
+        last = _add_months(now.replace(day=1, hour=0, minute=0, second=0, microsecond=0), MONTHS_AHEAD)
+        while start <= last:
+            end = _add_months(start, 1)
+            cursor.execute(
+                f'CREATE TABLE {TABLE}_p{start:%Y_%m} PARTITION OF {TABLE} '
+                f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+            )
+            start = end
+
+        # Las definiciones capturadas apuntan a `audit_auditlog`, que ahora es
+        # la tabla particionada: se recrean con el mismo nombre.
+        for name, definition in indexes:
+            if name != pk_name:
+                cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}')
+
+        cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {LEGACY}')
+        cursor.execute(f'DROP TABLE {LEGACY}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0002_alter_auditlog_created_at'),
+    ]
+
+    operations = [
+        # Sin reversa: la tabla particionada es compatible con el modelo.
+        migrations.RunPython(partition_audit_log, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+"""
+Normaliza `resource_type` a minúsculas (``app_label.modelname``).
+
+`log_event` ya escribe la forma canónica; esta migración convierte las filas
+anteriores para que `resource_history` pueda filtrar por igualdad exacta.
+"""
+from django.db import migrations
+from django.db.models import Q
+from django.db.models.functions import Lower
+
+
+def normalize_resource_type(apps, schema_editor):
+    AuditLog = apps.get_model('audit', 'AuditLog')
+    AuditLog.objects.filter(~Q(resource_type=Lower('resource_type'))).update(
+        resource_type=Lower('resource_type'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0003_partition_auditlog'),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_resource_type, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0004_normalize_resource_type'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField(verbose_name='Hora (inicio, UTC)')),
+                ('action', models.CharField(choices=[('create', 'Creación'), ('update', 'Actualización'), ('delete', 'Eliminación'), ('state_change', 'Cambio de estado'), ('login', 'Inicio de sesión'), ('login_failed', 'Login fallido'), ('logout', 'Cierre de sesión'), ('password_reset', 'Restablecimiento de contraseña'), ('permission_change', 'Cambio de permisos'), ('user_activation', 'Activación de usuario'), ('user_deactivation', 'Desactivación de usuario'), ('approve', 'Aprobación'), ('reject', 'Rechazo'), ('cancel', 'Cancelación'), ('check_in', 'Check-in'), ('check_out', 'Check-out'), ('export', 'Exportación'), ('document_generated', 'Documento generado'), ('other', 'Otro')], max_length=32, verbose_name='Acción')),
+                ('resource_type', models.CharField(blank=True, max_length=100, verbose_name='Tipo de recurso')),
+                ('user_type', models.CharField(blank=True, help_text='Vacío para eventos anónimos o del sistema', max_length=20, verbose_name='Tipo de usuario')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Eventos')),
+            ],
+            options={
+                'verbose_name': 'Resumen de auditoría',
+                'verbose_name_plural': 'Resúmenes de auditoría',
+                'ordering': ['bucket'],
+                'indexes': [models.Index(fields=['action', 'bucket'], name='audit_audit_action_336a6c_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='auditrollup',
+            constraint=models.UniqueConstraint(fields=('bucket', 'action', 'resource_type', 'user_type'), name='audit_rollup_unique_key'),
+        ),
+    ]
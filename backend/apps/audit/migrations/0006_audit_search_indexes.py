@@ -0,0 +1,47 @@
+"""
+Índices de búsqueda de texto libre de la bitácora (ver `apps.audit.search`).
+
+PostgreSQL: GIN sobre el ``tsvector`` de descripción + metadatos y GIN
+``jsonb_path_ops`` sobre `metadata`. Sobre la tabla particionada se crean en
+cada partición (también en las que se adjunten después).
+
+SQLite: tabla FTS5 con contenido externo y triggers de sincronización. Si
+SQLite no trae FTS5 no se crea nada y la búsqueda usa ``icontains``.
+"""
+from django.db import migrations
+
+from apps.audit import search
+
+
+def create_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            for statement in search.POSTGRES_INDEXES:
+                cursor.execute(statement)
+    elif connection.vendor == 'sqlite':
+        search.install_sqlite_fts(connection)
+
+
+def drop_search_indexes(apps, schema_editor):
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('DROP INDEX IF EXISTS audit_auditlog_search_gin')
+            cursor.execute('DROP INDEX IF EXISTS audit_auditlog_metadata_gin')
+        elif connection.vendor == 'sqlite':
+            for suffix in ('ai', 'ad', 'au'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {search.FTS_TABLE}_{suffix}')
+            cursor.execute(f'DROP TABLE IF EXISTS {search.FTS_TABLE}')
+    search._fts_available.pop(connection.alias, None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0005_auditrollup'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
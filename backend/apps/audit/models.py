@@ -6,6 +6,7 @@ login/logout, modificaciones administrativas, accesos a recursos sensibles).
 """
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
@@ -92,8 +93,11 @@ class AuditLog(models.Model):
         verbose_name=_('User-Agent'),
     )
 
+    # `default` en lugar de `auto_now_add`: las entradas se escriben en
+    # diferido (ver `audit.writer`) y deben conservar la hora del evento.
     created_at = models.DateTimeField(
-        auto_now_add=True,
+        default=timezone.now,
+        editable=False,
         db_index=True,
         verbose_name=_('Fecha'),
     )
@@ -112,3 +116,42 @@ class AuditLog(models.Model):
     def __str__(self) -> str:
         who = getattr(self.user, 'username', None) or 'sistema'
         return f"[{self.created_at:%Y-%m-%d %H:%M}] {who} · {self.get_action_display()} · {self.resource_type}:{self.resource_id}"
+
+
+class AuditRollup(models.Model):
+    """
+    Conteo de eventos por hora, acción, tipo de recurso y tipo de usuario.
+
+    Lo mantiene `audit.rollups` a partir de `AuditLog`; los tableros leen las
+    series de aquí sin recorrer la bitácora. Sobrevive a la retención de
+    `AuditLog` (ver `audit.partitions`).
+    """
+
+    bucket = models.DateTimeField(verbose_name=_('Hora (inicio, UTC)'))
+    action = models.CharField(max_length=32, choices=AuditActionChoices.choices, verbose_name=_('Acción'))
+    resource_type = models.CharField(max_length=100, blank=True, verbose_name=_('Tipo de recurso'))
+    user_type = models.CharField(
+        max_length=20,
+        blank=True,
+        verbose_name=_('Tipo de usuario'),
+        help_text=_('Vacío para eventos anónimos o del sistema'),
+    )
+    count = models.PositiveIntegerField(default=0, verbose_name=_('Eventos'))
+
+    class Meta:
+        app_label = 'audit'
+        verbose_name = _('Resumen de auditoría')
+        verbose_name_plural = _('Resúmenes de auditoría')
+        ordering = ['bucket']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['bucket', 'action', 'resource_type', 'user_type'],
+                name='audit_rollup_unique_key',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['action', 'bucket']),
+        ]
+
+    def __str__(self) -> str:
+        return f'{self.bucket:%Y-%m-%d %H:00} · {self.action} · {self.resource_type} · {self.count}'
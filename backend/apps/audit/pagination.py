@@ -0,0 +1,164 @@
+"""
+Paginación por cursor (keyset) para la bitácora de auditoría.
+
+`PageNumberPagination` ejecutaba un ``COUNT(*)`` y un ``OFFSET`` sobre toda la
+tabla filtrada en cada página: la página 10 000 leía y descartaba 500 000
+filas. `AuditLogCursorPagination` ordena por ``(-created_at, -id)`` y cada
+cursor guarda la posición de la última fila vista, de modo que cualquier página
+es un rango del índice de ``created_at`` y cuesta lo mismo que la primera.
+
+Query params:
+
+- ``cursor`` — valor opaco tomado de ``next`` / ``previous``.
+- ``page_size`` — entradas por página (máximo ``max_page_size``).
+- ``count=approx`` — agrega ``count`` estimado por el planificador de
+  PostgreSQL (``EXPLAIN``), sin recorrer la tabla. En otros motores se cuenta
+  de forma exacta; ``count_is_estimate`` indica cuál se usó.
+"""
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+
+from django.db import connections
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def estimated_count(queryset) -> tuple[int, bool]:
+    """``(filas, es_estimado)`` del queryset.
+
+    En PostgreSQL usa la estimación del plan (``EXPLAIN``), que sale de las
+    estadísticas de ``ANALYZE`` y no lee la tabla.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        plan = json.loads(queryset.order_by().explain(format='json'))
+        return int(plan[0]['Plan']['Plan Rows']), True
+    return queryset.count(), False
+
+
+class AuditLogCursorPagination(BasePagination):
+    """Paginación keyset sobre ``(created_at, id)`` en orden descendente."""
+
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = _('Cursor inválido.')
+
+    def get_page_size(self, request) -> int:
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    # --- cursor ---------------------------------------------------------
+
+    def encode_cursor(self, row, reverse: bool) -> str:
+        raw = json.dumps([row.created_at.isoformat(), row.pk, int(reverse)])
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created_at, pk, reverse = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            created_at = parse_datetime(created_at)
+            if created_at is None:
+                raise ValueError(encoded)
+            return created_at, int(pk), bool(reverse)
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+
+    # --- paginación -------------------------------------------------------
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.queryset = queryset
+        size = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+        reverse = bool(cursor and cursor[2])
+
+        if cursor is None:
+            page = queryset.order_by('-created_at', '-id')
+        elif reverse:
+            created_at, pk, _ = cursor
+            # `gte` + exclusión de empates: el rango usa el índice de created_at
+            page = (
+                queryset.filter(created_at__gte=created_at)
+                .exclude(created_at=created_at, id__lte=pk)
+                .order_by('created_at', 'id')
+            )
+        else:
+            created_at, pk, _ = cursor
+            page = (
+                queryset.filter(created_at__lte=created_at)
+                .exclude(created_at=created_at, id__gte=pk)
+                .order_by('-created_at', '-id')
+            )
+
+        rows = list(page[:size + 1])
+        has_more = len(rows) > size
+        rows = rows[:size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = rows
+        return rows
+
+    def _link(self, cursor: str | None) -> str | None:
+        url = self.request.build_absolute_uri()
+        if cursor is None:
+            return remove_query_param(url, self.cursor_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.encode_cursor(self.page[-1], reverse=False))
+
+    def get_previous_link(self) -> str | None:
+        if not self.has_previous or not self.page:
+            return None
+        return self._link(self.encode_cursor(self.page[0], reverse=True))
+
+    def get_paginated_response(self, data):
+        payload = {'next': self.get_next_link(), 'previous': self.get_previous_link()}
+        if self.request.query_params.get(self.count_query_param) == 'approx':
+            payload['count'], payload['count_is_estimate'] = estimated_count(self.queryset)
+        payload['results'] = data
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'count': {'type': 'integer', 'description': 'Sólo con ?count=approx'},
+                'count_is_estimate': {'type': 'boolean'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {'name': self.cursor_query_param, 'required': False, 'in': 'query',
+             'schema': {'type': 'string'}, 'description': 'Cursor de paginación'},
+            {'name': self.page_size_query_param, 'required': False, 'in': 'query',
+             'schema': {'type': 'integer'}, 'description': 'Entradas por página'},
+            {'name': self.count_query_param, 'required': False, 'in': 'query',
+             'schema': {'type': 'string', 'enum': ['approx']},
+             'description': 'Incluir conteo estimado'},
+        ]
@@ -0,0 +1,362 @@
+"""
+Almacenamiento por meses de la bitácora de auditoría, retención y archivo.
+
+`AuditLog` crece sin límite y la consulta de admins la recorría completa. La
+bitácora se organiza en unidades mensuales (meses UTC), una tabla por mes
+llamada ``audit_auditlog_pYYYY_MM``:
+
+- PostgreSQL: ``audit_auditlog`` es una tabla particionada por rango de
+  ``created_at`` (migración 0003). Las consultas con filtro de fecha sólo
+  recorren las particiones del rango (partition pruning) y las entradas
+  fuera de las particiones existentes caen en ``audit_auditlog_default``.
+  `ensure_partitions()` crea los meses siguientes por adelantado.
+- SQLite (u otros motores): `rotate_hot_rows()` mueve entradas antiguas a
+  tablas mensuales fuera del ORM, donde el admin, la API (listado, búsqueda,
+  ``resource_history``) y la exportación ya no las ven. Por eso, por defecto,
+  sólo salen de ``audit_auditlog`` al vencer ``audit_retention_days`` (para
+  archivarse y eliminarse); con ``AUDIT_SQLITE_ROTATION=True`` salen a los
+  ``SystemSettings.audit_hot_days`` días (ver `hot_window_days()`).
+
+En ambos casos `apply_retention()` archiva (JSONL gzip o Parquet) y elimina
+los meses completos anteriores a ``SystemSettings.audit_retention_days``.
+Lo ejecutan la tarea ``audit.maintain_storage`` (beat, diaria) y
+``manage.py archive_audit_logs``.
+
+- `hot_window_days(hot_days, retention_days)` — días que quedan en la tabla
+  principal antes de `rotate_hot_rows()`.
+- `list_partitions()` / `expired_partitions(retention_days)`.
+- `archive_partition(partition, directory, fmt)` — escribe el archivo y
+  retorna ``(path, filas)``.
+- `drop_partition(partition)`.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .models import AuditLog
+from .writer import entry_to_row
+
+PARENT_TABLE = AuditLog._meta.db_table
+DEFAULT_PARTITION = f'{PARENT_TABLE}_default'
+PARTITION_PREFIX = f'{PARENT_TABLE}_p'
+PARTITION_RE = re.compile(rf'^{PARTITION_PREFIX}(\d{{4}})_(\d{{2}})$')
+
+ARCHIVE_FORMATS = ('jsonl', 'parquet')
+MONTHS_AHEAD = 3
+CHUNK_SIZE = 2000
+
+
+def month_floor(value: datetime) -> datetime:
+    """Inicio (UTC) del mes que contiene ``value``."""
+    value = value.astimezone(dt_timezone.utc)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(start: datetime) -> str:
+    return f'{PARTITION_PREFIX}{start:%Y_%m}'
+
+
+@dataclass(frozen=True)
+class AuditPartition:
+    """Un mes de bitácora guardado en su propia tabla."""
+
+    table: str
+    start: datetime
+
+    @property
+    def end(self) -> datetime:
+        return add_months(self.start, 1)
+
+    @property
+    def label(self) -> str:
+        return f'{self.start:%Y-%m}'
+
+
+def is_partitioned(using: str = 'default') -> bool:
+    """True si ``audit_auditlog`` es una tabla particionada de PostgreSQL."""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)', [PARENT_TABLE])
+        row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def list_partitions(using: str = 'default') -> list[AuditPartition]:
+    """Tablas mensuales existentes, en orden cronológico."""
+    partitions = []
+    for table in connections[using].introspection.table_names():
+        match = PARTITION_RE.match(table)
+        if match:
+            start = datetime(int(match[1]), int(match[2]), 1, tzinfo=dt_timezone.utc)
+            partitions.append(AuditPartition(table=table, start=start))
+    return sorted(partitions, key=lambda partition: partition.start)
+
+
+def expired_partitions(retention_days: int, *, now: datetime | None = None,
+                       using: str = 'default') -> list[AuditPartition]:
+    """Meses completos anteriores a la ventana de retención."""
+    if not retention_days:
+        return []
+    cutoff = (now or timezone.now()) - timedelta(days=retention_days)
+    return [partition for partition in list_partitions(using) if partition.end <= cutoff]
+
+
+# ---------------------------------------------------------------------------
+# PostgreSQL: particiones nativas
+# ---------------------------------------------------------------------------
+
+def _create_pg_partition(connection, start: datetime) -> None:
+    qn = connection.ops.quote_name
+    table = qn(partition_name(start))
+    bounds = f"FROM ('{start.isoformat()}') TO ('{add_months(start, 1).isoformat()}')"
+    with connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE {table} (LIKE {qn(PARENT_TABLE)} INCLUDING DEFAULTS)')
+        # Las filas del mes que hayan caído en la partición DEFAULT deben
+        # moverse antes de adjuntar: PostgreSQL rechaza el ATTACH si no.
+        cursor.execute(
+            f'WITH moved AS (DELETE FROM {qn(DEFAULT_PARTITION)} '
+            f'WHERE created_at >= %s AND created_at < %s RETURNING *) '
+            f'INSERT INTO {table} SELECT * FROM moved',
+            [start, add_months(start, 1)],
+        )
+        cursor.execute(f'ALTER TABLE {qn(PARENT_TABLE)} ATTACH PARTITION {table} FOR VALUES {bounds}')
+
+
+def ensure_partitions(months_ahead: int = MONTHS_AHEAD, *, now: datetime | None = None,
+                      using: str = 'default') -> list[str]:
+    """Crea las particiones del mes actual y los ``months_ahead`` siguientes.
+
+    No hace nada fuera de PostgreSQL. Retorna los nombres creados.
+    """
+    if not is_partitioned(using):
+        return []
+    connection = connections[using]
+    existing = {partition.table for partition in list_partitions(using)}
+    current = month_floor(now or timezone.now())
+    created = []
+    for offset in range(months_ahead + 1):
+        start = add_months(current, offset)
+        if partition_name(start) in existing:
+            continue
+        with transaction.atomic(using=using):
+            _create_pg_partition(connection, start)
+        created.append(partition_name(start))
+    return created
+
+
+# ---------------------------------------------------------------------------
+# SQLite: tablas mensuales rotativas
+# ---------------------------------------------------------------------------
+
+def hot_window_days(hot_days: int, retention_days: int) -> int:
+    """Días que se conservan en ``audit_auditlog`` antes de rotar (0 = nunca).
+
+    Sin ``AUDIT_SQLITE_ROTATION`` se ignora ``hot_days``: las entradas sólo
+    se rotan al vencer la retención, para que las lecturas por ORM (y la
+    exportación de cumplimiento) vean toda la bitácora vigente. Con
+    retención, lo vencido sale de la tabla aunque ``hot_days`` sea mayor.
+    """
+    if not getattr(settings, 'AUDIT_SQLITE_ROTATION', False):
+        hot_days = 0
+    if retention_days:
+        hot_days = min(hot_days, retention_days) if hot_days else retention_days
+    return hot_days
+
+
+def rotate_hot_rows(hot_days: int, *, now: datetime | None = None,
+                    using: str = 'default') -> int:
+    """Mueve a tablas mensuales las entradas anteriores a ``hot_days``.
+
+    Sólo aplica sin particionado nativo. Retorna cuántas entradas movió.
+    """
+    if is_partitioned(using) or not hot_days:
+        return 0
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    cutoff = (now or timezone.now()) - timedelta(days=hot_days)
+    manager = AuditLog.objects.using(using)
+    months = list(
+        manager.filter(created_at__lt=cutoff)
+        .datetimes('created_at', 'month', tzinfo=dt_timezone.utc)
+    )
+
+    columns = [field.column for field in AuditLog._meta.concrete_fields]
+    column_list = ', '.join(qn(column) for column in columns)
+    moved = 0
+    for start in months:
+        rows = manager.filter(created_at__gte=start, created_at__lt=min(add_months(start, 1), cutoff))
+        select_sql, params = rows.order_by().values_list(*columns).query.sql_with_params()
+        table = qn(partition_name(start))
+        with transaction.atomic(using=using):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'CREATE TABLE IF NOT EXISTS {table} AS '
+                    f'SELECT {column_list} FROM {qn(PARENT_TABLE)} WHERE 0 = 1'
+                )
+                cursor.execute(f'INSERT INTO {table} ({column_list}) {select_sql}', params)
+                moved += cursor.rowcount
+            rows.delete()
+    return moved
+
+
+# ---------------------------------------------------------------------------
+# Archivo y eliminación
+# ---------------------------------------------------------------------------
+
+def iter_partition_entries(partition: AuditPartition, *, using: str = 'default'):
+    """Entradas (`AuditLog` sin guardar) de un mes, en orden cronológico."""
+    manager = AuditLog.objects.using(using)
+    if is_partitioned(using):
+        # El filtro por rango recorre sólo la partición del mes
+        return (
+            manager.filter(created_at__gte=partition.start, created_at__lt=partition.end)
+            .order_by('created_at', 'id')
+            .iterator(chunk_size=CHUNK_SIZE)
+        )
+    qn = connections[using].ops.quote_name
+    return manager.raw(f'SELECT * FROM {qn(partition.table)} ORDER BY created_at, id').iterator()
+
+
+def _archive_row(entry: AuditLog) -> dict:
+    return {'id': entry.pk, **entry_to_row(entry)}
+
+
+def _write_jsonl(entries, path: Path) -> int:
+    count = 0
+    with gzip.open(path, 'wt', encoding='utf-8') as fh:
+        for entry in entries:
+            fh.write(json.dumps(_archive_row(entry), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+
+def _write_parquet(entries, path: Path) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as exc:
+        raise ImproperlyConfigured('El formato parquet requiere pyarrow (pip install pyarrow).') from exc
+
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('user_id', pa.int64()),
+        ('action', pa.string()),
+        ('resource_type', pa.string()),
+        ('resource_id', pa.string()),
+        ('description', pa.string()),
+        ('metadata', pa.string()),
+        ('ip_address', pa.string()),
+        ('user_agent', pa.string()),
+        ('created_at', pa.timestamp('us', tz='UTC')),
+    ])
+    count = 0
+    batch = []
+    with pq.ParquetWriter(path, schema, compression='zstd') as writer:
+        for entry in entries:
+            row = _archive_row(entry)
+            row['metadata'] = json.dumps(row['metadata'], cls=DjangoJSONEncoder, ensure_ascii=False)
+            row['created_at'] = entry.created_at
+            batch.append(row)
+            if len(batch) >= CHUNK_SIZE:
+                writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+                count += len(batch)
+                batch = []
+        if batch:
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+
+def archive_partition(partition: AuditPartition, directory, fmt: str = 'jsonl', *,
+                      using: str = 'default') -> tuple[Path, int]:
+    """Escribe un mes completo en ``directory`` y retorna ``(path, filas)``.
+
+    El archivo se escribe con sufijo ``.part`` y se renombra al terminar: un
+    archivo con el nombre final siempre está completo.
+    """
+    if fmt not in ARCHIVE_FORMATS:
+        raise ValueError(f'Formato de archivo no soportado: {fmt}')
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    suffix = 'jsonl.gz' if fmt == 'jsonl' else 'parquet'
+    target = directory / f'audit-{partition.label}.{suffix}'
+    partial = target.with_name(f'{target.name}.part')
+
+    entries = iter_partition_entries(partition, using=using)
+    writer = _write_jsonl if fmt == 'jsonl' else _write_parquet
+    try:
+        count = writer(entries, partial)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    os.replace(partial, target)
+    return target, count
+
+
+def drop_partition(partition: AuditPartition, *, using: str = 'default') -> None:
+    connection = connections[using]
+    qn = connection.ops.quote_name
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        if is_partitioned(using):
+            cursor.execute(f'ALTER TABLE {qn(PARENT_TABLE)} DETACH PARTITION {qn(partition.table)}')
+        cursor.execute(f'DROP TABLE {qn(partition.table)}')
+
+
+def apply_retention(*, retention_days: int | None = None, directory=None, fmt: str | None = None,
+                    archive: bool = True, dry_run: bool = False, now: datetime | None = None,
+                    using: str = 'default') -> list[dict]:
+    """Archiva y elimina los meses vencidos.
+
+    Los valores omitidos se toman de `SystemSettings` y de
+    ``settings.AUDIT_ARCHIVE_DIR``. Retorna un resumen por mes procesado.
+    """
+    from apps.settings_runtime.models import SystemSettings
+
+    system = SystemSettings.load()
+    if retention_days is None:
+        retention_days = system.audit_retention_days
+    fmt = fmt or system.audit_archive_format
+    directory = directory or settings.AUDIT_ARCHIVE_DIR
+
+    results = []
+    for partition in expired_partitions(retention_days, now=now, using=using):
+        result = {'partition': partition.label, 'table': partition.table, 'file': None, 'rows': None}
+        if not dry_run:
+            if archive:
+                path, rows = archive_partition(partition, directory, fmt, using=using)
+                result.update(file=str(path), rows=rows)
+            drop_partition(partition, using=using)
+        results.append(result)
+    return results
+
+
+def maintain_storage(*, now: datetime | None = None, using: str = 'default') -> dict:
+    """Mantenimiento periódico: particiones futuras, rotación y retención."""
+    from apps.settings_runtime.models import SystemSettings
+
+    system = SystemSettings.load()
+    hot_days = hot_window_days(system.audit_hot_days, system.audit_retention_days)
+    return {
+        'created': ensure_partitions(now=now, using=using),
+        'rotated': rotate_hot_rows(hot_days, now=now, using=using),
+        'archived': apply_retention(now=now, using=using),
+    }
@@ -0,0 +1,117 @@
+"""
+Resúmenes horarios de la bitácora para tableros.
+
+Preguntas como "logins por hora esta semana" o "cambios de estado por módulo
+por día" recorrían `AuditLog`. `AuditRollup` guarda cuántos eventos hubo por
+``(hora, acción, tipo de recurso, tipo de usuario)`` y las series se calculan
+sobre esa tabla, que tiene unas pocas filas por hora.
+
+Mantenimiento: `rebuild_rollups(start, end)` recalcula las horas del rango
+con una agregación agrupada sobre `AuditLog` y reemplaza sus filas, así que
+es idempotente y corrige también las entradas escritas en diferido (spool,
+Celery). La tarea ``audit.refresh_rollups`` (beat) recalcula las últimas
+``AUDIT_ROLLUP_LOOKBACK_HOURS`` horas; ``manage.py rebuild_audit_rollups``
+reconstruye rangos históricos.
+
+- `timeseries(interval, start, end, group_by, filters)` — series para la API.
+"""
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, TruncDay, TruncHour, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from .models import AuditLog, AuditRollup
+
+INTERVALS = {
+    'hour': TruncHour,
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+GROUP_BY = ('action', 'resource_type', 'user_type', 'module')
+
+
+def hour_floor(value: datetime) -> datetime:
+    return value.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def rebuild_rollups(start: datetime, end: datetime) -> int:
+    """Recalcula los resúmenes de las horas en ``[start, end)``.
+
+    Retorna cuántas filas de resumen quedaron en el rango.
+    """
+    start, end = hour_floor(start), hour_floor(end - timedelta(microseconds=1)) + timedelta(hours=1)
+    grouped = (
+        AuditLog.objects.filter(created_at__gte=start, created_at__lt=end)
+        .annotate(hour=TruncHour('created_at', tzinfo=dt_timezone.utc))
+        .values('hour', 'action', 'resource_type', 'user__user_type')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    rows = [
+        AuditRollup(
+            bucket=row['hour'],
+            action=row['action'],
+            resource_type=row['resource_type'],
+            user_type=row['user__user_type'] or '',
+            count=row['total'],
+        )
+        for row in grouped
+    ]
+    with transaction.atomic():
+        AuditRollup.objects.filter(bucket__gte=start, bucket__lt=end).delete()
+        AuditRollup.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def refresh_recent_rollups(hours: int | None = None, *, now: datetime | None = None) -> int:
+    """Recalcula las últimas ``hours`` horas (incluida la hora en curso)."""
+    hours = hours or getattr(settings, 'AUDIT_ROLLUP_LOOKBACK_HOURS', 3)
+    end = hour_floor(now or timezone.now()) + timedelta(hours=1)
+    return rebuild_rollups(end - timedelta(hours=hours), end)
+
+
+def timeseries(interval: str, start: datetime, end: datetime, *,
+               group_by: str = 'action', filters: dict | None = None) -> list[dict]:
+    """Series ``[{'key', 'total', 'points': [{'bucket', 'count'}]}]``.
+
+    ``interval`` es hour/day/week/month (días y semanas en la zona horaria
+    actual). ``group_by='module'`` agrupa por el ``app_label`` del recurso.
+    ``filters`` admite ``action``, ``resource_type`` y ``user_type``.
+    """
+    trunc = INTERVALS[interval]
+    field = 'resource_type' if group_by == 'module' else group_by
+    queryset = AuditRollup.objects.filter(bucket__gte=hour_floor(start), bucket__lt=end)
+    for name, value in (filters or {}).items():
+        if value is not None:
+            queryset = queryset.filter(**{name: value})
+    rows = (
+        queryset
+        .annotate(period=trunc('bucket', tzinfo=timezone.get_current_timezone()))
+        .values('period', field)
+        .annotate(total=Coalesce(Sum('count'), 0))
+        .order_by('period')
+    )
+
+    series: dict[str, dict] = {}
+    for row in rows:
+        key = row[field]
+        if group_by == 'module':
+            key = key.split('.', 1)[0] if key else ''
+        entry = series.setdefault(key, {'key': key, 'total': 0, 'points': {}})
+        entry['total'] += row['total']
+        entry['points'][row['period']] = entry['points'].get(row['period'], 0) + row['total']
+
+    return [
+        {
+            'key': entry['key'],
+            'total': entry['total'],
+            'points': [{'bucket': bucket, 'count': count} for bucket, count in entry['points'].items()],
+        }
+        for entry in sorted(series.values(), key=lambda item: -item['total'])
+    ]
@@ -0,0 +1,128 @@
+"""
+Búsqueda de texto libre en la bitácora (descripción y metadatos).
+
+Los admins buscan por usuarios en `metadata`, motivos o descripciones, y los
+filtros exactos de `AuditLogFilter` no alcanzan. Según el motor:
+
+- PostgreSQL: índice GIN sobre ``to_tsvector('spanish', description || metadata)``
+  (la consulta repite la misma expresión para que el planificador lo use) y
+  otro GIN ``jsonb_path_ops`` sobre `metadata` para `filter_metadata`
+  (``metadata @> {...}``).
+- SQLite: tabla virtual FTS5 ``audit_auditlog_fts`` con contenido externo,
+  mantenida por triggers sobre `audit_auditlog`. Las filas que
+  `partitions.rotate_hot_rows` mueve a las tablas mensuales salen del índice.
+- Otros motores, o SQLite compilado sin FTS5: ``icontains`` (escaneo).
+
+- `search(queryset, text)` — filtra ``queryset`` por texto libre.
+- `filter_metadata(queryset, data)` — entradas cuyo `metadata` contiene ``data``.
+- `install_sqlite_fts(connection)` — crea (idempotente) el índice FTS5; una
+  migración que reconstruya `audit_auditlog` en SQLite debe volver a llamarla.
+"""
+from __future__ import annotations
+
+import logging
+
+from django.db import DatabaseError, connections
+from django.db.models import BooleanField, Q
+from django.db.models.expressions import RawSQL
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'audit_auditlog'
+FTS_TABLE = 'audit_auditlog_fts'
+SEARCH_CONFIG = 'spanish'
+
+# Debe coincidir con la expresión del índice `audit_auditlog_search_gin`
+SEARCH_VECTOR_SQL = (
+    f"to_tsvector('{SEARCH_CONFIG}'::regconfig, "
+    f"COALESCE({TABLE}.description, '') || ' ' || COALESCE({TABLE}.metadata::text, ''))"
+)
+
+POSTGRES_INDEXES = (
+    f"CREATE INDEX IF NOT EXISTS audit_auditlog_search_gin ON {TABLE} "
+    f"USING GIN ((to_tsvector('{SEARCH_CONFIG}'::regconfig, "
+    f"COALESCE(description, '') || ' ' || COALESCE(metadata::text, ''))))",
+    f"CREATE INDEX IF NOT EXISTS audit_auditlog_metadata_gin ON {TABLE} "
+    f"USING GIN (metadata jsonb_path_ops)",
+)
+
+SQLITE_FTS = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"description, metadata, content='{TABLE}', content_rowid='id', "
+    f"tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, description, metadata) "
+    f"VALUES (new.id, new.description, new.metadata); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, metadata) "
+    f"VALUES ('delete', old.id, old.description, old.metadata); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE ON {TABLE} BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, description, metadata) "
+    f"VALUES ('delete', old.id, old.description, old.metadata); "
+    f"INSERT INTO {FTS_TABLE}(rowid, description, metadata) "
+    f"VALUES (new.id, new.description, new.metadata); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+)
+
+# alias de conexión -> ¿existe el índice FTS5?
+_fts_available: dict[str, bool] = {}
+
+
+def install_sqlite_fts(connection) -> bool:
+    """Crea la tabla FTS5 y sus triggers. False si SQLite no trae FTS5."""
+    try:
+        with connection.cursor() as cursor:
+            for statement in SQLITE_FTS:
+                cursor.execute(statement)
+    except DatabaseError as exc:
+        logger.warning('SQLite sin FTS5; la búsqueda de auditoría usará icontains: %s', exc)
+        return False
+    _fts_available[connection.alias] = True
+    return True
+
+
+def _has_sqlite_fts(connection) -> bool:
+    if connection.alias not in _fts_available:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [FTS_TABLE])
+            _fts_available[connection.alias] = cursor.fetchone() is not None
+    return _fts_available[connection.alias]
+
+
+def _fts_query(text: str) -> str:
+    # Cada término como frase: los operadores de FTS5 no llegan desde la API
+    # y los UUID / correos se buscan como secuencia de tokens.
+    terms = [term.replace('"', '""') for term in text.split()]
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def search(queryset, text: str):
+    """Filtra ``queryset`` (de `AuditLog`) por texto libre en descripción y metadatos."""
+    text = (text or '').strip()
+    if not text:
+        return queryset
+    connection = connections[queryset.db]
+
+    if connection.vendor == 'postgresql':
+        return queryset.filter(RawSQL(
+            f"{SEARCH_VECTOR_SQL} @@ websearch_to_tsquery('{SEARCH_CONFIG}'::regconfig, %s)",
+            [text],
+            output_field=BooleanField(),
+        ))
+    if connection.vendor == 'sqlite' and _has_sqlite_fts(connection):
+        return queryset.filter(id__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [_fts_query(text)],
+        ))
+    return queryset.filter(Q(description__icontains=text) | Q(metadata__icontains=text))
+
+
+def filter_metadata(queryset, data: dict):
+    """Entradas cuyo `metadata` contiene los pares de ``data``.
+
+    En PostgreSQL es ``metadata @> data`` (usa el GIN); en el resto se
+    compara clave por clave.
+    """
+    if connections[queryset.db].vendor == 'postgresql':
+        return queryset.filter(metadata__contains=data)
+    return queryset.filter(**{f'metadata__{key}': value for key, value in data.items()})
@@ -10,25 +10,40 @@ Uso típico (desde un view, signal o servicio):
         description='Aprobada',
         metadata={'old': 'PENDIENTE', 'new': 'APROBADA'},
     )
+
+Para operaciones masivas, `log_events([...])` registra N entradas con un solo
+INSERT.
+
+Las entradas no se insertan en el momento: `audit.writer` las acumula por
+transacción / request y las escribe en bloque (ver `AUDIT_WRITE_MODE`).
 """
-from typing import Any
+from typing import Any, Iterable
 
 from django.db import models
 
+from . import writer
 from .middleware import get_current_request_context
 from .models import AuditLog
 
 
+def normalize_resource_type(value: str | None) -> str:
+    """Forma canónica de `resource_type`: ``app_label.modelname`` en minúsculas.
+
+    Se aplica al escribir para que las búsquedas por recurso sean exactas y
+    usen el índice ``(resource_type, resource_id)``.
+    """
+    return (value or '').strip().lower()
+
+
 def _resolve_resource_info(resource: Any) -> tuple[str, str]:
     if resource is None:
         return '', ''
     if isinstance(resource, models.Model):
-        meta = resource._meta
-        return f'{meta.app_label}.{meta.object_name}', str(resource.pk)
+        return resource._meta.label_lower, str(resource.pk)
     return str(type(resource).__name__), str(getattr(resource, 'pk', ''))
 
 
-def log_event(
+def build_event(
     *,
     action: str,
     resource: Any = None,
@@ -40,7 +55,7 @@ def log_event(
     ip: str | None = None,
     user_agent: str | None = None,
 ) -> AuditLog:
-    """Crea una entrada en la bitácora de auditoría.
+    """Construye (sin guardar) una entrada de auditoría.
 
     Si no se pasan `user`, `ip`, `user_agent`, intenta leerlos del contexto del
     request actual (vía AuditContextMiddleware).
@@ -58,13 +73,37 @@ def log_event(
         resource_type = resource_type or rtype
         resource_id = resource_id or rid
 
-    return AuditLog.objects.create(
+    return AuditLog(
         user=user if (user is not None and getattr(user, 'pk', None)) else None,
         action=action,
-        resource_type=resource_type or '',
+        resource_type=normalize_resource_type(resource_type),
         resource_id=resource_id or '',
         description=description or '',
         metadata=metadata or {},
         ip_address=ip,
         user_agent=user_agent or '',
     )
+
+
+def log_event(**kwargs) -> AuditLog:
+    """Registra una entrada en la bitácora de auditoría.
+
+    Acepta los mismos argumentos (keyword-only) que `build_event`. La entrada
+    retornada todavía no tiene `pk`: se escribe al confirmar la transacción o
+    al terminar el request.
+    """
+    entry = build_event(**kwargs)
+    writer.enqueue([entry])
+    return entry
+
+
+def log_events(events: Iterable[dict]) -> list[AuditLog]:
+    """Registra varias entradas de una vez.
+
+    Cada elemento de `events` es un dict con los argumentos de `build_event`.
+    Pensado para operaciones masivas (transiciones programadas, acciones en
+    lote); se escriben junto con el resto del buffer en un `bulk_create`.
+    """
+    entries = [build_event(**event) for event in events]
+    writer.enqueue(entries)
+    return entries
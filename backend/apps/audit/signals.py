@@ -1,5 +1,8 @@
 """
 Signal handlers globales de auditoría: login/logout exitoso y fallido.
+
+Los logins fallidos no se escriben uno a uno: se agregan por
+``(username, IP)`` en `audit.login_failures` y se vuelcan en segundo plano.
 """
 from django.contrib.auth.signals import (
     user_logged_in,
@@ -8,6 +11,8 @@ from django.contrib.auth.signals import (
 )
 from django.dispatch import receiver
 
+from . import login_failures
+from .middleware import _extract_ip, get_current_request_context
 from .services import log_event
 
 
@@ -24,9 +29,12 @@ def _on_logout(sender, request, user, **kwargs):
 
 @receiver(user_login_failed)
 def _on_login_failed(sender, credentials, request, **kwargs):
+    # Se agrega por (username, IP) y se escribe en segundo plano: ver
+    # `audit.login_failures`.
     username = credentials.get('username') if credentials else None
-    log_event(
-        action='login_failed',
-        description=f'Intento fallido de login: {username}',
-        metadata={'username': username},
-    )
+    if request is not None:
+        ip, user_agent = _extract_ip(request), request.META.get('HTTP_USER_AGENT', '')[:500]
+    else:
+        ctx = get_current_request_context()
+        ip, user_agent = ctx.get('ip'), ctx.get('user_agent', '')
+    login_failures.collector.record(username, ip, user_agent)
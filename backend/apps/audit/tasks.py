@@ -0,0 +1,75 @@
+"""
+Tareas Celery de auditoría.
+
+- `write_audit_batch_task` — escribe un lote serializado
+  (``AUDIT_WRITE_MODE=celery``).
+- `drain_audit_spool_task` — vuelca el archivo de spool
+  (``AUDIT_WRITE_MODE=spool``); programada en Celery beat. Sin Celery, usar
+  ``python manage.py drain_audit_spool`` desde cron.
+- `maintain_audit_storage_task` — particiones futuras, rotación y retención
+  de la bitácora (diaria en beat; ver `audit.partitions`).
+- `refresh_audit_rollups_task` — recalcula los resúmenes horarios recientes
+  (ver `audit.rollups`).
+"""
+from __future__ import annotations
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+try:
+    from celery import shared_task
+except ImportError:  # pragma: no cover
+    def shared_task(*args, **kwargs):  # type: ignore[misc]
+        def decorator(fn):
+            fn.delay = lambda *a, **kw: fn(*a, **kw)
+            return fn
+        return decorator
+
+
+@shared_task(
+    name='audit.write_batch',
+    bind=True,
+    autoretry_for=(Exception,),
+    retry_backoff=True,
+    retry_kwargs={'max_retries': 3},
+)
+def write_audit_batch_task(self, rows: list[dict]) -> int:
+    """Inserta un lote de entradas serializadas con `writer.entry_to_row`."""
+    from .writer import row_to_entry, write_entries
+
+    return len(write_entries([row_to_entry(row) for row in rows]))
+
+
+@shared_task(name='audit.drain_spool')
+def drain_audit_spool_task() -> int:
+    """Vuelca a la BD las entradas acumuladas en el spool."""
+    from .writer import drain_spool
+
+    total = drain_spool()
+    if total:
+        logger.info('Auditoría: %d entradas volcadas desde el spool', total)
+    return total
+
+
+@shared_task(name='audit.maintain_storage')
+def maintain_audit_storage_task() -> dict:
+    """Mantenimiento diario del almacenamiento mensual de la bitácora."""
+    from .partitions import maintain_storage
+
+    result = maintain_storage()
+    if result['created'] or result['rotated'] or result['archived']:
+        logger.info(
+            'Auditoría: %d particiones creadas, %d entradas rotadas, %d meses archivados',
+            len(result['created']), result['rotated'], len(result['archived']),
+        )
+    return result
+
+
+@shared_task(name='audit.refresh_rollups')
+def refresh_audit_rollups_task() -> int:
+    """Recalcula los resúmenes horarios de las últimas horas."""
+    from .rollups import refresh_recent_rollups
+
+    return refresh_recent_rollups()
@@ -0,0 +1,529 @@
+"""
+Tests de la escritura diferida, rotación y archivo de la bitácora de auditoría.
+
+Ejecutar con::
+
+    python manage.py test apps.audit.tests
+"""
+import asyncio
+import csv
+import gzip
+import json
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import StringIO
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from . import partitions, rollups, writer
+from .login_failures import LoginFailureCollector
+from .middleware import AuditContextMiddleware, get_current_request_context
+from .models import AuditLog, AuditRollup
+from .services import build_event, log_event
+
+
+class BufferedAuditWriterTest(TestCase):
+    """Los eventos se escriben en bloque al confirmar, no por evento."""
+
+    def test_events_are_written_on_commit_with_one_insert(self):
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            for i in range(5):
+                log_event(action='other', resource_type='tests.thing', resource_id=str(i))
+            self.assertEqual(AuditLog.objects.count(), 0)
+
+        self.assertEqual(len(callbacks), 1)
+        with self.assertNumQueries(1):
+            callbacks[0]()
+        self.assertEqual(AuditLog.objects.filter(resource_type='tests.thing').count(), 5)
+
+    def test_rolled_back_savepoint_discards_its_events(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            log_event(action='other', resource_type='tests.kept')
+            try:
+                with transaction.atomic():
+                    log_event(action='other', resource_type='tests.discarded')
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            log_event(action='other', resource_type='tests.kept')
+
+        self.assertEqual(AuditLog.objects.filter(resource_type='tests.kept').count(), 2)
+        self.assertFalse(AuditLog.objects.filter(resource_type='tests.discarded').exists())
+
+    def test_spool_mode_is_drained_into_the_table(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            spool = Path(tmp) / 'audit.jsonl'
+            with override_settings(AUDIT_WRITE_MODE='spool', AUDIT_SPOOL_PATH=str(spool)):
+                with self.captureOnCommitCallbacks(execute=True):
+                    event = log_event(action='other', resource_type='tests.spooled', metadata={'n': 1})
+                self.assertFalse(AuditLog.objects.filter(resource_type='tests.spooled').exists())
+                self.assertTrue(spool.exists())
+
+                self.assertEqual(writer.drain_spool(), 1)
+
+            self.assertFalse(spool.exists())
+            stored = AuditLog.objects.get(resource_type='tests.spooled')
+            self.assertEqual(stored.metadata, {'n': 1})
+            self.assertEqual(stored.created_at, event.created_at)
+
+
+class TransactionBufferRollbackTest(TransactionTestCase):
+    """Un buffer de una transacción revertida no se reutiliza en la siguiente."""
+
+    def test_events_after_a_rolled_back_transaction_are_written(self):
+        try:
+            with transaction.atomic():
+                log_event(action='other', resource_type='tests.discarded')
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        with transaction.atomic():
+            log_event(action='other', resource_type='tests.kept')
+
+        self.assertEqual(AuditLog.objects.filter(resource_type='tests.kept').count(), 1)
+        self.assertFalse(AuditLog.objects.filter(resource_type='tests.discarded').exists())
+
+
+class AuditStorageRetentionTest(TestCase):
+    """Rotación a tablas mensuales (SQLite), archivo y eliminación."""
+
+    now = datetime(2026, 10, 15, 12, 0, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        AuditLog.objects.bulk_create([
+            AuditLog(action='other', resource_type='tests.ancient', metadata={'n': 1},
+                     created_at=datetime(2024, 1, 10, tzinfo=dt_timezone.utc)),
+            AuditLog(action='other', resource_type='tests.ancient', metadata={'n': 2},
+                     created_at=datetime(2024, 1, 20, tzinfo=dt_timezone.utc)),
+            AuditLog(action='other', resource_type='tests.warm',
+                     created_at=datetime(2026, 3, 5, tzinfo=dt_timezone.utc)),
+            AuditLog(action='other', resource_type='tests.hot',
+                     created_at=self.now - timedelta(days=5)),
+        ])
+
+    def test_old_entries_are_rotated_archived_and_dropped(self):
+        self.assertEqual(partitions.rotate_hot_rows(90, now=self.now), 3)
+        self.assertEqual(list(AuditLog.objects.values_list('resource_type', flat=True)), ['tests.hot'])
+        self.assertEqual([p.label for p in partitions.list_partitions()], ['2024-01', '2026-03'])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            results = partitions.apply_retention(
+                retention_days=365, directory=tmp, fmt='jsonl', now=self.now,
+            )
+            self.assertEqual([r['partition'] for r in results], ['2024-01'])
+            self.assertEqual(results[0]['rows'], 2)
+            with gzip.open(results[0]['file'], 'rt', encoding='utf-8') as fh:
+                rows = [json.loads(line) for line in fh]
+
+        self.assertEqual([row['metadata'] for row in rows], [{'n': 1}, {'n': 2}])
+        self.assertEqual(rows[0]['created_at'], '2024-01-10T00:00:00+00:00')
+        self.assertEqual([p.label for p in partitions.list_partitions()], ['2026-03'])
+
+    def test_maintenance_keeps_unexpired_rows_in_main_table_on_sqlite(self):
+        from apps.settings_runtime.models import SystemSettings
+
+        SystemSettings.objects.filter(pk=SystemSettings.load().pk).update(
+            audit_hot_days=90, audit_retention_days=365,
+        )
+        with tempfile.TemporaryDirectory() as tmp, override_settings(AUDIT_ARCHIVE_DIR=tmp):
+            result = partitions.maintain_storage(now=self.now)
+            self.assertEqual(result['rotated'], 2)
+            self.assertEqual([r['partition'] for r in result['archived']], ['2024-01'])
+            # 2026-03 tiene más de hot_days pero sigue visible para la API y la exportación
+            self.assertEqual(
+                sorted(AuditLog.objects.values_list('resource_type', flat=True)),
+                ['tests.hot', 'tests.warm'],
+            )
+
+            with override_settings(AUDIT_SQLITE_ROTATION=True):
+                self.assertEqual(partitions.maintain_storage(now=self.now)['rotated'], 1)
+        self.assertEqual(list(AuditLog.objects.values_list('resource_type', flat=True)), ['tests.hot'])
+
+    def test_dry_run_keeps_everything(self):
+        partitions.rotate_hot_rows(90, now=self.now)
+        out = StringIO()
+        call_command('archive_audit_logs', '--dry-run', '--retention-days', '365', stdout=out)
+        self.assertIn('2024-01', out.getvalue())
+        self.assertEqual(len(partitions.list_partitions()), 2)
+
+
+class AuditLogCursorPaginationTest(APITestCase):
+    """Keyset sobre (created_at, id): sin saltos ni duplicados con empates."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_user(
+            username='admin_audit_cursor', email='admin_audit_cursor@example.com',
+            password='pwd12345', id_card='99061034567', user_type='ADMIN', is_staff=True,
+        )
+        base = datetime(2026, 10, 1, 12, 0, tzinfo=dt_timezone.utc)
+        # Tres entradas comparten created_at para ejercitar el desempate por id
+        stamps = [base, base, base] + [base + timedelta(minutes=i) for i in range(1, 5)]
+        AuditLog.objects.bulk_create([
+            AuditLog(action='other', resource_type='tests.cursor', created_at=stamp)
+            for stamp in stamps
+        ])
+        cls.expected = list(
+            AuditLog.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.admin)
+
+    def test_walks_forward_and_back_without_gaps(self):
+        seen, pages = [], []
+        url = '/api/v1/audit/logs/?page_size=3'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append(response.data)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, self.expected)
+        self.assertEqual(len(pages), 3)
+        self.assertNotIn('count', pages[0])
+
+        previous = self.client.get(pages[2]['previous']).data
+        self.assertEqual([row['id'] for row in previous['results']], self.expected[3:6])
+        first = self.client.get(previous['previous']).data
+        self.assertEqual([row['id'] for row in first['results']], self.expected[:3])
+        self.assertIsNone(first['previous'])
+
+    def test_optional_count_and_invalid_cursor(self):
+        response = self.client.get('/api/v1/audit/logs/?count=approx&resource_type=tests.cursor')
+        self.assertEqual(response.data['count'], 7)
+        self.assertFalse(response.data['count_is_estimate'])  # SQLite: conteo exacto
+
+        self.assertEqual(self.client.get('/api/v1/audit/logs/?cursor=nope').status_code, 404)
+
+
+class AuditLogExportTest(APITestCase):
+    """Volcado en streaming con filtros, gzip y registro de la exportación."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_user(
+            username='admin_audit_export', email='admin_audit_export@example.com',
+            password='pwd12345', id_card='99061134567', user_type='ADMIN', is_staff=True,
+        )
+        AuditLog.objects.bulk_create(
+            [AuditLog(action='approve', resource_type='tests.export', resource_id=str(i),
+                      metadata={'i': i}) for i in range(3)]
+            + [AuditLog(action='reject', resource_type='tests.export', resource_id='x')]
+        )
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.admin)
+
+    def test_csv_export_applies_filters(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.get('/api/v1/audit/logs/export/?action=approve')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([row['resource_id'] for row in rows], ['0', '1', '2'])
+        self.assertEqual(json.loads(rows[2]['metadata']), {'i': 2})
+
+        logged = AuditLog.objects.get(action='export')
+        self.assertEqual(logged.user, self.admin)
+        self.assertEqual(logged.metadata['filters'], {'action': 'approve'})
+
+    def test_gzip_jsonl_export(self):
+        response = self.client.get('/api/v1/audit/logs/export/?file_format=jsonl&gzip=1&resource_type=tests.export')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(json.loads(lines[-1])['action'], 'reject')
+
+        self.assertEqual(self.client.get('/api/v1/audit/logs/export/?file_format=xml').status_code, 400)
+
+
+
+class AuditLogExportASGITest(TransactionTestCase):
+    """El volcado pasa por `ASGIHandler` en streaming, sin leerse entero en memoria."""
+
+    def test_export_is_streamed_by_asgi_handler(self):
+        import warnings
+
+        from asgiref.sync import async_to_sync
+        from django.core.handlers.asgi import ASGIHandler
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        admin = get_user_model().objects.create_user(
+            username='admin_audit_asgi', email='admin_audit_asgi@example.com',
+            password='pwd12345', id_card='99061634567', user_type='ADMIN', is_staff=True,
+        )
+        AuditLog.objects.bulk_create(
+            AuditLog(action='approve', resource_type='tests.asgi', resource_id=str(i), description='x' * 100)
+            for i in range(1500)
+        )
+        token = str(AccessToken.for_user(admin))
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+            'method': 'GET', 'scheme': 'http', 'root_path': '',
+            'path': '/api/v1/audit/logs/export/', 'raw_path': b'/api/v1/audit/logs/export/',
+            'query_string': b'resource_type=tests.asgi',
+            'headers': [(b'host', b'testserver'), (b'authorization', f'Bearer {token}'.encode())],
+            'server': ('testserver', 80), 'client': ('127.0.0.1', 50000),
+        }
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message):
+            messages.append(message)
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            async_to_sync(ASGIHandler())(scope, receive, send)
+
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertFalse([w for w in caught if 'synchronous iterators' in str(w.message)])
+        chunks = [m['body'] for m in messages[1:] if m.get('body')]
+        self.assertGreater(len(chunks), 1)  # bloques de ~64 KB, no un único cuerpo
+        rows = list(csv.DictReader(b''.join(chunks).decode().splitlines()))
+        self.assertEqual(len(rows), 1500)
+
+
+class AuditLogSearchTest(APITestCase):
+    """Texto libre (FTS5 en SQLite) y filtro por contenido de metadata."""
+
+    reservation = '6f1c2e9a-4b7d-4c1e-9a55-0d3b8e2f7a10'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_user(
+            username='admin_audit_search', email='admin_audit_search@example.com',
+            password='pwd12345', id_card='99061534567', user_type='ADMIN', is_staff=True,
+        )
+        AuditLog.objects.bulk_create([
+            AuditLog(action='reject', resource_type='tests.search', description='Rechazo por falta de información'),
+            AuditLog(action='update', resource_type='tests.search', metadata={'reservation': cls.reservation}),
+            AuditLog(action='login_failed', resource_type='tests.search', metadata={'username': 'mperez', 'count': 3}),
+        ])
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.admin)
+
+    def actions(self, **params):
+        response = self.client.get('/api/v1/audit/logs/', {'resource_type': 'tests.search', **params})
+        self.assertEqual(response.status_code, 200)
+        return sorted(row['action'] for row in response.data['results'])
+
+    def test_free_text_matches_descriptions_and_metadata(self):
+        self.assertEqual(self.actions(q='informacion'), ['reject'])  # sin tilde
+        self.assertEqual(self.actions(q=self.reservation), ['update'])
+        self.assertEqual(self.actions(q='mperez'), ['login_failed'])
+        self.assertEqual(self.actions(q='inexistente'), [])
+
+        AuditLog.objects.filter(action='login_failed').delete()
+        self.assertEqual(self.actions(q='mperez'), [])
+
+    def test_metadata_containment(self):
+        self.assertEqual(self.actions(metadata=json.dumps({'username': 'mperez'})), ['login_failed'])
+        response = self.client.get('/api/v1/audit/logs/', {'metadata': '[1]'})
+        self.assertEqual(response.status_code, 400)
+
+
+class ResourceHistoryTest(APITestCase):
+    """Historial por recurso: tipo normalizado, dueño con una consulta, cursor."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from apps.labs.enums import LocalTypeEnum, ReservationPurposeEnum
+        from apps.labs.models import Local, LocalReservation
+
+        User = get_user_model()
+        cls.owner = User.objects.create_user(
+            username='audit_history_owner', email='audit_history_owner@example.com',
+            password='pwd12345', id_card='99061234567', user_type='USUARIO',
+        )
+        cls.other = User.objects.create_user(
+            username='audit_history_other', email='audit_history_other@example.com',
+            password='pwd12345', id_card='99061334567', user_type='USUARIO',
+        )
+        local = Local.objects.create(
+            name='Lab historial', code='TEST-AUDIT-HIST',
+            local_type=LocalTypeEnum.LABORATORIO, capacity=20,
+        )
+        start = timezone.now() + timedelta(days=3)
+        cls.reservation = LocalReservation.objects.create(
+            user=cls.owner, local=local, start_time=start, end_time=start + timedelta(hours=2),
+            purpose=ReservationPurposeEnum.CLASE, purpose_detail='Clase', expected_attendees=10,
+            responsible_name='Owner', responsible_phone='52345600',
+            responsible_email='audit_history_owner@example.com',
+        )
+        AuditLog.objects.bulk_create([
+            build_event(action='update', resource=cls.reservation, user=cls.owner)
+            for _ in range(3)
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def url(self, pk=None):
+        return f'/api/v1/audit/logs/resource/labs/LocalReservation/{pk or self.reservation.pk}/'
+
+    def test_resource_type_is_normalized_at_write_time(self):
+        self.assertEqual(
+            set(AuditLog.objects.filter(resource_id=str(self.reservation.pk))
+                .values_list('resource_type', flat=True)),
+            {'labs.localreservation'},
+        )
+
+    def test_owner_pages_through_history(self):
+        self.client.force_authenticate(user=self.owner)
+        response = self.client.get(self.url() + '?page_size=2')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+        rest = self.client.get(response.data['next']).data
+        self.assertEqual(len(rest['results']), 1)
+        self.assertIsNone(rest['next'])
+
+    def test_owner_lookup_is_cached_and_others_are_rejected(self):
+        self.client.force_authenticate(user=self.owner)
+        self.client.get(self.url())
+        # Segunda vez: sin consulta de dueño, sólo la página del historial
+        with self.assertNumQueries(1):
+            self.client.get(self.url())
+
+        self.client.force_authenticate(user=self.other)
+        self.assertEqual(self.client.get(self.url()).status_code, 403)
+        self.assertEqual(self.client.get(self.url('no-es-uuid')).status_code, 404)
+
+
+class AuditRollupTest(APITestCase):
+    """Resúmenes horarios recalculables y series servidas desde ellos."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_user(
+            username='admin_audit_rollup', email='admin_audit_rollup@example.com',
+            password='pwd12345', id_card='99061434567', user_type='ADMIN', is_staff=True,
+        )
+        cls.base = datetime(2026, 10, 5, 14, 0, tzinfo=dt_timezone.utc)
+        AuditLog.objects.bulk_create(
+            [AuditLog(action='login', user=cls.admin, created_at=cls.base + timedelta(minutes=m))
+             for m in (1, 20, 59)]
+            + [AuditLog(action='login', created_at=cls.base + timedelta(hours=1, minutes=5))]
+            + [AuditLog(action='state_change', resource_type=rt, created_at=cls.base + timedelta(minutes=30))
+               for rt in ('labs.localreservation', 'labs.localreservation', 'internal.feedingprocedure')]
+        )
+
+    def test_rebuild_is_idempotent(self):
+        window = (self.base, self.base + timedelta(hours=2))
+        rollups.rebuild_rollups(*window)
+        self.assertEqual(rollups.rebuild_rollups(*window), 4)
+        login = AuditRollup.objects.get(bucket=self.base, action='login')
+        self.assertEqual((login.count, login.user_type), (3, 'ADMIN'))
+        self.assertEqual(
+            AuditRollup.objects.get(bucket=self.base + timedelta(hours=1)).user_type, '',
+        )
+
+    def test_timeseries_endpoint_groups_by_module(self):
+        rollups.rebuild_rollups(self.base, self.base + timedelta(hours=2))
+        self.client.force_authenticate(user=self.admin)
+        response = self.client.get('/api/v1/audit/logs/timeseries/', {
+            'interval': 'hour', 'group_by': 'module', 'action': 'state_change',
+            'date_from': '2026-10-05', 'date_to': '2026-10-05',
+        })
+        self.assertEqual(response.status_code, 200)
+        totals = {series['key']: series['total'] for series in response.data['series']}
+        self.assertEqual(totals, {'labs': 2, 'internal': 1})
+
+        by_action = self.client.get('/api/v1/audit/logs/timeseries/', {
+            'interval': 'day', 'date_from': '2026-10-05', 'date_to': '2026-10-05',
+        }).data['series']
+        self.assertEqual(by_action[0]['key'], 'login')
+        self.assertEqual(by_action[0]['points'][0]['count'], 4)
+
+        self.assertEqual(self.client.get('/api/v1/audit/logs/timeseries/?interval=year').status_code, 400)
+
+
+class LoginFailureAggregationTest(TestCase):
+    """Los fallos repetidos por (username, IP) se escriben como una entrada."""
+
+    def setUp(self):
+        self.now = 1_790_000_000.0
+        self.collector = LoginFailureCollector(
+            window=60, max_span=600, clock=lambda: self.now, autostart=False,
+        )
+
+    def flush(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.collector.flush(**kwargs)
+
+    def test_repeated_failures_become_one_entry(self):
+        for _ in range(50):
+            self.collector.record('Victim', '10.0.0.9', 'bot/1.0')
+            self.now += 1
+        self.collector.record('victim', '10.0.0.10')
+
+        self.assertEqual(self.flush(), 0)  # ventana aún abierta
+        self.now += 60
+        self.assertEqual(self.flush(), 2)
+
+        entry = AuditLog.objects.get(action='login_failed', ip_address='10.0.0.9')
+        self.assertEqual(entry.metadata['count'], 50)
+        self.assertEqual(entry.metadata['username'], 'Victim')
+        self.assertEqual(
+            datetime.fromisoformat(entry.metadata['last_at'])
+            - datetime.fromisoformat(entry.metadata['first_at']),
+            timedelta(seconds=49),
+        )
+        self.assertEqual(entry.created_at.timestamp(), 1_790_000_000.0)
+        self.assertEqual(self.collector.pending, 0)
+
+    def test_sustained_attack_is_split_by_max_span(self):
+        for _ in range(700):
+            self.collector.record('admin', '10.0.0.9')
+            self.now += 1
+        self.flush(force=True)
+        counts = sorted(AuditLog.objects.filter(action='login_failed').values_list('metadata__count', flat=True))
+        self.assertEqual(counts, [100, 600])
+
+    def test_close_writes_open_groups(self):
+        self.collector.record('admin', '10.0.0.9')
+        self.collector.record('admin', '10.0.0.9')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.collector.close()
+
+        entry = AuditLog.objects.get(action='login_failed')
+        self.assertEqual(entry.metadata['count'], 2)
+        self.assertEqual(self.collector.pending, 0)
+
+
+class AuditContextMiddlewareTest(SimpleTestCase):
+    """Contexto por request en `contextvars`, en modo síncrono y asíncrono."""
+
+    def test_sync_request_context(self):
+        middleware = AuditContextMiddleware(lambda request: get_current_request_context())
+        request = RequestFactory().get('/sync/', HTTP_X_FORWARDED_FOR='10.0.0.7, 10.0.0.1')
+        context = middleware(request)
+        self.assertEqual((context['path'], context['ip']), ('/sync/', '10.0.0.7'))
+        self.assertEqual(get_current_request_context(), {})
+
+    def test_concurrent_async_requests_keep_their_own_context(self):
+        async def view(request):
+            # /a/ termina después de que /b/ haya entrado en el mismo hilo
+            await asyncio.sleep(0.02 if request.path == '/a/' else 0)
+            return get_current_request_context()['path']
+
+        middleware = AuditContextMiddleware(view)
+        self.assertTrue(iscoroutinefunction(middleware))
+        factory = RequestFactory()
+
+        async def run():
+            return await asyncio.gather(middleware(factory.get('/a/')), middleware(factory.get('/b/')))
+
+        self.assertEqual(asyncio.run(run()), ['/a/', '/b/'])
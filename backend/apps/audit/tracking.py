@@ -0,0 +1,73 @@
+"""
+Diffs de campos para la bitácora sin releer la fila antes de guardar.
+
+Los signals de labs e internal hacían ``sender.objects.get(pk=...)`` en
+``pre_save`` sólo para conocer el estado anterior: un SELECT extra por cada
+``save()``. `AuditTrackedMixin` es opt-in y se apoya en el ``FieldTracker`` de
+django-model-utils (ya usado en secretary_doc), que toma una instantánea de los
+campos cargados al instanciar el modelo y sigue disponible en ``post_save``.
+
+Uso:
+
+    class MiTramite(AuditTrackedMixin, Procedure):
+        tracker = FieldTracker()
+
+    @receiver(post_save, sender=MiTramite)
+    def _audit(sender, instance, created, **kwargs):
+        if not created:
+            instance.log_update_event('Trámite actualizado')
+
+- `AuditTrackedMixin.audit_changes()` — ``{campo: {'old', 'new'}}`` del save en curso.
+- `AuditTrackedMixin.log_update_event(description)` — entrada ``update`` con el diff.
+"""
+from __future__ import annotations
+
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+def _jsonable(value):
+    # Fechas, UUID, Decimal y archivos como texto, igual que en `metadata`
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if hasattr(value, 'name') and hasattr(value, 'storage'):
+        return value.name or None
+    return json.loads(json.dumps(value, cls=DjangoJSONEncoder))
+
+
+class AuditTrackedMixin:
+    """Mixin de modelo: diffs de los campos de ``tracker`` para `log_event`.
+
+    El modelo debe declarar ``tracker = FieldTracker(...)``. Los valores
+    previos son los cargados al instanciar (o al último ``save()``), no los de
+    la BD en ese momento.
+    """
+    # Cambian en cada save y no aportan al diff
+    audit_ignored_fields = ('updated_at',)
+
+    def audit_changes(self) -> dict[str, dict]:
+        """Campos modificados respecto a la instantánea: ``{campo: {'old', 'new'}}``.
+
+        Dentro de ``pre_save`` / ``post_save`` describe el guardado en curso.
+        """
+        tracker = self.tracker
+        return {
+            field: {'old': _jsonable(old), 'new': _jsonable(tracker.get_field_value(field))}
+            for field, old in tracker.changed().items()
+            if field not in self.audit_ignored_fields
+        }
+
+    def log_update_event(self, description: str = '', metadata: dict | None = None):
+        """Registra una entrada ``update`` con el diff; None si nada cambió."""
+        changes = self.audit_changes()
+        if not changes:
+            return None
+        from .services import log_event
+
+        return log_event(
+            action='update',
+            resource=self,
+            description=description,
+            metadata={**(metadata or {}), 'changes': changes},
+        )
@@ -1,63 +1,241 @@
+import json
+from datetime import datetime, time, timedelta
+
+from django.apps import apps as django_apps
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from django_filters import rest_framework as filters
 from rest_framework import permissions, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError as DRFValidationError
 from rest_framework.response import Response
 
-from .models import AuditLog
+from apps.platform.utils.streaming import streaming_response
+
+from . import rollups, search
+from .exports import CONTENT_TYPES, EXPORT_FORMATS, export_filename, stream_export
+from .models import AuditActionChoices, AuditLog
+from .pagination import AuditLogCursorPagination
 from .serializers import AuditLogSerializer
+from .services import log_event, normalize_resource_type
+
+RESOURCE_OWNER_CACHE_KEY = 'tuho:audit:resource_owner'
+RESOURCE_OWNER_CACHE_TTL = 300  # 5 min
+# Campos que identifican al dueño de un recurso, en orden de prioridad
+RESOURCE_OWNER_FIELDS = ('user', 'created_by')
+
+
+def _resource_owner(Model, pk) -> tuple[bool, int | None]:
+    """``(existe, owner_id)`` del recurso con una sola consulta `values_list`.
+
+    El dueño de un recurso no cambia, así que el resultado se cachea.
+    """
+    key = f'{RESOURCE_OWNER_CACHE_KEY}:{Model._meta.label_lower}:{pk}'
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    attnames = []
+    for name in RESOURCE_OWNER_FIELDS:
+        try:
+            attnames.append(Model._meta.get_field(name).attname)
+        except FieldDoesNotExist:
+            continue
+    try:
+        row = Model._default_manager.filter(pk=pk).values_list('pk', *attnames).first()
+    except (ValueError, ValidationError):
+        row = None
+    if row is None:
+        return False, None
+    result = (True, next((value for value in row[1:] if value), None))
+    cache.set(key, result, RESOURCE_OWNER_CACHE_TTL)
+    return result
+
+
+# Rango por defecto de las series según el intervalo
+DEFAULT_SERIES_DAYS = {'hour': 7, 'day': 30, 'week': 182, 'month': 365}
+
+
+def _parse_bound(value: str | None, *, end: bool = False):
+    """Fecha u hora ISO → datetime aware; una fecha sola cubre el día completo."""
+    if not value:
+        return None
+    day = parse_date(value)
+    if day is not None:
+        parsed = datetime.combine(day + timedelta(days=1) if end else day, time.min)
+    else:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            raise ValueError(value)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
 
 
 class AuditLogFilter(filters.FilterSet):
     user = filters.NumberFilter(field_name='user_id')
     action = filters.CharFilter(field_name='action')
-    resource_type = filters.CharFilter(field_name='resource_type')
+    resource_type = filters.CharFilter(method='filter_resource_type')
     resource_id = filters.CharFilter(field_name='resource_id')
     date_from = filters.DateTimeFilter(field_name='created_at', lookup_expr='gte')
     date_to = filters.DateTimeFilter(field_name='created_at', lookup_expr='lte')
+    q = filters.CharFilter(method='filter_search')
+    metadata = filters.CharFilter(method='filter_metadata')
 
     class Meta:
         model = AuditLog
         fields = ['user', 'action', 'resource_type', 'resource_id']
 
+    def filter_resource_type(self, queryset, name, value):
+        return queryset.filter(resource_type=normalize_resource_type(value))
+
+    def filter_search(self, queryset, name, value):
+        # Texto libre en descripción y metadatos (ver `audit.search`)
+        return search.search(queryset, value)
+
+    def filter_metadata(self, queryset, name, value):
+        # Objeto JSON: entradas cuyo metadata contiene esos pares
+        try:
+            data = json.loads(value)
+        except ValueError:
+            data = None
+        if not isinstance(data, dict) or any('__' in key for key in data):
+            raise DRFValidationError({'metadata': 'Debe ser un objeto JSON, ej. {"reservation": "<id>"}.'})
+        return search.filter_metadata(queryset, data)
+
 
 class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
-    """Bitácora de auditoría — solo admins pueden consultar."""
+    """Bitácora de auditoría — solo admins pueden consultar.
+
+    Paginada por cursor (`AuditLogCursorPagination`): usar los links
+    ``next`` / ``previous``; ``?count=approx`` agrega un conteo estimado.
+    ``?q=`` busca texto libre en descripción y metadatos; ``?metadata=``
+    (objeto JSON) filtra por contenido de `metadata`.
+
+    ``GET /audit/logs/export/`` descarga el volcado completo (mismos filtros).
+    ``GET /audit/logs/timeseries/`` sirve series desde `AuditRollup`.
+
+    Alcance: todo lo que esté en ``audit_auditlog``. En SQLite las entradas
+    salen de la tabla al vencer ``audit_retention_days``, salvo que
+    ``AUDIT_SQLITE_ROTATION`` adelante la rotación (ver `audit.partitions`).
+    """
     queryset = AuditLog.objects.all().select_related('user')
     serializer_class = AuditLogSerializer
+    pagination_class = AuditLogCursorPagination
     permission_classes = [permissions.IsAuthenticated, permissions.IsAdminUser]
     filter_backends = [filters.DjangoFilterBackend]
     filterset_class = AuditLogFilter
 
+    @action(detail=False, methods=['get'], url_path='export', pagination_class=None)
+    def export(self, request):
+        """Volcado completo en streaming, con los mismos filtros del listado.
+
+        Query params: ``file_format=csv|jsonl`` (por defecto csv) y
+        ``gzip=1`` para comprimir al vuelo. La exportación queda registrada
+        en la bitácora como acción ``export``.
+        """
+        fmt = request.query_params.get('file_format', 'csv')
+        if fmt not in EXPORT_FORMATS:
+            return Response(
+                {'detail': f'file_format debe ser uno de: {", ".join(EXPORT_FORMATS)}.'},
+                status=400,
+            )
+        compress = request.query_params.get('gzip', '').lower() in ('1', 'true', 'yes')
+        queryset = self.filter_queryset(self.get_queryset())
+
+        log_event(
+            action=AuditActionChoices.EXPORT,
+            user=request.user,
+            resource_type='audit.AuditLog',
+            description='Exportación de la bitácora de auditoría',
+            metadata={
+                'format': fmt,
+                'gzip': compress,
+                'filters': {
+                    key: value for key, value in request.query_params.items()
+                    if key in self.filterset_class.base_filters
+                },
+            },
+        )
+
+        response = streaming_response(
+            request,
+            stream_export(queryset, fmt, compress),
+            content_type='application/gzip' if compress else CONTENT_TYPES[fmt],
+        )
+        response['Content-Disposition'] = f'attachment; filename="{export_filename(fmt, compress)}"'
+        return response
+
+    @action(detail=False, methods=['get'], url_path='timeseries', pagination_class=None)
+    def timeseries(self, request):
+        """Series de actividad para tableros, leídas de los resúmenes horarios.
+
+        Query params: ``interval`` (hour|day|week|month, por defecto day),
+        ``group_by`` (action|resource_type|user_type|module, por defecto
+        action), ``date_from`` / ``date_to`` (ISO; por defecto el último
+        período razonable para el intervalo) y filtros opcionales
+        ``action``, ``resource_type`` y ``user_type``.
+        """
+        params = request.query_params
+        interval = params.get('interval', 'day')
+        group_by = params.get('group_by', 'action')
+        if interval not in rollups.INTERVALS or group_by not in rollups.GROUP_BY:
+            return Response(
+                {'detail': f'interval: {"|".join(rollups.INTERVALS)}; group_by: {"|".join(rollups.GROUP_BY)}.'},
+                status=400,
+            )
+        try:
+            end = _parse_bound(params.get('date_to'), end=True) or timezone.now()
+            start = _parse_bound(params.get('date_from')) or end - timedelta(days=DEFAULT_SERIES_DAYS[interval])
+        except ValueError:
+            return Response({'detail': 'date_from / date_to deben tener formato ISO.'}, status=400)
+
+        resource_type = params.get('resource_type')
+        series = rollups.timeseries(
+            interval, start, end,
+            group_by=group_by,
+            filters={
+                'action': params.get('action'),
+                'resource_type': normalize_resource_type(resource_type) if resource_type else None,
+                'user_type': params.get('user_type'),
+            },
+        )
+        return Response({
+            'interval': interval,
+            'group_by': group_by,
+            'date_from': start,
+            'date_to': end,
+            'series': series,
+        })
+
     @action(detail=False, methods=['get'], url_path='resource/(?P<app_label>[^/.]+)/(?P<model>[^/.]+)/(?P<pk>[^/.]+)',
             permission_classes=[permissions.IsAuthenticated])
     def resource_history(self, request, app_label=None, model=None, pk=None):
-        """Historial de un recurso específico.
+        """Historial de un recurso específico, paginado por cursor.
 
         Accesible por el dueño del recurso o staff. El viewset global
         requiere admin, pero este endpoint permite al usuario ver los
         cambios de sus propios trámites.
         """
-        resource_type = f'{app_label}.{model}'
-        logs = AuditLog.objects.filter(
-            resource_type__iexact=resource_type,
-            resource_id=str(pk),
-        ).order_by('-created_at').select_related('user')
+        try:
+            Model = django_apps.get_model(app_label, model)
+        except LookupError:
+            Model = None
+        resource_type = Model._meta.label_lower if Model else normalize_resource_type(f'{app_label}.{model}')
 
         # Verifica permiso: staff o dueño
         if not request.user.is_staff:
-            from django.apps import apps as django_apps
-            try:
-                Model = django_apps.get_model(app_label, model)
-                resource = Model.objects.filter(pk=pk).first()
-            except LookupError:
-                resource = None
-            if not resource:
-                return Response([], status=404)
-            owner_id = (
-                getattr(resource, 'user_id', None)
-                or getattr(resource, 'created_by_id', None)
-            )
+            exists, owner_id = _resource_owner(Model, pk) if Model else (False, None)
+            if not exists:
+                return Response({'detail': 'Recurso no encontrado.'}, status=404)
             if owner_id != request.user.id:
                 return Response({'detail': 'No autorizado.'}, status=403)
 
-        return Response(AuditLogSerializer(logs[:200], many=True).data)
+        logs = AuditLog.objects.filter(
+            resource_type=resource_type,
+            resource_id=str(pk),
+        ).select_related('user')
+        page = self.paginate_queryset(logs)
+        return self.get_paginated_response(AuditLogSerializer(page, many=True).data)
@@ -0,0 +1,236 @@
+"""
+Escritura diferida de la bitácora de auditoría.
+
+`log_event` ya no hace un INSERT por evento dentro del request: las entradas
+se acumulan y se escriben juntas con un `bulk_create`.
+
+- Dentro de una transacción, por savepoint: se escriben con
+  `transaction.on_commit` (si la transacción se revierte, sus eventos se
+  descartan, igual que el INSERT síncrono de antes).
+- Fuera de transacción, durante un request: se escriben al terminar el
+  request (`AuditContextMiddleware` llama a `begin_request` / `end_request`).
+- Fuera de ambos (shell, Celery, cron): se despachan de inmediato.
+
+`settings.AUDIT_WRITE_MODE` decide cómo se despacha cada lote:
+
+- ``buffered`` (por defecto): `bulk_create` en el mismo proceso.
+- ``celery``: se encola la tarea ``audit.write_batch``; si el broker no
+  responde se escribe directamente.
+- ``spool``: se agrega al archivo JSONL ``AUDIT_SPOOL_PATH``; lo vacía
+  `drain_spool()` (tarea ``audit.drain_spool`` en beat o
+  ``manage.py drain_audit_spool``).
+- ``sync``: comportamiento anterior, un INSERT inmediato por evento.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import weakref
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .models import AuditLog
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+WRITE_MODES = ('buffered', 'celery', 'spool', 'sync')
+BATCH_SIZE = 500
+
+# Campos que viajan en los lotes serializados (Celery / spool)
+_ROW_FIELDS = (
+    'user_id', 'action', 'resource_type', 'resource_id', 'description',
+    'metadata', 'ip_address', 'user_agent',
+)
+
+# Buffer del request actual (None fuera de un request). `ContextVar` en vez de
+# `threading.local`: bajo ASGI varios requests comparten hilo.
+_request_buffer: ContextVar = ContextVar('audit_request_buffer', default=None)
+
+
+def get_write_mode() -> str:
+    mode = getattr(settings, 'AUDIT_WRITE_MODE', 'buffered')
+    return mode if mode in WRITE_MODES else 'buffered'
+
+
+# ---------------------------------------------------------------------------
+# Serialización de lotes
+# ---------------------------------------------------------------------------
+
+def entry_to_row(entry: AuditLog) -> dict:
+    row = {name: getattr(entry, name) for name in _ROW_FIELDS}
+    row['created_at'] = entry.created_at.isoformat()
+    return row
+
+
+def row_to_entry(row: dict) -> AuditLog:
+    data = {name: row.get(name) for name in _ROW_FIELDS}
+    data['metadata'] = data['metadata'] or {}
+    data['description'] = data['description'] or ''
+    data['user_agent'] = data['user_agent'] or ''
+    entry = AuditLog(**data)
+    if row.get('created_at'):
+        entry.created_at = parse_datetime(row['created_at'])
+    return entry
+
+
+# ---------------------------------------------------------------------------
+# Despacho
+# ---------------------------------------------------------------------------
+
+def write_entries(entries: list[AuditLog]) -> list[AuditLog]:
+    """Inserta un lote de entradas con `bulk_create`."""
+    if not entries:
+        return []
+    return AuditLog.objects.bulk_create(entries, batch_size=BATCH_SIZE)
+
+
+def _append_to_spool(rows: list[dict]) -> None:
+    path = Path(settings.AUDIT_SPOOL_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    payload = ''.join(json.dumps(row, cls=DjangoJSONEncoder) + '\n' for row in rows)
+    while True:
+        with open(path, 'a', encoding='utf-8') as fh:
+            if fcntl:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                # Si `drain_spool` renombró el archivo mientras esperábamos el
+                # lock, escribir en el nuevo.
+                try:
+                    if os.fstat(fh.fileno()).st_ino != os.stat(path).st_ino:
+                        continue
+                except FileNotFoundError:
+                    continue
+            fh.write(payload)
+            fh.flush()
+            return
+
+
+def dispatch(entries: list[AuditLog]) -> None:
+    """Envía un lote al destino configurado en `AUDIT_WRITE_MODE`."""
+    if not entries:
+        return
+    mode = get_write_mode()
+    try:
+        if mode == 'celery':
+            from .tasks import write_audit_batch_task
+
+            write_audit_batch_task.delay([entry_to_row(entry) for entry in entries])
+            return
+        if mode == 'spool':
+            _append_to_spool([entry_to_row(entry) for entry in entries])
+            return
+    except Exception as exc:  # noqa: BLE001
+        logger.warning('Despacho de auditoría (%s) falló, se escribe en BD: %s', mode, exc)
+    write_entries(entries)
+
+
+def drain_spool(batch_size: int = BATCH_SIZE) -> int:
+    """Vuelca el archivo de spool a la BD. Retorna cuántas entradas insertó."""
+    path = Path(settings.AUDIT_SPOOL_PATH)
+    if not path.exists():
+        return 0
+    draining = path.with_name(f'{path.name}.{os.getpid()}.draining')
+    with open(path, 'a', encoding='utf-8') as fh:
+        if fcntl:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+        os.replace(path, draining)
+
+    total = 0
+    batch: list[AuditLog] = []
+    with open(draining, encoding='utf-8') as fh:
+        for line in fh:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                batch.append(row_to_entry(json.loads(line)))
+            except (ValueError, TypeError) as exc:
+                logger.error('Línea de spool de auditoría inválida descartada: %s', exc)
+                continue
+            if len(batch) >= batch_size:
+                total += len(write_entries(batch))
+                batch = []
+    total += len(write_entries(batch))
+    draining.unlink()
+    return total
+
+
+# ---------------------------------------------------------------------------
+# Buffers
+# ---------------------------------------------------------------------------
+
+class _TransactionBuffer:
+    """Entradas registradas dentro de un mismo savepoint."""
+
+    def __init__(self, buffers: dict, key):
+        self.entries: list[AuditLog] = []
+        self._buffers = buffers
+        self._key = key
+        self._ref = weakref.ref(self)
+
+    def flush(self) -> None:
+        if self._buffers.get(self._key) is self._ref:
+            del self._buffers[self._key]
+        dispatch(self.entries)
+
+
+def _enqueue_in_transaction(entries: list[AuditLog], connection) -> None:
+    # Un buffer por savepoint, con su `flush` registrado en `on_commit`. Al
+    # revertir el savepoint (o la transacción) Django descarta ese callback, que
+    # es la única referencia fuerte al buffer: el registro guarda una débil, así
+    # que un buffer descartado deja de resolverse y no se reutiliza.
+    buffers = connection.__dict__.setdefault('_audit_buffers', {})
+    key = tuple(connection.savepoint_ids)
+    ref = buffers.get(key)
+    buffer = ref() if ref is not None else None
+    if buffer is None:
+        for stale_key in [k for k, r in buffers.items() if r() is None]:
+            del buffers[stale_key]
+        buffer = _TransactionBuffer(buffers, key)
+        buffers[key] = buffer._ref
+        transaction.on_commit(buffer.flush, robust=False)
+    buffer.entries.extend(entries)
+
+
+def begin_request() -> None:
+    """Abre el buffer del request actual (lo llama el middleware)."""
+    _request_buffer.set([])
+
+
+def end_request() -> None:
+    """Escribe lo acumulado en el request y cierra el buffer."""
+    entries = _request_buffer.get()
+    _request_buffer.set(None)
+    if entries:
+        try:
+            dispatch(entries)
+        except Exception as exc:  # noqa: BLE001
+            logger.exception('Error escribiendo auditoría del request: %s', exc)
+
+
+def enqueue(entries: list[AuditLog]) -> None:
+    """Registra entradas según el contexto (transacción, request o inmediato)."""
+    if not entries:
+        return
+    if get_write_mode() == 'sync':
+        write_entries(entries)
+        return
+    connection = transaction.get_connection()
+    if connection.in_atomic_block:
+        _enqueue_in_transaction(entries, connection)
+        return
+    request_buffer = _request_buffer.get()
+    if request_buffer is not None:
+        request_buffer.extend(entries)
+        return
+    dispatch(entries)
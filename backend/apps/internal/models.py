@@ -1,5 +1,8 @@
 from django.db import models
 from django.utils.translation import gettext_lazy as _
+from model_utils import FieldTracker
+
+from apps.audit.tracking import AuditTrackedMixin
 from apps.platform.models import Procedure, User, Department, Area
 
 class Guest(models.Model):
@@ -23,7 +26,7 @@ class FeedingDays(models.Model):
     def __str__(self):
         return f"Alimentación - {self.date}"
 
-class FeedingProcedure(Procedure):
+class FeedingProcedure(AuditTrackedMixin, Procedure):
     FEEDING_CHOICES = [("RESTAURANT", "Restaurante Especializado"), ("HOTELITO", "Hotelito de posgrado de la UHO")]
     feeding_type = models.CharField(max_length=20, choices=FEEDING_CHOICES, verbose_name=_("Tipo de alimentación"), help_text=_("Tipo de servicio de alimentación solicitado"))
     start_day = models.DateField(verbose_name=_("Fecha de inicio"), help_text=_("Fecha de inicio del servicio"))
@@ -32,6 +35,8 @@ class FeedingProcedure(Procedure):
     amount = models.IntegerField(verbose_name=_("Cantidad de personas"), help_text=_("Número de personas a alimentar"))
     feeding_days = models.ManyToManyField(FeedingDays, related_name="feeding_procedures", verbose_name=_("Días de alimentación"), help_text=_("Días específicos de alimentación"))
 
+    tracker = FieldTracker()
+
     class Meta:
         verbose_name = _("Solicitud de Alimentación")
         verbose_name_plural = _("Solicitudes de Alimentación")
@@ -40,7 +45,7 @@ class FeedingProcedure(Procedure):
     def __str__(self):
         return f"Alimentación - {self.user.username} ({self.get_state_display()})"
 
-class AccommodationProcedure(Procedure):
+class AccommodationProcedure(AuditTrackedMixin, Procedure):
     ACCOMMODATION_CHOICES = [('HOTEL', 'Instalaciones Hoteleras'), ('POSGRADO', 'Hotelito de posgrado de la UHO')]
     accommodation_type = models.CharField(max_length=20, choices=ACCOMMODATION_CHOICES, verbose_name=_("Tipo de alojamiento"), help_text=_("Tipo de alojamiento solicitado"))
     start_day = models.DateField(verbose_name=_("Fecha de inicio"), help_text=_("Fecha de inicio del alojamiento"))
@@ -49,6 +54,8 @@ class AccommodationProcedure(Procedure):
     guests = models.ManyToManyField(Guest, related_name="accommodation_procedures", verbose_name=_("Huéspedes"), help_text=_("Huéspedes incluidos en el alojamiento"))
     feeding_days = models.ManyToManyField(FeedingDays, blank=True, related_name="accommodation_procedures", verbose_name=_("Días de alimentación"), help_text=_("Días en los que se solicita alimentación"))
 
+    tracker = FieldTracker()
+
     class Meta:
         verbose_name = _("Solicitud de Alojamiento")
         verbose_name_plural = _("Solicitudes de Alojamiento")
@@ -68,7 +75,7 @@ class TransportProcedureType(models.Model):
     def __str__(self):
         return self.name
 
-class TransportProcedure(Procedure):
+class TransportProcedure(AuditTrackedMixin, Procedure):
     procedure_type = models.ForeignKey(TransportProcedureType, on_delete=models.SET_NULL, null=True, related_name="transport_procedures", verbose_name=_("Tipo de transporte"), help_text=_("Tipo de procedimiento de transporte"))
     departure_time = models.DateTimeField(verbose_name=_("Hora de salida"), help_text=_("Fecha y hora de salida"))
     return_time = models.DateTimeField(verbose_name=_("Hora de regreso"), help_text=_("Fecha y hora de regreso"))
@@ -79,6 +86,8 @@ class TransportProcedure(Procedure):
     plate = models.CharField(max_length=10, blank=True, null=True, verbose_name=_("Placa del vehículo"), help_text=_("Placa del vehículo asignado"))
     round_trip = models.BooleanField(default=False, verbose_name=_("Viaje redondo"), help_text=_("Indica si es un viaje de ida y vuelta"))
 
+    tracker = FieldTracker()
+
     class Meta:
         verbose_name = _("Solicitud de Transporte")
         verbose_name_plural = _("Solicitudes de Transporte")
@@ -109,12 +118,14 @@ class MaintancePriority(models.Model):
     def __str__(self):
         return self.name
 
-class MaintanceProcedure(Procedure):
+class MaintanceProcedure(AuditTrackedMixin, Procedure):
     description = models.TextField(verbose_name=_("Descripción del problema"), help_text=_("Descripción detallada del problema o mantenimiento requerido"))
     picture = models.ImageField(upload_to="maintenance/images/", blank=True, null=True, verbose_name=_("Fotografía"), help_text=_("Fotografía del problema o área a mantener"))
     procedure_type = models.ForeignKey(MaintanceProcedureType, on_delete=models.SET_NULL, null=True, related_name="maintenance_procedures", verbose_name=_("Tipo de mantenimiento"), help_text=_("Tipo de procedimiento de mantenimiento"))
     priority = models.ForeignKey(MaintancePriority, on_delete=models.SET_NULL, null=True, related_name="maintenance_procedures", verbose_name=_("Prioridad"), help_text=_("Nivel de prioridad del mantenimiento"))
 
+    tracker = FieldTracker()
+
     class Meta:
         verbose_name = _("Solicitud de Mantenimiento")
         verbose_name_plural = _("Solicitudes de Mantenimiento")
@@ -2,8 +2,9 @@
 Signals para trámites internos.
 
 - Limpia imagen de mantenimiento al eliminar
-- Captura el estado previo en pre_save
-- En post_save dispara notificación + audit log si cambió el state
+- Valida el motivo de rechazo en pre_save
+- En post_save dispara notificación + audit log si cambió el state (el
+  estado previo sale del `tracker` del modelo, ver `audit.tracking`)
 """
 from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
@@ -28,18 +29,9 @@ def delete_picture(sender, instance, **kwargs):
 
 
 @receiver(pre_save)
-def _capture_previous_state(sender, instance, **kwargs):
+def _validate_rejection_reason(sender, instance, **kwargs):
     if sender not in TRACKED_MODELS:
         return
-    if not instance.pk:
-        instance._previous_state = None
-        return
-    try:
-        old = sender.objects.get(pk=instance.pk)
-        instance._previous_state = old.state
-    except sender.DoesNotExist:
-        instance._previous_state = None
-
     # Validación: motivo de rechazo obligatorio
     from django.core.exceptions import ValidationError
     if instance.state == 'RECHAZADO' and not (instance.observation or '').strip():
@@ -51,8 +43,7 @@ def _handle_state_change(sender, instance, created, **kwargs):
     if sender not in TRACKED_MODELS:
         return
 
-    previous = getattr(instance, '_previous_state', None)
-    current = getattr(instance, 'state', None)
+    current = instance.state
 
     if created:
         log_event(
@@ -63,16 +54,21 @@ def _handle_state_change(sender, instance, created, **kwargs):
         )
         return
 
-    if previous is not None and previous != current:
-        log_event(
-            action='state_change',
-            resource=instance,
-            description=f'{sender.__name__} cambió de estado',
-            metadata={'old_state': previous, 'new_state': current},
-        )
-        notify_state_change(
-            instance,
-            old_state=previous,
-            new_state=current,
-            reason=getattr(instance, 'observation', '') or '',
-        )
+    changes = instance.audit_changes()
+    if 'state' not in changes:
+        instance.log_update_event(f'{sender.__name__} actualizado')
+        return
+
+    previous = changes['state']['old']
+    log_event(
+        action='state_change',
+        resource=instance,
+        description=f'{sender.__name__} cambió de estado',
+        metadata={'old_state': previous, 'new_state': current, 'changes': changes},
+    )
+    notify_state_change(
+        instance,
+        old_state=previous,
+        new_state=current,
+        reason=getattr(instance, 'observation', '') or '',
+    )
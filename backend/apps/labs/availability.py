@@ -0,0 +1,334 @@
+"""
+Índice de intervalos en memoria para verificar disponibilidad de locales.
+
+`Local.is_available()` se invoca desde `LocalReservation.clean()`, desde el
+endpoint `/locals/{id}/availability/` y desde `LocalDetailSerializer`. En
+semanas de matrícula cada verificación era una consulta de solapamiento a BD.
+
+Este módulo mantiene, por local, una lista ordenada de los intervalos de las
+reservas que bloquean el local (PENDIENTE / APROBADA / EN_CURSO) y la guarda
+en el cache compartido de Django. Las verificaciones de solapamiento se
+resuelven con búsqueda binaria sobre esa lista, sin tocar la BD.
+
+En PostgreSQL la garantía final es una restricción de exclusión GiST sobre
+``(local, tstzrange(start_time, end_time))`` para los estados que bloquean
+(migración 0004); `database_prevents_overlaps()` indica si está disponible y
+`is_overlap_violation()` reconoce el error que produce.
+
+Invalidación: cada local tiene un contador de generación en cache. Los signals
+de `LocalReservation` (post_save / post_delete) lo incrementan, de modo que la
+siguiente verificación reconstruye el índice con una sola consulta. Quien
+modifique reservas con `QuerySet.update()` / `bulk_create()` (que no disparan
+signals) debe llamar a `invalidate_local_index()` explícitamente.
+
+El contador sólo es visible para todos los workers si el cache es compartido
+(Redis, ``CACHE_URL``). Con ``LocMemCache`` cada proceso tendría su propia
+generación y podría responder desde un índice viejo, así que con
+``LABS_INTERVAL_INDEX=auto`` el índice sólo se usa con un cache compartido
+(`index_enabled()`); si no, las verificaciones van a la BD.
+"""
+from __future__ import annotations
+
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .enums import ReservationStateEnum
+
+
+# Estados que ocupan el local (coinciden con los de `Local.is_available`)
+BLOCKING_STATES = (
+    ReservationStateEnum.APROBADA,
+    ReservationStateEnum.EN_CURSO,
+    ReservationStateEnum.PENDIENTE,
+)
+
+INTERVAL_INDEX_CACHE_KEY = 'tuho:labs:interval_index'
+INTERVAL_INDEX_GEN_KEY = 'tuho:labs:interval_index_gen'
+INTERVAL_INDEX_CACHE_TTL = 600  # 10 min
+
+OVERLAP_CONSTRAINT_NAME = 'labs_reservation_no_overlap'
+EXCLUSION_VIOLATION_SQLSTATE = '23P01'
+
+
+@dataclass
+class LocalIntervalIndex:
+    """Intervalos ocupados de un local, ordenados por inicio.
+
+    Los instantes se guardan como timestamps POSIX (float) para que el objeto
+    sea compacto al serializarse en cache. ``max_ends[i]`` es el máximo de
+    ``ends[0..i]``: permite decidir en O(log n) si algún intervalo que empieza
+    antes de ``end`` termina después de ``start``, aunque existan intervalos
+    solapados entre sí (p.ej. datos heredados).
+
+    Sólo contiene reservas con ``end_time > horizon``; las consultas que
+    empiezan antes de ``horizon`` no pueden responderse con el índice.
+    """
+
+    horizon: float
+    starts: list[float] = field(default_factory=list)
+    ends: list[float] = field(default_factory=list)
+    ids: list[str] = field(default_factory=list)
+    max_ends: list[float] = field(default_factory=list)
+
+    @classmethod
+    def from_intervals(cls, intervals, *, horizon: float) -> 'LocalIntervalIndex':
+        """Construye el índice a partir de tuplas ``(start, end, id)``."""
+        index = cls(horizon=horizon)
+        running_max = float('-inf')
+        for start, end, pk in sorted(intervals, key=lambda item: item[0]):
+            running_max = max(running_max, end)
+            index.starts.append(start)
+            index.ends.append(end)
+            index.ids.append(pk)
+            index.max_ends.append(running_max)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def covers(self, start: float) -> bool:
+        """Indica si una consulta que empieza en ``start`` es respondible."""
+        return start >= self.horizon
+
+    def conflicts(self, start: float, end: float, exclude_id: str | None = None) -> list[str]:
+        """IDs de las reservas que se solapan con ``[start, end)``.
+
+        Costo O(log n + k), donde k es la cantidad de candidatos recorridos.
+        """
+        i = bisect_left(self.starts, end) - 1
+        found = []
+        while i >= 0 and self.max_ends[i] > start:
+            if self.ends[i] > start and self.ids[i] != exclude_id:
+                found.append(self.ids[i])
+            i -= 1
+        return found
+
+    def overlaps(self, start: float, end: float, exclude_id: str | None = None) -> bool:
+        """True si algún intervalo se solapa con ``[start, end)``."""
+        i = bisect_left(self.starts, end) - 1
+        if i < 0 or self.max_ends[i] <= start:
+            return False
+        if exclude_id is None:
+            return True
+        return bool(self.conflicts(start, end, exclude_id=exclude_id))
+
+
+def _gen_key(local_id) -> str:
+    return f'{INTERVAL_INDEX_GEN_KEY}:{local_id}'
+
+
+def _index_key(local_id, generation: int) -> str:
+    return f'{INTERVAL_INDEX_CACHE_KEY}:{local_id}:{generation}'
+
+
+def _initial_generation() -> int:
+    # Basada en el reloj: si el cache expulsa el contador, la nueva generación
+    # no coincide con ninguna anterior (evita resucitar índices viejos).
+    return time.time_ns() // 1000
+
+
+def _current_generation(local_id) -> int:
+    return cache.get_or_set(_gen_key(local_id), _initial_generation, None)
+
+
+def get_local_generations(local_ids) -> dict:
+    """Generación actual de varios locales con una sola lectura de cache.
+
+    La generación cambia con cada alta/edición/baja de reservas del local (y
+    del propio local); sirve como versión para otras proyecciones cacheadas.
+    """
+    keys = {_gen_key(local_id): local_id for local_id in local_ids}
+    found = cache.get_many(list(keys))
+    missing = [key for key in keys if key not in found]
+    for key in missing:
+        found[key] = cache.get_or_set(key, _initial_generation, None)
+    return {local_id: found[key] for key, local_id in keys.items()}
+
+
+def _bump_generation(local_id) -> None:
+    key = _gen_key(local_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_generation(), None)
+
+
+def invalidate_local_index(local_id) -> None:
+    """Descarta el índice cacheado de un local.
+
+    Se invalida inmediatamente y, si hay una transacción abierta, otra vez al
+    hacer commit: así un índice reconstruido por otro request antes del
+    commit (sin ver las filas nuevas) no sobrevive.
+    """
+    if local_id is None:
+        return
+    _bump_generation(local_id)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: _bump_generation(local_id))
+
+
+def build_local_index(local_id) -> LocalIntervalIndex:
+    """Carga desde BD los intervalos ocupados vigentes de un local."""
+    from .models import LocalReservation
+
+    now = timezone.now()
+    rows = LocalReservation.objects.filter(
+        local_id=local_id,
+        state__in=BLOCKING_STATES,
+        end_time__gt=now,
+    ).values_list('start_time', 'end_time', 'id')
+    return LocalIntervalIndex.from_intervals(
+        ((start.timestamp(), end.timestamp(), str(pk)) for start, end, pk in rows),
+        horizon=now.timestamp(),
+    )
+
+
+def get_local_index(local_id) -> LocalIntervalIndex:
+    """Retorna el índice del local desde cache, reconstruyéndolo si falta.
+
+    Dentro de una transacción el índice se construye pero no se guarda: podría
+    reflejar filas que todavía no son visibles para los demás.
+    """
+    generation = _current_generation(local_id)
+    key = _index_key(local_id, generation)
+    index = cache.get(key)
+    if index is None:
+        index = build_local_index(local_id)
+        if not transaction.get_connection().in_atomic_block:
+            cache.set(key, index, INTERVAL_INDEX_CACHE_TTL)
+    return index
+
+
+def index_enabled() -> bool:
+    """Indica si las verificaciones pueden resolverse con el índice cacheado."""
+    mode = str(getattr(settings, 'LABS_INTERVAL_INDEX', 'auto')).lower()
+    if mode in ('1', 'true', 'yes', 'on'):
+        return True
+    if mode in ('0', 'false', 'no', 'off'):
+        return False
+    # Un cache por proceso no ve las invalidaciones de los demás workers
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache))
+
+
+def find_conflicts(local_id, start_time, end_time, exclude_id=None) -> list[str] | None:
+    """IDs de reservas en conflicto usando el índice, o ``None`` si no aplica.
+
+    Devuelve ``None`` cuando la consulta no puede responderse desde cache
+    (índice deshabilitado, transacción abierta o rango anterior al horizonte
+    del índice); el caller debe entonces consultar la BD.
+    """
+    if not index_enabled() or transaction.get_connection().in_atomic_block:
+        return None
+    index = get_local_index(local_id)
+    start, end = start_time.timestamp(), end_time.timestamp()
+    if not index.covers(start):
+        return None
+    return index.conflicts(start, end, exclude_id=str(exclude_id) if exclude_id else None)
+
+
+def is_slot_free(local_id, start_time, end_time, exclude_id=None) -> bool | None:
+    """True/False si el rango está libre según el índice; ``None`` si no aplica."""
+    if not index_enabled() or transaction.get_connection().in_atomic_block:
+        return None
+    index = get_local_index(local_id)
+    start, end = start_time.timestamp(), end_time.timestamp()
+    if not index.covers(start):
+        return None
+    return not index.overlaps(start, end, exclude_id=str(exclude_id) if exclude_id else None)
+
+
+def database_prevents_overlaps(using: str = 'default') -> bool:
+    """True si la BD aplica la restricción de exclusión (sólo PostgreSQL).
+
+    En SQLite no existe: los callers deben mantener la verificación previa
+    con `Local.is_available()`.
+    """
+    return connections[using].vendor == 'postgresql'
+
+
+def is_overlap_violation(exc: Exception) -> bool:
+    """Indica si un `IntegrityError` proviene de la restricción de solapamiento."""
+    cause = getattr(exc, '__cause__', None)
+    sqlstate = getattr(cause, 'pgcode', None) or getattr(cause, 'sqlstate', None)
+    return sqlstate == EXCLUSION_VIOLATION_SQLSTATE or OVERLAP_CONSTRAINT_NAME in str(exc)
+
+
+def sweep_conflicts(candidates, busy) -> dict:
+    """Detecta conflictos entre intervalos candidatos y ocupados (sweep-line).
+
+    Args:
+        candidates: secuencia de ``(start, end, key)`` a validar.
+        busy: secuencia de ``(start, end, id)`` ya ocupados.
+
+    Returns:
+        ``{key: [ids]}`` con los candidatos en conflicto. Un candidato también
+        choca con otro candidato aceptado que lo solape (gana el primero).
+
+    Costo O((n + m) log(n + m)); los intervalos son semiabiertos ``[start, end)``.
+    """
+    events = []
+    for start, end, pk in busy:
+        events.append((start, 1, False, pk))
+        events.append((end, 0, False, pk))
+    for start, end, key in candidates:
+        events.append((start, 1, True, key))
+        events.append((end, 0, True, key))
+    # A igual instante los fines se procesan antes que los inicios
+    events.sort(key=lambda event: (event[0], event[1]))
+
+    active_busy: set = set()
+    active_candidates: set = set()
+    conflicts: dict = {}
+    for _, is_start, is_candidate, key in events:
+        if not is_start:
+            (active_candidates if is_candidate else active_busy).discard(key)
+            continue
+        if is_candidate:
+            blockers = list(active_busy) + [
+                other for other in active_candidates if other not in conflicts
+            ]
+            if blockers:
+                conflicts[key] = blockers
+            active_candidates.add(key)
+        else:
+            for other in active_candidates:
+                conflicts.setdefault(other, []).append(key)
+            active_busy.add(key)
+    return conflicts
+
+
+def free_gaps(busy, window_start, window_end, min_duration, limit: int | None = None) -> list[tuple]:
+    """Huecos libres de al menos ``min_duration`` dentro de una ventana.
+
+    Args:
+        busy: intervalos ``(start, end)`` ocupados, ordenados por inicio.
+        window_start / window_end: límites de la búsqueda.
+        min_duration: duración mínima del hueco (``timedelta``).
+        limit: máximo de huecos a devolver (``None`` = todos).
+
+    Returns:
+        Lista de ``(start, end)`` libres, en orden cronológico.
+    """
+    gaps = []
+    cursor = window_start
+    for start, end in busy:
+        if limit is not None and len(gaps) >= limit:
+            return gaps
+        if end <= cursor:
+            continue
+        if start >= window_end:
+            break
+        if start - cursor >= min_duration:
+            gaps.append((cursor, start))
+        cursor = max(cursor, end)
+    if (limit is None or len(gaps) < limit) and window_end - cursor >= min_duration:
+        gaps.append((cursor, window_end))
+    return gaps
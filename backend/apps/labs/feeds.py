@@ -0,0 +1,266 @@
+"""
+Feeds iCal de suscripción (por local y por usuario).
+
+Los clientes de calendario (Outlook, Thunderbird, Google) consultan la URL
+cada pocos minutos y no envían cookies ni JWT, así que la URL lleva un token
+firmado con el id del usuario y su clave de feed (`CalendarFeedKey`). Al rotar
+la clave dejan de valer todas las URLs emitidas antes (URL filtrada, equipo
+perdido).
+
+El feed se genera evento a evento (streaming) y el cuerpo completo se guarda
+en cache al terminar. El ETag depende sólo de versiones en cache (generación
+del local o del usuario) y del día, y el token se resuelve desde cache
+(`feed_token_user`, por clave de feed): un sondeo sin cambios se responde con
+304 sin tocar la BD. La primera resolución de cada token sí consulta la BD, y
+la desactivación de un usuario tarda hasta ``FEED_CACHE_TTL`` en cortar sus
+feeds (rotar la clave los corta al instante).
+
+- `make_feed_token(user)` / `read_feed_token(token)` / `feed_token_user(token)`.
+- `rotate_feed_key(user)` — revoca los tokens emitidos.
+- `invalidate_user_feed(user_ids)` — llamar al modificar reservas de esos
+  usuarios sin signals (`update()` / inserciones en bloque).
+- `local_feed_etag(local_id)` / `user_feed_etag(user_id)`.
+- `stream_local_feed(local, etag)` / `stream_user_feed(user, etag)` —
+  iteradores de bytes.
+"""
+from __future__ import annotations
+
+import hashlib
+import secrets
+from collections import namedtuple
+from datetime import datetime, time, timedelta
+
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .availability import _initial_generation, get_local_generations
+from .enums import ReservationPurposeEnum, ReservationStateEnum
+
+FEED_TOKEN_SALT = 'labs.ical-feed'
+FEED_CACHE_KEY = 'tuho:labs:ical_feed'
+FEED_USER_GEN_KEY = 'tuho:labs:ical_feed_user_gen'
+FEED_TOKEN_CACHE_KEY = 'tuho:labs:ical_feed_token'
+FEED_CACHE_TTL = 900  # 15 min, el intervalo típico de sondeo
+
+# Ventana publicada, relativa al inicio del día actual
+FEED_PAST_DAYS = 30
+FEED_FUTURE_DAYS = 180
+
+LOCAL_FEED_STATES = (
+    ReservationStateEnum.APROBADA,
+    ReservationStateEnum.EN_CURSO,
+    ReservationStateEnum.FINALIZADA,
+)
+USER_FEED_STATES = LOCAL_FEED_STATES + (
+    ReservationStateEnum.PENDIENTE,
+    ReservationStateEnum.CANCELADA,
+)
+
+# Estado de la reserva → STATUS de iCal (RFC 5545 §3.8.1.11)
+ICAL_STATUS = {
+    ReservationStateEnum.PENDIENTE: 'TENTATIVE',
+    ReservationStateEnum.CANCELADA: 'CANCELLED',
+}
+
+_FEED_FIELDS = (
+    'id', 'start_time', 'end_time', 'state', 'purpose', 'purpose_detail',
+    'updated_at', 'local__code', 'local__name',
+)
+
+
+def _feed_key(user) -> str:
+    from .models import CalendarFeedKey
+
+    return CalendarFeedKey.objects.get_or_create(user=user)[0].key
+
+
+def make_feed_token(user) -> str:
+    """Token firmado (sin expiración, revocable) para las URLs de suscripción."""
+    return signing.Signer(salt=FEED_TOKEN_SALT).sign(f'{user.pk}:{_feed_key(user)}')
+
+
+def _token_cache_key(user_id, key: str) -> str:
+    # La clave de feed forma parte de la clave de cache: rotarla deja sin
+    # efecto lo cacheado para la clave anterior
+    digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+    return f'{FEED_TOKEN_CACHE_KEY}:{user_id}:{digest}'
+
+
+def rotate_feed_key(user) -> str:
+    """Cambia la clave de feed del usuario y retorna un token nuevo."""
+    from .models import CalendarFeedKey
+
+    old_key = CalendarFeedKey.objects.filter(user=user).values_list('key', flat=True).first()
+    CalendarFeedKey.objects.update_or_create(user=user, defaults={'key': secrets.token_urlsafe(24)})
+    if old_key:
+        cache.delete(_token_cache_key(user.pk, old_key))
+    return make_feed_token(user)
+
+
+def read_feed_token(token) -> tuple[str, str] | None:
+    """``(id del usuario, clave)`` del token, o ``None`` si la firma no es válida."""
+    if not token:
+        return None
+    try:
+        value = signing.Signer(salt=FEED_TOKEN_SALT).unsign(token)
+    except signing.BadSignature:
+        return None
+    user_id, _, key = value.rpartition(':')
+    return (user_id, key) if user_id and key else None
+
+
+# Lo que necesitan los feeds del usuario del token (sin la fila completa)
+FeedUser = namedtuple('FeedUser', ('pk', 'user_type'))
+
+
+def feed_token_user(token) -> FeedUser | None:
+    """Usuario activo del token si su clave sigue vigente, o ``None``.
+
+    La resolución se cachea ``FEED_CACHE_TTL`` por (usuario, clave).
+    """
+    from django.contrib.auth import get_user_model
+
+    parsed = read_feed_token(token)
+    if parsed is None:
+        return None
+    user_id, key = parsed
+    cache_key = _token_cache_key(user_id, key)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return FeedUser(*cached)
+    row = get_user_model().objects.filter(
+        pk=user_id, is_active=True, calendar_feed_key__key=key,
+    ).values_list('pk', 'user_type').first()
+    if row is None:
+        return None
+    cache.set(cache_key, tuple(row), FEED_CACHE_TTL)
+    return FeedUser(*row)
+
+
+def _user_gen_key(user_id) -> str:
+    return f'{FEED_USER_GEN_KEY}:{user_id}'
+
+
+def _bump_user_generation(user_id) -> None:
+    key = _user_gen_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _initial_generation(), None)
+
+
+def invalidate_user_feed(user_ids) -> None:
+    """Invalida el feed personal de los usuarios indicados.
+
+    Igual que `invalidate_local_index`, vuelve a invalidar al hacer commit si
+    hay una transacción abierta.
+    """
+    user_ids = {user_id for user_id in user_ids if user_id is not None}
+    for user_id in user_ids:
+        _bump_user_generation(user_id)
+    if user_ids and transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: [_bump_user_generation(user_id) for user_id in user_ids])
+
+
+def _feed_window() -> tuple[datetime, datetime, str]:
+    today = timezone.localdate()
+    start = timezone.make_aware(datetime.combine(today - timedelta(days=FEED_PAST_DAYS), time.min))
+    end = timezone.make_aware(datetime.combine(today + timedelta(days=FEED_FUTURE_DAYS), time.min))
+    return start, end, today.isoformat()
+
+
+def _etag(*parts) -> str:
+    return '"%s"' % hashlib.md5('|'.join(str(p) for p in parts).encode()).hexdigest()
+
+
+def local_feed_etag(local_id) -> str:
+    generation = get_local_generations([local_id])[local_id]
+    return _etag('local', local_id, generation, _feed_window()[2])
+
+
+def user_feed_etag(user_id) -> str:
+    generation = cache.get_or_set(_user_gen_key(user_id), _initial_generation, None)
+    return _etag('user', user_id, generation, _feed_window()[2])
+
+
+def _event_bytes(row, labels) -> bytes:
+    from icalendar import Event
+
+    event = Event()
+    event.add('uid', f"reservation-{row['id']}@tuho.uho.edu.cu")
+    event.add('summary', f"{labels.get(row['purpose'], row['purpose'])}: {row['local__name']}")
+    event.add('description', row['purpose_detail'] or '')
+    event.add('location', f"{row['local__code']} - {row['local__name']}")
+    event.add('dtstart', row['start_time'])
+    event.add('dtend', row['end_time'])
+    event.add('dtstamp', row['updated_at'])
+    event.add('last-modified', row['updated_at'])
+    event.add('status', ICAL_STATUS.get(row['state'], 'CONFIRMED'))
+    return event.to_ical()
+
+
+def _iter_feed(queryset, name: str):
+    labels = dict(ReservationPurposeEnum.choices)
+    yield (
+        'BEGIN:VCALENDAR\r\n'
+        'VERSION:2.0\r\n'
+        'PRODID:-//TUho//Reservas//ES\r\n'
+        'CALSCALE:GREGORIAN\r\n'
+        'METHOD:PUBLISH\r\n'
+        f'X-WR-CALNAME:{name}\r\n'
+        f'X-PUBLISHED-TTL:PT{FEED_CACHE_TTL // 60}M\r\n'
+    ).encode()
+    rows = queryset.order_by('start_time').values(*_FEED_FIELDS)
+    for row in rows.iterator(chunk_size=500):
+        yield _event_bytes(row, labels)
+    yield b'END:VCALENDAR\r\n'
+
+
+def _cached_stream(key: str, factory):
+    """Sirve el feed desde cache o lo genera en streaming y lo guarda al final."""
+    body = cache.get(key)
+    if body is not None:
+        yield body
+        return
+    chunks = []
+    for chunk in factory():
+        chunks.append(chunk)
+        yield chunk
+    if not transaction.get_connection().in_atomic_block:
+        cache.set(key, b''.join(chunks), FEED_CACHE_TTL)
+
+
+def stream_local_feed(local, etag: str):
+    """Feed de las reservas confirmadas de un local."""
+    from .models import LocalReservation
+
+    start, end, _ = _feed_window()
+    queryset = LocalReservation.objects.filter(
+        local_id=local.pk,
+        state__in=LOCAL_FEED_STATES,
+        start_time__lt=end,
+        end_time__gt=start,
+    )
+    return _cached_stream(
+        f'{FEED_CACHE_KEY}:{etag}',
+        lambda: _iter_feed(queryset, f'{local.code} - {local.name}'),
+    )
+
+
+def stream_user_feed(user, etag: str):
+    """Feed personal: reservas del usuario (pendientes como TENTATIVE)."""
+    from .models import LocalReservation
+
+    start, end, _ = _feed_window()
+    queryset = LocalReservation.objects.filter(
+        user_id=user.pk,
+        state__in=USER_FEED_STATES,
+        start_time__lt=end,
+        end_time__gt=start,
+    )
+    return _cached_stream(
+        f'{FEED_CACHE_KEY}:{etag}',
+        lambda: _iter_feed(queryset, 'Mis reservas - TUho'),
+    )
@@ -0,0 +1,30 @@
+"""Avanza por la máquina de estados las reservas cuyo horario ya llegó.
+
+APROBADA → EN_CURSO cuando empieza la reserva y APROBADA/EN_CURSO →
+FINALIZADA cuando termina. Equivale a la tarea Celery
+`labs.advance_reservation_states`; útil para instalaciones sin Celery beat
+(programarlo en cron cada pocos minutos).
+
+Ejemplos:
+    python manage.py advance_reservations
+    python manage.py advance_reservations --batch-size 200
+"""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from apps.labs.services import advance_reservation_states
+
+
+class Command(BaseCommand):
+    help = 'Actualiza en lote el estado de las reservas en curso / finalizadas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Reservas por lote (UPDATE + historial + auditoría).')
+
+    def handle(self, *args, **opts):
+        totals = advance_reservation_states(batch_size=opts['batch_size'])
+        for transition, count in totals.items():
+            self.stdout.write(f'{transition}: {count}')
+        self.stdout.write(self.style.SUCCESS(f'Reservas actualizadas: {sum(totals.values())}'))
@@ -0,0 +1,61 @@
+"""
+Restricción de exclusión contra reservas solapadas (sólo PostgreSQL).
+
+`state` vive en la tabla de `Procedure`, así que se agrega
+`LocalReservation.occupies_local` (copia de "el estado bloquea el local") y se
+rellena. Sobre ella, dos reservas del mismo local que ocupan el local
+(PENDIENTE / APROBADA / EN_CURSO) no pueden tener rangos
+``[start_time, end_time)`` que se intersecten. Requiere la extensión
+``btree_gist`` (igualdad sobre ``local_id`` dentro del índice GiST). En SQLite
+sólo se agrega la columna y la aplicación mantiene la verificación previa con
+`Local.is_available()`.
+
+Si la tabla ya contiene solapamientos activos la migración falla: hay que
+resolverlos (cancelar/rechazar) antes de aplicarla.
+"""
+from django.db import migrations, models
+
+CONSTRAINT_NAME = 'labs_reservation_no_overlap'
+BLOCKING_STATES = ('PENDIENTE', 'APROBADA', 'EN_CURSO')
+
+
+def backfill_occupies_local(apps, schema_editor):
+    LocalReservation = apps.get_model('labs', 'LocalReservation')
+    LocalReservation.objects.filter(state__in=BLOCKING_STATES).update(occupies_local=True)
+
+
+def add_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = schema_editor.quote_name(apps.get_model('labs', 'LocalReservation')._meta.db_table)
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    schema_editor.execute(
+        f'ALTER TABLE {table} ADD CONSTRAINT {CONSTRAINT_NAME} '
+        f'EXCLUDE USING gist ('
+        f"local_id WITH =, tstzrange(start_time, end_time, '[)') WITH &&"
+        f') WHERE (occupies_local)'
+    )
+
+
+def remove_exclusion_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    table = schema_editor.quote_name(apps.get_model('labs', 'LocalReservation')._meta.db_table)
+    schema_editor.execute(f'ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {CONSTRAINT_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('labs', '0003_equipment_reservationseries_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='localreservation',
+            name='occupies_local',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Ocupa el local'),
+        ),
+        migrations.RunPython(backfill_occupies_local, migrations.RunPython.noop),
+        migrations.RunPython(add_exclusion_constraint, remove_exclusion_constraint),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:09
+
+import apps.labs.models_extensions
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platform', '0012_user_personal_photo'),
+        ('labs', '0004_reservation_overlap_exclusion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarFeedKey',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='calendar_feed_key', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('key', models.CharField(default=apps.labs.models_extensions._new_feed_key, max_length=64)),
+                ('rotated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Clave de feed iCal',
+                'verbose_name_plural': 'Claves de feeds iCal',
+            },
+        ),
+    ]
@@ -13,11 +13,16 @@ Este módulo contiene los modelos simplificados para gestionar:
 """
 
 import uuid
-from django.db import models
+from datetime import timedelta
+
+from django.db import IntegrityError, models, transaction
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 from django.utils import timezone
 from django.db.models import Q
+from model_utils import FieldTracker
+
+from apps.audit.tracking import AuditTrackedMixin
 
 
 # ============================================================================
@@ -121,7 +126,19 @@ class Local(models.Model):
         if not self.is_active:
             return False
 
-        # Buscar reservas aprobadas que se solapen con el rango de tiempo
+        # Resolver desde el índice de intervalos cacheado (sin consulta a BD)
+        from .availability import is_slot_free
+
+        free = is_slot_free(
+            self.pk,
+            start_time,
+            end_time,
+            exclude_id=exclude_reservation.pk if exclude_reservation else None,
+        )
+        if free is not None:
+            return free
+
+        # Fallback: buscar reservas activas que se solapen con el rango de tiempo
         overlapping = LocalReservation.objects.filter(
             local=self,
             state__in=[
@@ -161,12 +178,61 @@ class Local(models.Model):
         ).order_by("start_time")
 
 
+# ============================================================================
+# VALIDACIONES DE RESERVA
+# ============================================================================
+
+MIN_RESERVATION_DURATION = timedelta(minutes=30)
+MAX_RESERVATION_DURATION = timedelta(hours=8)
+
+
+def validate_reservation_window(start_time, end_time, now=None):
+    """Reglas de horario de una reserva; lanza `ValidationError` por campo.
+
+    ``now`` activa la verificación de "no en el pasado" (reservas nuevas).
+    La usan `LocalReservation.clean()` y `services.expand_series`.
+    """
+    if start_time and end_time and start_time >= end_time:
+        raise ValidationError(
+            {"end_time": _("La hora de fin debe ser posterior a la hora de inicio")}
+        )
+
+    if now is not None and start_time and start_time <= now:
+        raise ValidationError(
+            {"start_time": _("No se pueden hacer reservas en el pasado")}
+        )
+
+    if start_time and end_time:
+        duration = end_time - start_time
+        if duration > MAX_RESERVATION_DURATION:
+            raise ValidationError(
+                {"end_time": _("La duración máxima de una reserva es de 8 horas")}
+            )
+        if duration < MIN_RESERVATION_DURATION:
+            raise ValidationError(
+                {"end_time": _("La duración mínima de una reserva es de 30 minutos")}
+            )
+
+
+def validate_reservation_capacity(local, expected_attendees):
+    """Asistentes dentro de la capacidad del local."""
+    if expected_attendees > local.capacity:
+        raise ValidationError(
+            {
+                "expected_attendees": _(
+                    f"El número de asistentes ({expected_attendees}) "
+                    f"excede la capacidad del local ({local.capacity})"
+                )
+            }
+        )
+
+
 # ============================================================================
 # MODELO DE RESERVA
 # ============================================================================
 
 
-class LocalReservation(Procedure):
+class LocalReservation(AuditTrackedMixin, Procedure):
     """
     Trámite de reserva de local.
 
@@ -255,6 +321,18 @@ class LocalReservation(Procedure):
         verbose_name=_("Motivo de cancelación"),
     )
 
+    # Copia de "el estado bloquea el local" en la tabla de reservas: el estado
+    # vive en la tabla padre y la restricción de exclusión de PostgreSQL sólo
+    # puede filtrar por columnas de esta tabla. Se mantiene en save().
+    occupies_local = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name=_("Ocupa el local"),
+    )
+
+    # Instantánea de campos para los diffs de auditoría (ver audit.tracking)
+    tracker = FieldTracker()
+
     class Meta:
         verbose_name = _("Reserva de local")
         verbose_name_plural = _("Reservas de locales")
@@ -270,46 +348,14 @@ class LocalReservation(Procedure):
         """Validaciones personalizadas"""
         super().clean()
 
-        # Validar que end_time sea posterior a start_time
-        if self.start_time and self.end_time and self.start_time >= self.end_time:
-            raise ValidationError(
-                {"end_time": _("La hora de fin debe ser posterior a la hora de inicio")}
-            )
-
-        # Validar que la reserva sea futura (solo para nuevas reservas)
-        if not self.pk and self.start_time and self.start_time <= timezone.now():
-            raise ValidationError(
-                {"start_time": _("No se pueden hacer reservas en el pasado")}
-            )
-
-        # Validar duración máxima (8 horas)
-        if self.start_time and self.end_time:
-            duration = self.end_time - self.start_time
-            if duration.total_seconds() > 8 * 3600:
-                raise ValidationError(
-                    {"end_time": _("La duración máxima de una reserva es de 8 horas")}
-                )
-
-            # Validar duración mínima (30 minutos)
-            if duration.total_seconds() < 30 * 60:
-                raise ValidationError(
-                    {
-                        "end_time": _(
-                            "La duración mínima de una reserva es de 30 minutos"
-                        )
-                    }
-                )
+        # Horario: orden, futuro (solo para nuevas reservas) y duración 30 min – 8 h
+        validate_reservation_window(
+            self.start_time, self.end_time, now=None if self.pk else timezone.now()
+        )
 
         # Validar capacidad
-        if hasattr(self, "local") and self.expected_attendees > self.local.capacity:
-            raise ValidationError(
-                {
-                    "expected_attendees": _(
-                        f"El número de asistentes ({self.expected_attendees}) "
-                        f"excede la capacidad del local ({self.local.capacity})"
-                    )
-                }
-            )
+        if hasattr(self, "local"):
+            validate_reservation_capacity(self.local, self.expected_attendees)
 
         # Validar disponibilidad del local
         if hasattr(self, "local") and self.start_time and self.end_time:
@@ -339,13 +385,43 @@ class LocalReservation(Procedure):
             elif now > self.end_time:
                 self.state = ReservationStateEnum.FINALIZADA
 
-        super().save(*args, **kwargs)
+        from .availability import BLOCKING_STATES, database_prevents_overlaps, is_overlap_violation
+
+        self.occupies_local = self.state in BLOCKING_STATES
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "state" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "occupies_local"}
+
+        using = kwargs.get("using") or "default"
+        if not (self.occupies_local and database_prevents_overlaps(using)):
+            super().save(*args, **kwargs)
+            return
+
+        # La restricción de exclusión decide atómicamente; el savepoint deja
+        # usable la transacción externa si el INSERT/UPDATE es rechazado.
+        try:
+            with transaction.atomic(using=using):
+                super().save(*args, **kwargs)
+        except IntegrityError as exc:
+            if is_overlap_violation(exc):
+                raise ValidationError(
+                    {"local": _("El local no está disponible en el horario seleccionado")}
+                ) from exc
+            raise
 
     def submit(self):
         """Envía la reserva para aprobación"""
         if self.state != ReservationStateEnum.BORRADOR:
             raise ValidationError("Solo se pueden enviar reservas en borrador")
 
+        # Sin restricción de exclusión (SQLite) se verifica antes de bloquear
+        from .availability import database_prevents_overlaps
+
+        if not database_prevents_overlaps() and not self.local.is_available(
+            self.start_time, self.end_time, exclude_reservation=self
+        ):
+            raise ValidationError("El local no está disponible en el horario seleccionado")
+
         # Si el local no requiere aprobación, aprobar automáticamente
         if not self.local.requires_approval:
             self.state = ReservationStateEnum.APROBADA
@@ -566,4 +642,5 @@ from .models_extensions import (  # noqa: E402,F401
     ReservationEquipmentRequest,
     ReservationSeries,
     ReservationCheckIn,
+    CalendarFeedKey,
 )
@@ -4,9 +4,11 @@ Extensiones al módulo de reservas:
 - LocalEquipment: inventario de equipamiento por local (M2M con Local).
 - ReservationSeries: plantilla de reservas recurrentes (RRULE simplificado).
 - ReservationCheckIn: registro de check-in/out de una reserva.
+- CalendarFeedKey: clave rotable de las URLs de suscripción iCal por usuario.
 
 Estos modelos se integran con los existentes sin romper su esquema.
 """
+import secrets
 import uuid
 
 from django.db import models
@@ -180,3 +182,31 @@ class ReservationCheckIn(models.Model):
     class Meta:
         verbose_name = _('Check-in de reserva')
         verbose_name_plural = _('Check-ins de reservas')
+
+
+def _new_feed_key() -> str:
+    return secrets.token_urlsafe(24)
+
+
+class CalendarFeedKey(models.Model):
+    """Clave con la que se firman los tokens de los feeds iCal de un usuario.
+
+    Rotarla (`apps.labs.feeds.rotate_feed_key`) invalida todas las URLs de
+    suscripción emitidas antes.
+    """
+
+    user = models.OneToOneField(
+        'platform.User',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='calendar_feed_key',
+    )
+    key = models.CharField(max_length=64, default=_new_feed_key)
+    rotated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = _('Clave de feed iCal')
+        verbose_name_plural = _('Claves de feeds iCal')
+
+    def __str__(self) -> str:
+        return f'Feed iCal de {self.user}'
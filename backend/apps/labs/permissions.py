@@ -6,6 +6,14 @@ from rest_framework import permissions
 
 from apps.internal.permissions import is_reservas_staff
 
+# Gestores de otros módulos no deben ver/operar el módulo de reservas.
+FOREIGN_MODULE_ROLES = ('GESTOR_INTERNO', 'GESTOR_SECRETARIA')
+
+
+def is_foreign_module_user(user) -> bool:
+    """True para gestores de otros módulos (sin acceso a reservas)."""
+    return getattr(user, 'user_type', '') in FOREIGN_MODULE_ROLES
+
 
 class IsReservationOwnerOrAdmin(permissions.BasePermission):
     """
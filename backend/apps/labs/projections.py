@@ -0,0 +1,142 @@
+"""
+Proyección mensual del calendario de reservas por local.
+
+`/locals/{id}/calendar/` serializaba cada reserva por separado y recalculaba
+el mes completo en cada request. Este módulo construye la proyección de un mes
+(reservas APROBADA / EN_CURSO agrupadas por día) con una sola consulta y la
+guarda en el cache compartido, versionada con la generación del local de
+`availability` — los mismos signals que invalidan el índice de intervalos
+invalidan el calendario.
+
+- `parse_month(value)` — valida ``YYYY-MM`` y retorna ``(year, month)``.
+- `month_bounds(year, month)` — inicio y fin (exclusivo) del mes en la zona
+  horaria actual.
+- `calendar_etag(local_ids, year, month)` — ETag barato (sólo lee cache).
+- `get_month_projections(locals_, year, month)` — proyecciones de varios
+  locales; las que faltan en cache se construyen juntas en una consulta.
+"""
+from __future__ import annotations
+
+import hashlib
+import time
+from datetime import datetime
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .availability import get_local_generations
+from .enums import ReservationStateEnum
+
+CALENDAR_CACHE_KEY = 'tuho:labs:calendar'
+CALENDAR_CACHE_TTL = 3600  # 1 h
+
+# Estados que se muestran en el calendario
+CALENDAR_STATES = (
+    ReservationStateEnum.APROBADA,
+    ReservationStateEnum.EN_CURSO,
+)
+
+
+def parse_month(value) -> tuple[int, int]:
+    """Convierte ``YYYY-MM`` en ``(year, month)``; ValueError si es inválido."""
+    year, month = map(int, str(value).split('-'))
+    datetime(year, month, 1)  # valida rangos
+    return year, month
+
+
+def month_bounds(year: int, month: int) -> tuple[datetime, datetime]:
+    """Inicio y fin (exclusivo) del mes, aware en la zona horaria actual."""
+    tz = timezone.get_current_timezone()
+    start = timezone.make_aware(datetime(year, month, 1), tz)
+    if month == 12:
+        end = timezone.make_aware(datetime(year + 1, 1, 1), tz)
+    else:
+        end = timezone.make_aware(datetime(year, month + 1, 1), tz)
+    return start, end
+
+
+def _projection_key(local_id, year: int, month: int, generation) -> str:
+    return f'{CALENDAR_CACHE_KEY}:{local_id}:{year:04d}-{month:02d}:{generation}'
+
+
+def calendar_etag(local_ids, year: int, month: int, generations: dict | None = None) -> str:
+    """ETag de la proyección de uno o más locales para un mes.
+
+    Depende sólo de las generaciones de los locales, así que un request
+    condicional puede responderse con 304 sin construir la proyección.
+    """
+    generations = generations or get_local_generations(local_ids)
+    raw = f'{year:04d}-{month:02d}|' + '|'.join(
+        f'{local_id}:{generations[local_id]}' for local_id in sorted(local_ids, key=str)
+    )
+    return '"%s"' % hashlib.md5(raw.encode()).hexdigest()
+
+
+def _build_projections(locals_, year: int, month: int) -> dict:
+    """Construye la proyección de varios locales con una consulta de reservas."""
+    from .models import Local, LocalReservation
+    from .serializers import LocalListSerializer, ReservationListSerializer
+
+    local_ids = [local.pk for local in locals_]
+    start, end = month_bounds(year, month)
+
+    annotated = (
+        Local.objects.filter(pk__in=local_ids)
+        .annotate(active_reservations_total=Count(
+            'reservations', filter=Q(reservations__state__in=CALENDAR_STATES),
+        ))
+        .order_by('name')
+    )
+    reservations = (
+        LocalReservation.objects.filter(
+            local_id__in=local_ids,
+            state__in=CALENDAR_STATES,
+            start_time__gte=start,
+            start_time__lt=end,
+        )
+        .select_related('local', 'user')
+        .order_by('start_time')
+    )
+    serialized = ReservationListSerializer(reservations, many=True).data
+
+    calendars = {local_id: {} for local_id in local_ids}
+    for reservation, data in zip(reservations, serialized):
+        day = timezone.localtime(reservation.start_time).date().isoformat()
+        calendars[reservation.local_id].setdefault(day, []).append(data)
+
+    built_at = time.time()
+    return {
+        local.pk: {
+            'local': LocalListSerializer(local).data,
+            'calendar': calendars[local.pk],
+            'last_modified': built_at,
+        }
+        for local in annotated
+    }
+
+
+def get_month_projections(locals_, year: int, month: int, generations: dict | None = None) -> dict:
+    """Proyecciones ``{local_id: {'local', 'calendar', 'last_modified'}}``.
+
+    Lee todas las entradas con un `get_many`; las faltantes se construyen en
+    bloque y, fuera de transacciones, se guardan para los siguientes requests.
+    """
+    local_ids = [local.pk for local in locals_]
+    generations = generations or get_local_generations(local_ids)
+    keys = {_projection_key(pk, year, month, generations[pk]): pk for pk in local_ids}
+
+    cached = cache.get_many(list(keys))
+    projections = {keys[key]: value for key, value in cached.items()}
+
+    missing = [local for local in locals_ if local.pk not in projections]
+    if missing:
+        built = _build_projections(missing, year, month)
+        projections.update(built)
+        if not transaction.get_connection().in_atomic_block:
+            cache.set_many(
+                {_projection_key(pk, year, month, generations[pk]): value for pk, value in built.items()},
+                CALENDAR_CACHE_TTL,
+            )
+    return projections
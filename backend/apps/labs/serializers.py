@@ -5,6 +5,7 @@ Proporciona serialización y deserialización de datos para la API REST.
 """
 
 from rest_framework import serializers
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from .models import (
@@ -15,6 +16,7 @@ from .models import (
     ReservationStateEnum,
     ReservationPurposeEnum,
 )
+from .availability import database_prevents_overlaps
 
 User = get_user_model()
 
@@ -51,6 +53,9 @@ class LocalListSerializer(serializers.ModelSerializer):
     
     def get_total_reservations(self, obj):
         """Cuenta el número total de reservas del local"""
+        annotated = getattr(obj, 'active_reservations_total', None)
+        if annotated is not None:
+            return annotated
         return obj.reservations.filter(
             state__in=[
                 ReservationStateEnum.APROBADA,
@@ -167,6 +172,51 @@ class LocalAvailabilitySerializer(serializers.Serializer):
         return data
 
 
+class EquipmentRequirementSerializer(serializers.Serializer):
+    """Equipamiento requerido en una búsqueda de locales"""
+    
+    equipment = serializers.UUIDField()
+    quantity = serializers.IntegerField(min_value=1, default=1)
+
+
+class LocalSearchSerializer(serializers.Serializer):
+    """Serializer para buscar locales libres en una ventana de tiempo"""
+    
+    start_time = serializers.DateTimeField(required=True)
+    end_time = serializers.DateTimeField(required=True)
+    min_capacity = serializers.IntegerField(required=False, min_value=1)
+    local_type = serializers.ChoiceField(choices=LocalTypeEnum.choices, required=False)
+    equipment = EquipmentRequirementSerializer(many=True, required=False)
+    next_slots = serializers.IntegerField(required=False, min_value=0, max_value=20, default=0)
+    search_until = serializers.DateTimeField(required=False)
+    
+    def validate(self, data):
+        """Validaciones personalizadas"""
+        if data['start_time'] >= data['end_time']:
+            raise serializers.ValidationError({
+                'end_time': 'La hora de fin debe ser posterior a la hora de inicio'
+            })
+        
+        if data['start_time'] < timezone.now():
+            raise serializers.ValidationError({
+                'start_time': 'No se pueden verificar fechas en el pasado'
+            })
+        
+        search_until = data.get('search_until')
+        if search_until is None:
+            data['search_until'] = data['start_time'] + timezone.timedelta(days=7)
+        elif search_until < data['end_time']:
+            raise serializers.ValidationError({
+                'search_until': 'Debe ser posterior a la hora de fin'
+            })
+        elif search_until - data['start_time'] > timezone.timedelta(days=31):
+            raise serializers.ValidationError({
+                'search_until': 'La búsqueda de huecos no puede exceder 31 días'
+            })
+        
+        return data
+
+
 # ============================================================================
 # SERIALIZERS DE USUARIO
 # ============================================================================
@@ -347,8 +397,11 @@ class ReservationCreateSerializer(serializers.ModelSerializer):
                 'expected_attendees': f"El número de asistentes excede la capacidad del local ({data['local'].capacity})"
             })
         
-        # Validar disponibilidad
-        if not data['local'].is_available(data['start_time'], data['end_time']):
+        # Validar disponibilidad (en PostgreSQL la decide la restricción de
+        # exclusión al pasar a un estado que ocupa el local)
+        if not database_prevents_overlaps() and not data['local'].is_available(
+            data['start_time'], data['end_time']
+        ):
             raise serializers.ValidationError({
                 'local': 'El local no está disponible en el horario seleccionado'
             })
@@ -428,12 +481,21 @@ class ReservationUpdateSerializer(serializers.ModelSerializer):
             })
         
         # Validar disponibilidad
-        if not local.is_available(start_time, end_time, exclude_reservation=instance):
+        if not database_prevents_overlaps() and not local.is_available(
+            start_time, end_time, exclude_reservation=instance
+        ):
             raise serializers.ValidationError({
                 'local': 'El local no está disponible en el horario seleccionado'
             })
         
         return data
+    
+    def update(self, instance, validated_data):
+        """Traduce el rechazo de la restricción de solapamiento a un 400"""
+        try:
+            return super().update(instance, validated_data)
+        except DjangoValidationError as exc:
+            raise serializers.ValidationError(exc.message_dict)
 
 
 class ReservationSubmitSerializer(serializers.Serializer):
@@ -523,6 +585,32 @@ class ReservationCancelSerializer(serializers.Serializer):
         return data
 
 
+class ReservationBulkActionSerializer(serializers.Serializer):
+    """Serializer para aprobar / rechazar / cancelar reservas en lote"""
+    
+    ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        min_length=1,
+        max_length=500,
+        help_text="IDs de las reservas"
+    )
+    reason = serializers.CharField(
+        required=False,
+        allow_blank=True,
+        default='',
+        help_text="Motivo (obligatorio para rechazar o cancelar)"
+    )
+    observation = serializers.CharField(required=False, allow_blank=True)
+    
+    def validate(self, data):
+        """El motivo es obligatorio salvo al aprobar"""
+        if self.context.get('bulk_action') in ('reject', 'cancel') and not data.get('reason'):
+            raise serializers.ValidationError({
+                'reason': 'Debe proporcionar un motivo'
+            })
+        return data
+
+
 # ============================================================================
 # SERIALIZERS DE HISTORIAL
 # ============================================================================
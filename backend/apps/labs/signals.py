@@ -1,31 +1,42 @@
 """
 Signals para el módulo de reservas de locales.
 """
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 
 from apps.audit.services import log_event
 from apps.notifications.services import notify_state_change
 
-from .models import LocalReservation
+from .availability import invalidate_local_index
+from .feeds import invalidate_user_feed
+from .models import Local, LocalReservation
 
 
-@receiver(pre_save, sender=LocalReservation)
-def _capture_previous_state(sender, instance, **kwargs):
-    if not instance.pk:
-        instance._previous_state = None
-        return
-    try:
-        old = sender.objects.get(pk=instance.pk)
-        instance._previous_state = old.state
-    except sender.DoesNotExist:
-        instance._previous_state = None
+@receiver(post_save, sender=LocalReservation)
+def _invalidate_availability_index(sender, instance, created, **kwargs):
+    invalidate_local_index(instance.local_id)
+    invalidate_user_feed([instance.user_id])
+    if not created and instance.tracker.has_changed('local_id'):
+        previous_local_id = instance.tracker.previous('local_id')
+        if previous_local_id:
+            invalidate_local_index(previous_local_id)
+
+
+@receiver(post_delete, sender=LocalReservation)
+def _invalidate_availability_index_on_delete(sender, instance, **kwargs):
+    invalidate_local_index(instance.local_id)
+    invalidate_user_feed([instance.user_id])
+
+
+@receiver(post_save, sender=Local)
+def _invalidate_local_projections(sender, instance, **kwargs):
+    # Los datos del local forman parte del calendario cacheado
+    invalidate_local_index(instance.pk)
 
 
 @receiver(post_save, sender=LocalReservation)
 def _handle_state_change(sender, instance, created, **kwargs):
-    previous = getattr(instance, '_previous_state', None)
-    current = getattr(instance, 'state', None)
+    current = instance.state
 
     if created:
         log_event(
@@ -36,26 +47,33 @@ def _handle_state_change(sender, instance, created, **kwargs):
         )
         return
 
-    if previous is not None and previous != current:
-        reason = ''
-        if current == 'RECHAZADA':
-            reason = instance.rejection_reason
-        elif current == 'CANCELADA':
-            reason = instance.cancellation_reason
+    # El estado previo sale de la instantánea del tracker (sin SELECT extra)
+    changes = instance.audit_changes()
+    if 'state' not in changes:
+        instance.log_update_event('Reserva de local actualizada')
+        return
 
-        log_event(
-            action='state_change',
-            resource=instance,
-            description='Cambio de estado de reserva',
-            metadata={
-                'old_state': previous,
-                'new_state': current,
-                'reason': reason,
-            },
-        )
-        notify_state_change(
-            instance,
-            old_state=previous,
-            new_state=current,
-            reason=reason,
-        )
+    previous = changes['state']['old']
+    reason = ''
+    if current == 'RECHAZADA':
+        reason = instance.rejection_reason
+    elif current == 'CANCELADA':
+        reason = instance.cancellation_reason
+
+    log_event(
+        action='state_change',
+        resource=instance,
+        description='Cambio de estado de reserva',
+        metadata={
+            'old_state': previous,
+            'new_state': current,
+            'reason': reason,
+            'changes': changes,
+        },
+    )
+    notify_state_change(
+        instance,
+        old_state=previous,
+        new_state=current,
+        reason=reason,
+    )
@@ -0,0 +1,33 @@
+"""
+Tareas Celery del módulo de reservas.
+
+`advance_reservation_states` se programa en Celery beat (ver
+`CELERY_BEAT_SCHEDULE` en settings). Sin Celery, usar el comando
+``python manage.py advance_reservations`` desde cron.
+"""
+from __future__ import annotations
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+try:
+    from celery import shared_task
+except ImportError:  # pragma: no cover
+    def shared_task(*args, **kwargs):  # type: ignore[misc]
+        def decorator(fn):
+            fn.delay = lambda *a, **kw: fn(*a, **kw)
+            return fn
+        return decorator
+
+
+@shared_task(name='labs.advance_reservation_states')
+def advance_reservation_states_task(batch_size: int = 500) -> dict:
+    """Mueve en lote las reservas vencidas (APROBADA → EN_CURSO → FINALIZADA)."""
+    from .services import advance_reservation_states
+
+    totals = advance_reservation_states(batch_size=batch_size)
+    if any(totals.values()):
+        logger.info('Transiciones automáticas de reservas: %s', totals)
+    return totals
@@ -6,8 +6,10 @@ Ejecutar con::
     python manage.py test apps.labs.tests
 """
 from datetime import timedelta
+from unittest import skipUnless
 
-from django.test import TestCase
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.utils import timezone
 from rest_framework import status
 from rest_framework.test import APIClient
@@ -117,3 +119,969 @@ class LabsSmokeTest(TestCase):
         data = resp.json()
         self.assertIn('results', data)
         self.assertIn('count', data)
+
+
+class LocalIntervalIndexTest(TestCase):
+    """Índice de intervalos usado por ``Local.is_available``."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User(
+            username='labs_index',
+            email='labs_index@uho.edu.cu',
+            first_name='Index',
+            last_name='User',
+            user_type='USUARIO',
+            id_card='80030312346',
+            is_active=True,
+        )
+        cls.user.set_password('Demo12345')
+        cls.user.save()
+        cls.local = Local.objects.create(
+            name='Aula índice',
+            code='TEST-INDEX-1',
+            local_type=LocalTypeEnum.AULA,
+            capacity=30,
+        )
+
+    def _reserve(self, start, hours=2, state=ReservationStateEnum.APROBADA):
+        return LocalReservation.objects.create(
+            user=self.user,
+            local=self.local,
+            start_time=start,
+            end_time=start + timedelta(hours=hours),
+            purpose=ReservationPurposeEnum.CLASE,
+            purpose_detail='Clase',
+            expected_attendees=10,
+            responsible_name='Index User',
+            responsible_phone='52345680',
+            responsible_email='labs_index@uho.edu.cu',
+            state=state,
+        )
+
+    def test_overlaps_with_nested_intervals(self):
+        from .availability import LocalIntervalIndex
+
+        index = LocalIntervalIndex.from_intervals(
+            [(10.0, 50.0, 'a'), (20.0, 30.0, 'b'), (60.0, 70.0, 'c')],
+            horizon=0.0,
+        )
+        self.assertTrue(index.overlaps(40.0, 45.0))
+        self.assertFalse(index.overlaps(50.0, 60.0))
+        self.assertFalse(index.overlaps(40.0, 45.0, exclude_id='a'))
+        self.assertEqual(sorted(index.conflicts(25.0, 65.0)), ['a', 'b', 'c'])
+        self.assertFalse(index.covers(-1.0))
+
+    def test_index_is_rebuilt_after_reservation_save(self):
+        from .availability import get_local_index
+
+        start = (timezone.now() + timedelta(days=3)).replace(microsecond=0)
+        self.assertEqual(len(get_local_index(self.local.pk)), 0)
+
+        reservation = self._reserve(start)
+        index = get_local_index(self.local.pk)
+        self.assertEqual(index.conflicts(start.timestamp(), start.timestamp() + 60), [str(reservation.pk)])
+
+        reservation.state = ReservationStateEnum.CANCELADA
+        reservation.save()
+        self.assertEqual(len(get_local_index(self.local.pk)), 0)
+
+    def test_is_available_excludes_given_reservation(self):
+        start = (timezone.now() + timedelta(days=4)).replace(microsecond=0)
+        reservation = self._reserve(start)
+        later = start + timedelta(hours=1)
+        self.assertFalse(self.local.is_available(later, later + timedelta(hours=1)))
+        self.assertTrue(
+            self.local.is_available(later, later + timedelta(hours=1), exclude_reservation=reservation)
+        )
+
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    LABS_INTERVAL_INDEX='auto',
+)
+class LocalIntervalIndexPathTest(TransactionTestCase):
+    """``is_available`` resuelto desde el índice (fuera de transacción).
+
+    Con `TestCase` cada llamada ocurre dentro de un bloque atómico y siempre
+    se usa el fallback a BD; aquí no hay transacción envolvente.
+    """
+
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        self.user = User(
+            username='labs_index_path',
+            email='labs_index_path@uho.edu.cu',
+            user_type='USUARIO',
+            id_card='80030312357',
+            is_active=True,
+        )
+        self.user.set_password('Demo12345')
+        self.user.save()
+        self.local = Local.objects.create(
+            name='Aula índice (cache)',
+            code='TEST-INDEX-2',
+            local_type=LocalTypeEnum.AULA,
+            capacity=30,
+        )
+        self.start = (timezone.now() + timedelta(days=3)).replace(microsecond=0)
+        self.reservation = LocalReservation.objects.create(
+            user=self.user,
+            local=self.local,
+            start_time=self.start,
+            end_time=self.start + timedelta(hours=2),
+            purpose=ReservationPurposeEnum.CLASE,
+            purpose_detail='Clase',
+            expected_attendees=10,
+            responsible_name='Index User',
+            responsible_phone='52345680',
+            responsible_email='labs_index_path@uho.edu.cu',
+            state=ReservationStateEnum.APROBADA,
+        )
+
+    @override_settings(LABS_INTERVAL_INDEX='on')
+    def test_answers_from_cached_index_without_queries(self):
+        inside = self.start + timedelta(hours=1)
+        self.assertFalse(self.local.is_available(inside, inside + timedelta(hours=1)))  # construye el índice
+
+        later = self.start + timedelta(hours=2)
+        with self.assertNumQueries(0):
+            self.assertFalse(self.local.is_available(inside, inside + timedelta(hours=1)))
+            self.assertTrue(self.local.is_available(later, later + timedelta(hours=1)))
+            self.assertTrue(self.local.is_available(
+                inside, inside + timedelta(hours=1), exclude_reservation=self.reservation,
+            ))
+
+        # Un cambio de estado invalida la generación: la próxima consulta ve la BD
+        self.reservation.state = ReservationStateEnum.CANCELADA
+        self.reservation.save()
+        self.assertTrue(self.local.is_available(inside, inside + timedelta(hours=1)))
+
+    def test_auto_skips_index_with_per_process_cache(self):
+        from .availability import index_enabled, is_slot_free
+
+        inside = self.start + timedelta(hours=1)
+        self.assertFalse(index_enabled())  # LocMemCache: un cache por proceso
+        self.assertIsNone(is_slot_free(self.local.pk, inside, inside + timedelta(hours=1)))
+        with self.assertNumQueries(1):
+            self.assertFalse(self.local.is_available(inside, inside + timedelta(hours=1)))
+
+
+class ReservationSeriesExpandTest(TestCase):
+    """Expansión de series con detección de conflictos en bloque."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User(
+            username='labs_series',
+            email='labs_series@uho.edu.cu',
+            first_name='Series',
+            last_name='User',
+            user_type='USUARIO',
+            id_card='80030312347',
+            is_active=True,
+        )
+        cls.user.set_password('Demo12345')
+        cls.user.save()
+        cls.local = Local.objects.create(
+            name='Lab series',
+            code='TEST-SERIES-1',
+            local_type=LocalTypeEnum.LABORATORIO,
+            capacity=30,
+        )
+
+    def test_expand_skips_conflicts_and_creates_the_rest(self):
+        from datetime import time
+        from .models import ReservationHistory, ReservationSeries
+        from .services import expand_series
+
+        first_day = (timezone.localtime() + timedelta(days=7)).date()
+        series = ReservationSeries.objects.create(
+            local=self.local,
+            created_by=self.user,
+            frequency=ReservationSeries.Frequency.DAILY,
+            start_date=first_day,
+            end_date=first_day + timedelta(days=3),
+            start_time=time(10, 0),
+            end_time=time(12, 0),
+            purpose=ReservationPurposeEnum.CLASE,
+            purpose_detail='Clase semanal',
+            expected_attendees=20,
+            responsible_name='Series User',
+            responsible_phone='52345680',
+            responsible_email='labs_series@uho.edu.cu',
+        )
+        blocking_start = series.expand()[1]['start_time'] + timedelta(hours=1)
+        LocalReservation.objects.create(
+            user=self.user,
+            local=self.local,
+            start_time=blocking_start,
+            end_time=blocking_start + timedelta(hours=2),
+            purpose=ReservationPurposeEnum.REUNION,
+            purpose_detail='Reunión',
+            expected_attendees=5,
+            responsible_name='Series User',
+            responsible_phone='52345680',
+            responsible_email='labs_series@uho.edu.cu',
+            state=ReservationStateEnum.APROBADA,
+        )
+
+        created, skipped = expand_series(series, self.user)
+
+        self.assertEqual(len(created), 3)
+        self.assertEqual(len(skipped), 1)
+        reservations = LocalReservation.objects.filter(pk__in=created)
+        self.assertEqual(reservations.count(), 3)
+        self.assertTrue(all(r.state == ReservationStateEnum.PENDIENTE for r in reservations))
+        self.assertEqual(ReservationHistory.objects.filter(reservation__in=created).count(), 3)
+
+    def test_expand_reports_the_same_window_errors_as_clean(self):
+        from datetime import time
+        from django.core.exceptions import ValidationError
+        from .models import ReservationSeries
+        from .services import expand_series
+
+        first_day = (timezone.localtime() + timedelta(days=7)).date()
+        series = ReservationSeries.objects.create(
+            local=self.local,
+            created_by=self.user,
+            frequency=ReservationSeries.Frequency.DAILY,
+            start_date=first_day,
+            end_date=first_day + timedelta(days=1),
+            start_time=time(8, 0),
+            end_time=time(17, 0),
+            purpose=ReservationPurposeEnum.CLASE,
+            purpose_detail='Jornada completa',
+            expected_attendees=20,
+            responsible_name='Series User',
+            responsible_phone='52345680',
+            responsible_email='labs_series@uho.edu.cu',
+        )
+        occurrence = series.expand()[0]
+        single = LocalReservation(
+            user=self.user, local=self.local,
+            start_time=occurrence['start_time'], end_time=occurrence['end_time'],
+            expected_attendees=20,
+        )
+        with self.assertRaises(ValidationError) as ctx:
+            single.clean()
+
+        created, skipped = expand_series(series, self.user)
+        self.assertEqual(created, [])
+        self.assertEqual({item['error'] for item in skipped}, set(ctx.exception.message_dict['end_time']))
+
+
+class LocalSearchTest(TestCase):
+    """Búsqueda de locales libres en varios locales a la vez."""
+
+    @classmethod
+    def setUpTestData(cls):
+        from .models import Equipment, LocalEquipment
+
+        cls.user = User(
+            username='labs_search',
+            email='labs_search@uho.edu.cu',
+            first_name='Search',
+            last_name='User',
+            user_type='USUARIO',
+            id_card='80030312348',
+            is_active=True,
+        )
+        cls.user.set_password('Demo12345')
+        cls.user.save()
+        cls.busy_lab = Local.objects.create(
+            name='Lab ocupado', code='TEST-SEARCH-1',
+            local_type=LocalTypeEnum.LABORATORIO, capacity=40,
+        )
+        cls.free_lab = Local.objects.create(
+            name='Lab libre', code='TEST-SEARCH-2',
+            local_type=LocalTypeEnum.LABORATORIO, capacity=35,
+        )
+        Local.objects.create(
+            name='Lab pequeño', code='TEST-SEARCH-3',
+            local_type=LocalTypeEnum.LABORATORIO, capacity=10,
+        )
+        cls.projector = Equipment.objects.create(code='PROJ', name='Proyector')
+        for local in (cls.busy_lab, cls.free_lab):
+            LocalEquipment.objects.create(local=local, equipment=cls.projector)
+
+        cls.start = (timezone.now() + timedelta(days=5)).replace(minute=0, second=0, microsecond=0)
+        LocalReservation.objects.create(
+            user=cls.user,
+            local=cls.busy_lab,
+            start_time=cls.start,
+            end_time=cls.start + timedelta(hours=2),
+            purpose=ReservationPurposeEnum.CLASE,
+            purpose_detail='Clase',
+            expected_attendees=30,
+            responsible_name='Search User',
+            responsible_phone='52345680',
+            responsible_email='labs_search@uho.edu.cu',
+            state=ReservationStateEnum.APROBADA,
+        )
+
+    def _search(self, **extra):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        payload = {
+            'start_time': self.start.isoformat(),
+            'end_time': (self.start + timedelta(hours=2)).isoformat(),
+            'min_capacity': 30,
+            'local_type': LocalTypeEnum.LABORATORIO,
+            'equipment': [{'equipment': str(self.projector.pk)}],
+            **extra,
+        }
+        resp = client.post('/api/v1/labs/locals/search/', payload, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        return resp.json()
+
+    def test_returns_only_free_matching_locals(self):
+        data = self._search()
+        self.assertEqual([item['code'] for item in data['results']], ['TEST-SEARCH-2'])
+
+    def test_next_slots_include_busy_locals(self):
+        data = self._search(next_slots=1)
+        by_code = {item['code']: item for item in data['results']}
+        self.assertFalse(by_code['TEST-SEARCH-1']['is_free'])
+        self.assertEqual(len(by_code['TEST-SEARCH-1']['next_slots']), 1)
+        self.assertEqual(data['count'], 1)
+
+
+class AdvanceReservationStatesTest(TestCase):
+    """Transiciones automáticas en lote (Celery beat / cron)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User(
+            username='labs_sched',
+            email='labs_sched@uho.edu.cu',
+            first_name='Sched',
+            last_name='User',
+            user_type='USUARIO',
+            id_card='80030312349',
+            is_active=True,
+        )
+        cls.user.set_password('Demo12345')
+        cls.user.save()
+        cls.local = Local.objects.create(
+            name='Aula sched', code='TEST-SCHED-1',
+            local_type=LocalTypeEnum.AULA, capacity=30,
+        )
+
+    def _reserve(self, start, end, state=ReservationStateEnum.PENDIENTE):
+        reservation = LocalReservation.objects.create(
+            user=self.user,
+            local=self.local,
+            start_time=start,
+            end_time=end,
+            purpose=ReservationPurposeEnum.CLASE,
+            purpose_detail='Clase',
+            expected_attendees=10,
+            responsible_name='Sched User',
+            responsible_phone='52345680',
+            responsible_email='labs_sched@uho.edu.cu',
+            state=state,
+        )
+        # Simula una reserva aprobada que quedó con estado desactualizado
+        LocalReservation.objects.filter(pk=reservation.pk).update(state=ReservationStateEnum.APROBADA)
+        return reservation
+
+    def test_moves_due_reservations_in_bulk(self):
+        from apps.audit.models import AuditLog
+        from apps.notifications.models import Notificacion
+        from .models import ReservationHistory
+        from .services import advance_reservation_states
+
+        now = timezone.now()
+        running = self._reserve(now + timedelta(days=1), now + timedelta(days=1, hours=2))
+        finished = self._reserve(now + timedelta(days=2), now + timedelta(days=2, hours=2))
+        upcoming = self._reserve(now + timedelta(days=3), now + timedelta(days=3, hours=2))
+
+        # La auditoría se escribe al confirmar la transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            totals = advance_reservation_states(now=now + timedelta(days=2, hours=3))
+
+        self.assertEqual(totals['APROBADA->FINALIZADA'], 2)
+        self.assertEqual(totals['APROBADA->EN_CURSO'], 0)
+        states = dict(LocalReservation.objects.values_list('pk', 'state'))
+        self.assertEqual(states[running.pk], ReservationStateEnum.FINALIZADA)
+        self.assertEqual(states[finished.pk], ReservationStateEnum.FINALIZADA)
+        self.assertEqual(states[upcoming.pk], ReservationStateEnum.APROBADA)
+        self.assertEqual(ReservationHistory.objects.filter(action='FINISHED').count(), 2)
+        self.assertEqual(
+            AuditLog.objects.filter(action='state_change', resource_id=str(running.pk)).count(), 1
+        )
+        self.assertEqual(Notificacion.objects.filter(para=self.user).count(), 2)
+
+
+class MonthCalendarTest(TestCase):
+    """Calendario mensual cacheado con GET condicional."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User(
+            username='labs_calendar',
+            email='labs_calendar@uho.edu.cu',
+            first_name='Calendar',
+            last_name='User',
+            user_type='USUARIO',
+            id_card='80030312350',
+            is_active=True,
+        )
+        cls.user.set_password('Demo12345')
+        cls.user.save()
+        cls.lab = Local.objects.create(
+            name='Lab calendario', code='TEST-CAL-1',
+            local_type=LocalTypeEnum.LABORATORIO, capacity=40,
+        )
+        cls.aula = Local.objects.create(
+            name='Aula calendario', code='TEST-CAL-2',
+            local_type=LocalTypeEnum.AULA, capacity=40,
+        )
+        cls.start = timezone.localtime(timezone.now() + timedelta(days=40)).replace(
+            hour=10, minute=0, second=0, microsecond=0,
+        )
+        cls.month = cls.start.strftime('%Y-%m')
+        cls._reserve(cls.lab, cls.start)
+
+    @classmethod
+    def _reserve(cls, local, start):
+        return LocalReservation.objects.create(
+            user=cls.user,
+            local=local,
+            start_time=start,
+            end_time=start + timedelta(hours=2),
+            purpose=ReservationPurposeEnum.CLASE,
+            purpose_detail='Clase',
+            expected_attendees=20,
+            responsible_name='Calendar User',
+            responsible_phone='52345681',
+            responsible_email='labs_calendar@uho.edu.cu',
+            state=ReservationStateEnum.APROBADA,
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_local_calendar_supports_conditional_get(self):
+        url = f'/api/v1/labs/locals/{self.lab.pk}/calendar/?month={self.month}'
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', resp)
+        day = self.start.date().isoformat()
+        self.assertEqual(len(resp.json()['calendar'][day]), 1)
+
+        etag = resp['ETag']
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        self._reserve(self.lab, self.start + timedelta(days=1))
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(resp['ETag'], etag)
+
+    def test_campus_calendar_returns_all_locals(self):
+        resp = self.client.get(f'/api/v1/labs/locals/calendar/?month={self.month}')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        rows = {row['local']['code']: row for row in resp.json()['locals']}
+        self.assertEqual(len(rows['TEST-CAL-1']['calendar']), 1)
+        self.assertEqual(rows['TEST-CAL-1']['local']['total_reservations'], 1)
+        self.assertEqual(rows['TEST-CAL-2']['calendar'], {})
+
+        resp = self.client.get(f'/api/v1/labs/locals/calendar/?month={self.month}&local_type=AULA')
+        self.assertEqual([row['local']['code'] for row in resp.json()['locals']], ['TEST-CAL-2'])
+
+    def test_invalid_month(self):
+        resp = self.client.get(f'/api/v1/labs/locals/{self.lab.pk}/calendar/?month=2024-13')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class LocalStatisticsTest(TestCase):
+    """Estadísticas por local con agregación condicional."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User(
+            username='labs_stats',
+            email='labs_stats@uho.edu.cu',
+            first_name='Stats',
+            last_name='User',
+            user_type='USUARIO',
+            id_card='80030312351',
+            is_active=True,
+        )
+        cls.user.set_password('Demo12345')
+        cls.user.save()
+        cls.lab = Local.objects.create(
+            name='Lab estadísticas', code='TEST-STATS-1',
+            local_type=LocalTypeEnum.LABORATORIO, capacity=40,
+        )
+        cls.empty = Local.objects.create(
+            name='Lab vacío', code='TEST-STATS-2',
+            local_type=LocalTypeEnum.LABORATORIO, capacity=40,
+        )
+        base = timezone.localtime(timezone.now() + timedelta(days=10)).replace(
+            hour=8, minute=0, second=0, microsecond=0,
+        )
+        cls.first_day = base.date()
+        for offset, hours, state, purpose in (
+            (0, 2, ReservationStateEnum.APROBADA, ReservationPurposeEnum.CLASE),
+            (1, 4, ReservationStateEnum.APROBADA, ReservationPurposeEnum.CLASE),
+            (2, 1, ReservationStateEnum.PENDIENTE, ReservationPurposeEnum.REUNION),
+        ):
+            start = base + timedelta(days=offset)
+            LocalReservation.objects.create(
+                user=cls.user,
+                local=cls.lab,
+                start_time=start,
+                end_time=start + timedelta(hours=hours),
+                purpose=purpose,
+                purpose_detail='Actividad',
+                expected_attendees=20,
+                responsible_name='Stats User',
+                responsible_phone='52345682',
+                responsible_email='labs_stats@uho.edu.cu',
+                state=state,
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_local_statistics(self):
+        resp = self.client.get(f'/api/v1/labs/locals/{self.lab.pk}/statistics/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        data = resp.json()
+        self.assertEqual(data['total_reservations'], 3)
+        self.assertEqual(data['approved_reservations'], 2)
+        self.assertEqual(data['pending_reservations'], 1)
+        self.assertEqual(data['upcoming_reservations'], 2)
+        self.assertAlmostEqual(data['average_duration_hours'], 3.0)
+        self.assertEqual(data['most_common_purpose'], str(ReservationPurposeEnum.CLASE.label))
+
+    def test_date_window_and_campus_variant(self):
+        day = self.first_day.isoformat()
+        resp = self.client.get(f'/api/v1/labs/locals/statistics/?date_from={day}&date_to={day}')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        rows = {row['code']: row for row in resp.json()['results']}
+        self.assertEqual(rows['TEST-STATS-1']['total_reservations'], 1)
+        self.assertAlmostEqual(rows['TEST-STATS-1']['average_duration_hours'], 2.0)
+        self.assertEqual(rows['TEST-STATS-2']['total_reservations'], 0)
+
+        resp = self.client.get('/api/v1/labs/locals/statistics/?date_from=2024-02-30')
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class OverlapFixtureMixin:
+    """Usuario, local y horario comunes a los tests de solapamiento."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User(
+            username='labs_overlap',
+            email='labs_overlap@uho.edu.cu',
+            first_name='Overlap',
+            last_name='User',
+            user_type='USUARIO',
+            id_card='80030312352',
+            is_active=True,
+        )
+        cls.user.set_password('Demo12345')
+        cls.user.save()
+        cls.local = Local.objects.create(
+            name='Lab solapes', code='TEST-OVERLAP-1',
+            local_type=LocalTypeEnum.LABORATORIO, capacity=40,
+        )
+        cls.start = (timezone.now() + timedelta(days=3)).replace(minute=0, second=0, microsecond=0)
+
+    def _draft(self):
+        return LocalReservation.objects.create(
+            user=self.user,
+            local=self.local,
+            start_time=self.start,
+            end_time=self.start + timedelta(hours=2),
+            purpose=ReservationPurposeEnum.CLASE,
+            purpose_detail='Clase',
+            expected_attendees=20,
+            responsible_name='Overlap User',
+            responsible_phone='52345684',
+            responsible_email='labs_overlap@uho.edu.cu',
+            state=ReservationStateEnum.BORRADOR,
+        )
+
+
+class ReservationOverlapGuardTest(OverlapFixtureMixin, TestCase):
+    """Protección contra solapamientos: columna `occupies_local` y fallback SQLite."""
+
+    def test_occupies_local_follows_state(self):
+        reservation = self._draft()
+        self.assertFalse(reservation.occupies_local)
+        reservation.submit()
+        reservation.refresh_from_db()
+        self.assertTrue(reservation.occupies_local)
+        reservation.cancel('Ya no se necesita')
+        reservation.refresh_from_db()
+        self.assertFalse(reservation.occupies_local)
+
+    def test_second_overlapping_submit_is_rejected(self):
+        from django.core.exceptions import ValidationError
+
+        first, second = self._draft(), self._draft()
+        first.submit()
+        with self.assertRaises(ValidationError):
+            second.submit()
+
+    def test_recognizes_exclusion_violation(self):
+        from django.db import IntegrityError
+        from .availability import is_overlap_violation
+
+        class FakeDriverError(Exception):
+            pgcode = '23P01'
+
+        exc = IntegrityError('conflicting key value')
+        exc.__cause__ = FakeDriverError()
+        self.assertTrue(is_overlap_violation(exc))
+        self.assertFalse(is_overlap_violation(IntegrityError('unique constraint')))
+
+    def test_procedure_admin_bulk_action_syncs_occupies_local(self):
+        from unittest import mock
+
+        from django.contrib import admin
+        from django.test import RequestFactory
+
+        from apps.platform.models import Procedure
+
+        reservation = self._draft()
+        reservation.submit()
+        model_admin = admin.site._registry[Procedure]
+        with mock.patch.object(model_admin, 'message_user'):
+            model_admin.mark_as_rejected(RequestFactory().post('/'), Procedure.objects.filter(pk=reservation.pk))
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.state, 'RECHAZADO')
+        self.assertFalse(reservation.occupies_local)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'La restricción de exclusión sólo existe en PostgreSQL')
+class ReservationExclusionConstraintTest(OverlapFixtureMixin, TestCase):
+    """Restricción `labs_reservation_no_overlap` (migración 0004) en PostgreSQL."""
+
+    def test_database_rejects_overlapping_occupying_rows(self):
+        from django.db import IntegrityError, transaction
+        from .availability import is_overlap_violation
+
+        first, second = self._draft(), self._draft()
+        first.submit()
+        # Directo en la BD, sin pasar por save(): la restricción decide sola
+        with self.assertRaises(IntegrityError) as ctx, transaction.atomic():
+            LocalReservation.objects.filter(pk=second.pk).update(occupies_local=True)
+        self.assertTrue(is_overlap_violation(ctx.exception))
+
+    def test_save_maps_violation_to_validation_error(self):
+        from django.core.exceptions import ValidationError
+
+        first, second = self._draft(), self._draft()
+        first.submit()
+        second.state = ReservationStateEnum.PENDIENTE
+        with self.assertRaises(ValidationError) as ctx:
+            second.save()
+        self.assertIn('local', ctx.exception.message_dict)
+        second.refresh_from_db()
+        self.assertFalse(second.occupies_local)
+
+    def test_non_occupying_overlaps_are_allowed(self):
+        first, second = self._draft(), self._draft()
+        first.submit()
+        second.state = ReservationStateEnum.CANCELADA
+        second.save()
+        self.assertFalse(second.occupies_local)
+
+
+class ICalFeedTest(TestCase):
+    """Feeds iCal de suscripción con token firmado y GET condicional."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User(
+            username='labs_feed',
+            email='labs_feed@uho.edu.cu',
+            first_name='Feed',
+            last_name='User',
+            user_type='USUARIO',
+            id_card='80030312353',
+            is_active=True,
+        )
+        cls.user.set_password('Demo12345')
+        cls.user.save()
+        cls.local = Local.objects.create(
+            name='Lab feed', code='TEST-FEED-1',
+            local_type=LocalTypeEnum.LABORATORIO, capacity=40,
+        )
+        start = (timezone.now() + timedelta(days=2)).replace(minute=0, second=0, microsecond=0)
+        for offset, state in ((0, ReservationStateEnum.APROBADA), (1, ReservationStateEnum.PENDIENTE)):
+            LocalReservation.objects.create(
+                user=cls.user,
+                local=cls.local,
+                start_time=start + timedelta(days=offset),
+                end_time=start + timedelta(days=offset, hours=2),
+                purpose=ReservationPurposeEnum.CLASE,
+                purpose_detail='Clase de prueba',
+                expected_attendees=20,
+                responsible_name='Feed User',
+                responsible_phone='52345685',
+                responsible_email='labs_feed@uho.edu.cu',
+                state=state,
+            )
+
+    def _token(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        resp = client.get(f'/api/v1/labs/reservations/feed-token/?local={self.local.pk}')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertIn('/labs/locals/', resp.json()['local_feed_url'])
+        return resp.json()['token']
+
+    def test_local_feed_with_conditional_get(self):
+        url = f'/api/v1/labs/locals/{self.local.pk}/feed.ics?token={self._token()}'
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertTrue(resp['Content-Type'].startswith('text/calendar'))
+        body = b''.join(resp.streaming_content).decode()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 1)
+
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_user_feed_marks_pending_as_tentative(self):
+        resp = self.client.get(f'/api/v1/labs/me/reservations.ics?token={self._token()}')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        body = b''.join(resp.streaming_content).decode()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        self.assertIn('STATUS:TENTATIVE', body)
+
+    def test_invalid_token_is_rejected(self):
+        resp = self.client.get('/api/v1/labs/me/reservations.ics?token=forged:token')
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_unchanged_poll_is_answered_from_cache(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        url = f'/api/v1/labs/locals/{self.local.pk}/feed.ics?token={self._token()}'
+        resp = self.client.get(url)
+        b''.join(resp.streaming_content)
+        with self.assertNumQueries(0):
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(resp.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_rotation_revokes_previous_token(self):
+        old_token = self._token()
+        self.assertEqual(self._token(), old_token)
+        # Resolución del token ya cacheada antes de rotar
+        resp = self.client.get(f'/api/v1/labs/me/reservations.ics?token={old_token}')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        resp = client.post('/api/v1/labs/reservations/feed-token/rotate/')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        new_token = resp.json()['token']
+        self.assertNotEqual(new_token, old_token)
+
+        resp = self.client.get(f'/api/v1/labs/me/reservations.ics?token={old_token}')
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+        resp = self.client.get(f'/api/v1/labs/me/reservations.ics?token={new_token}')
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+
+
+class BulkReservationActionsTest(TestCase):
+    """Aprobación / rechazo en lote para gestores de reservas."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User(
+            username='labs_bulk_admin',
+            email='labs_bulk_admin@uho.edu.cu',
+            first_name='Bulk',
+            last_name='Admin',
+            user_type='ADMIN',
+            id_card='80030312354',
+            is_active=True,
+            is_staff=True,
+            is_superuser=True,
+        )
+        cls.manager.set_password('Admin12345')
+        cls.manager.save()
+        cls.user = User(
+            username='labs_bulk_user',
+            email='labs_bulk_user@uho.edu.cu',
+            first_name='Bulk',
+            last_name='User',
+            user_type='USUARIO',
+            id_card='80030312355',
+            is_active=True,
+        )
+        cls.user.set_password('Demo12345')
+        cls.user.save()
+        cls.local = Local.objects.create(
+            name='Lab lote', code='TEST-BULK-1',
+            local_type=LocalTypeEnum.LABORATORIO, capacity=40,
+        )
+        cls.start = (timezone.now() + timedelta(days=4)).replace(minute=0, second=0, microsecond=0)
+
+    def _pending(self, offset_hours, hours=2, save=True, state=ReservationStateEnum.PENDIENTE):
+        start = self.start + timedelta(hours=offset_hours)
+        reservation = LocalReservation(
+            user=self.user,
+            local=self.local,
+            start_time=start,
+            end_time=start + timedelta(hours=hours),
+            purpose=ReservationPurposeEnum.CLASE,
+            purpose_detail='Clase',
+            expected_attendees=20,
+            responsible_name='Bulk User',
+            responsible_phone='52345686',
+            responsible_email='labs_bulk_user@uho.edu.cu',
+            state=state,
+        )
+        if save:
+            reservation.save()
+        return reservation
+
+    def _post(self, path, payload):
+        client = APIClient()
+        client.force_authenticate(self.manager)
+        return client.post(f'/api/v1/labs/reservations/{path}/', payload, format='json')
+
+    def test_bulk_approve_updates_batch_and_skips_ineligible(self):
+        from apps.notifications.models import Notificacion
+        from .models import ReservationHistory
+
+        # Sin solapes entre filas que ocupan el local: válido también con la
+        # restricción de exclusión de PostgreSQL
+        first, later = self._pending(0), self._pending(4)
+        cancelled = self._pending(1, state=ReservationStateEnum.CANCELADA)
+        resp = self._post('bulk-approve', {
+            'ids': [str(first.pk), str(cancelled.pk), str(later.pk)],
+            'observation': 'Inicio de curso',
+        })
+        self.assertEqual(resp.status_code, status.HTTP_200_OK)
+        self.assertEqual(set(resp.json()['updated']), {str(first.pk), str(later.pk)})
+        self.assertEqual([item['id'] for item in resp.json()['skipped']], [str(cancelled.pk)])
+
+        first.refresh_from_db()
+        self.assertEqual(first.state, ReservationStateEnum.APROBADA)
+        self.assertEqual(first.approved_by, self.manager)
+        self.assertEqual(first.observation, 'Inicio de curso')
+        self.assertEqual(ReservationHistory.objects.filter(action='APPROVED').count(), 2)
+        self.assertEqual(Notificacion.objects.filter(para=self.user).count(), 2)
+
+    def test_approval_conflicts_within_batch(self):
+        from .services import _approval_conflicts
+
+        # Pendientes solapadas no pueden coexistir en PostgreSQL: el lote se
+        # arma en memoria y sólo lo aprobado se lee de la BD
+        approved = self._pending(8, state=ReservationStateEnum.APROBADA)
+        first, overlapping, later, clashing = (
+            self._pending(offset, save=False) for offset in (0, 1, 4, 9)
+        )
+        conflicts = _approval_conflicts([first, overlapping, later, clashing])
+        self.assertEqual(set(conflicts), {overlapping.pk, clashing.pk})
+        self.assertNotIn(approved.pk, conflicts)
+
+    def test_bulk_reject_requires_reason(self):
+        reservation = self._pending(0)
+        resp = self._post('bulk-reject', {'ids': [str(reservation.pk)]})
+        self.assertEqual(resp.status_code, status.HTTP_400_BAD_REQUEST)
+
+        resp = self._post('bulk-reject', {'ids': [str(reservation.pk)], 'reason': 'Sin cupo'})
+        self.assertEqual(resp.json()['updated'], [str(reservation.pk)])
+        reservation.refresh_from_db()
+        self.assertEqual(reservation.state, ReservationStateEnum.RECHAZADA)
+        self.assertEqual(reservation.rejection_reason, 'Sin cupo')
+        self.assertFalse(reservation.occupies_local)
+
+    def test_regular_users_cannot_use_bulk_actions(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        resp = client.post('/api/v1/labs/reservations/bulk-cancel/', {'ids': [], 'reason': 'x'}, format='json')
+        self.assertEqual(resp.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ReservationAuditDiffTest(TestCase):
+    """Los diffs de auditoría salen del tracker, sin releer la reserva."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User(
+            username='labs_diff',
+            email='labs_diff@uho.edu.cu',
+            first_name='Diff',
+            last_name='User',
+            user_type='USUARIO',
+            id_card='80030312356',
+            is_active=True,
+        )
+        cls.user.set_password('Demo12345')
+        cls.user.save()
+        cls.local = Local.objects.create(
+            name='Aula diff', code='TEST-DIFF-1',
+            local_type=LocalTypeEnum.AULA, capacity=30,
+        )
+        cls.other_local = Local.objects.create(
+            name='Aula diff 2', code='TEST-DIFF-2',
+            local_type=LocalTypeEnum.AULA, capacity=30,
+        )
+        start = timezone.now() + timedelta(days=5)
+        cls.reservation = LocalReservation.objects.create(
+            user=cls.user,
+            local=cls.local,
+            start_time=start,
+            end_time=start + timedelta(hours=2),
+            purpose=ReservationPurposeEnum.CLASE,
+            purpose_detail='Clase',
+            expected_attendees=10,
+            responsible_name='Diff User',
+            responsible_phone='52345681',
+            responsible_email='labs_diff@uho.edu.cu',
+        )
+
+    def test_state_change_carries_field_diff_without_reselect(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from apps.audit.models import AuditLog
+
+        reservation = LocalReservation.objects.get(pk=self.reservation.pk)
+        reservation.state = ReservationStateEnum.RECHAZADA
+        reservation.rejection_reason = 'Sin cupo'
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as queries:
+                reservation.save()
+
+        selects = [q['sql'] for q in queries if q['sql'].startswith('SELECT') and 'labs_localreservation' in q['sql']]
+        self.assertEqual(selects, [])
+        entry = AuditLog.objects.get(action='state_change', resource_id=str(reservation.pk))
+        self.assertEqual(entry.metadata['old_state'], ReservationStateEnum.BORRADOR)
+        self.assertEqual(
+            entry.metadata['changes']['rejection_reason'], {'old': '', 'new': 'Sin cupo'},
+        )
+        self.assertNotIn('updated_at', entry.metadata['changes'])
+
+    def test_plain_update_is_logged_with_changes(self):
+        from apps.audit.models import AuditLog
+
+        reservation = LocalReservation.objects.get(pk=self.reservation.pk)
+        reservation.local = self.other_local
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation.save()
+            reservation.save()  # sin cambios: no registra nada
+
+        entries = AuditLog.objects.filter(action='update', resource_id=str(reservation.pk))
+        self.assertEqual(entries.count(), 1)
+        self.assertEqual(
+            entries.get().metadata['changes'],
+            {'local_id': {'old': str(self.local.pk), 'new': str(self.other_local.pk)}},
+        )
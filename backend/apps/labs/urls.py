@@ -8,6 +8,8 @@ from .views_extensions import (
     EquipmentViewSet,
     LocalEquipmentViewSet,
     ReservationSeriesViewSet,
+    local_feed,
+    my_reservations_feed,
     reservation_ical,
 )
 
@@ -23,6 +25,8 @@ router.register(r'checkin', CheckInView, basename='checkin')
 app_name = 'labs'
 
 urlpatterns = [
+    path('locals/<uuid:pk>/feed.ics', local_feed, name='local-feed'),
+    path('me/reservations.ics', my_reservations_feed, name='my-reservations-feed'),
     path('', include(router.urls)),
     path('reservations/<uuid:pk>/ical/', reservation_ical, name='reservation-ical'),
 ]
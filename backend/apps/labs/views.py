@@ -9,15 +9,17 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, BasePermission
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.dateparse import parse_date
+from django.utils.http import http_date, urlencode
+from django.urls import reverse
+from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db.models import Q, Count, Avg, F
 from django_filters.rest_framework import DjangoFilterBackend
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 from apps.internal.permissions import is_reservas_staff
 
-# Gestores de otros módulos no deben ver/operar el módulo de reservas.
-_FOREIGN_MODULE_ROLES = ('GESTOR_INTERNO', 'GESTOR_SECRETARIA')
-
 
 class CanManageLocalsRBAC(BasePermission):
     """Escritura de locales para staff de reservas (admin / GESTOR_RESERVAS)."""
@@ -42,6 +44,7 @@ from .serializers import (
     LocalDetailSerializer,
     LocalCreateUpdateSerializer,
     LocalAvailabilitySerializer,
+    LocalSearchSerializer,
     ReservationListSerializer,
     ReservationDetailSerializer,
     ReservationCreateSerializer,
@@ -50,11 +53,16 @@ from .serializers import (
     ReservationApproveSerializer,
     ReservationRejectSerializer,
     ReservationCancelSerializer,
+    ReservationBulkActionSerializer,
     ReservationHistorySerializer,
     LocalStatisticsSerializer,
     ReservationCalendarSerializer,
 )
-from .permissions import IsReservationOwnerOrAdmin, CanApproveReservations
+from .permissions import IsReservationOwnerOrAdmin, CanApproveReservations, is_foreign_module_user
+from .availability import BLOCKING_STATES, find_conflicts, free_gaps, get_local_generations
+from .feeds import make_feed_token, rotate_feed_key
+from .projections import calendar_etag, get_month_projections, parse_month
+from .services import bulk_transition, reservation_statistics
 
 
 # ============================================================================
@@ -90,7 +98,11 @@ class LocalViewSet(viewsets.ModelViewSet):
     - GET /api/locals/{id}/availability/ - Verificar disponibilidad
     - GET /api/locals/{id}/reservations/ - Reservas del local
     - GET /api/locals/{id}/statistics/ - Estadísticas del local
+    - GET /api/locals/statistics/ - Estadísticas de todos los locales
+    - GET /api/locals/{id}/calendar/ - Calendario mensual del local
+    - GET /api/locals/calendar/ - Calendario mensual de todos los locales
     - GET /api/locals/active/ - Solo locales activos
+    - POST /api/locals/search/ - Buscar locales libres (varios locales a la vez)
     """
     
     queryset = Local.objects.all()
@@ -108,6 +120,8 @@ class LocalViewSet(viewsets.ModelViewSet):
             return LocalCreateUpdateSerializer
         elif self.action == 'availability':
             return LocalAvailabilitySerializer
+        elif self.action == 'search':
+            return LocalSearchSerializer
         elif self.action == 'statistics':
             return LocalStatisticsSerializer
         return LocalDetailSerializer
@@ -187,20 +201,26 @@ class LocalViewSet(viewsets.ModelViewSet):
             }
             
             if not is_available:
-                # Obtener reservas conflictivas
-                conflicting = LocalReservation.objects.filter(
-                    local=local,
-                    state__in=[
-                        ReservationStateEnum.APROBADA,
-                        ReservationStateEnum.EN_CURSO,
-                        ReservationStateEnum.PENDIENTE,
-                    ],
-                ).filter(
-                    Q(start_time__lt=end_time) & Q(end_time__gt=start_time)
+                # Obtener reservas conflictivas (IDs desde el índice si aplica)
+                conflict_ids = find_conflicts(
+                    local.pk,
+                    start_time,
+                    end_time,
+                    exclude_id=exclude_reservation.id if exclude_reservation else None,
                 )
-                
-                if exclude_reservation:
-                    conflicting = conflicting.exclude(id=exclude_reservation.id)
+                if conflict_ids is not None:
+                    conflicting = LocalReservation.objects.filter(id__in=conflict_ids)
+                else:
+                    conflicting = LocalReservation.objects.filter(
+                        local=local,
+                        state__in=BLOCKING_STATES,
+                    ).filter(
+                        Q(start_time__lt=end_time) & Q(end_time__gt=start_time)
+                    )
+
+                    if exclude_reservation:
+                        conflicting = conflicting.exclude(id=exclude_reservation.id)
+                conflicting = conflicting.select_related('local', 'user')
                 
                 response_data['conflicting_reservations'] = ReservationListSerializer(
                     conflicting,
@@ -211,6 +231,107 @@ class LocalViewSet(viewsets.ModelViewSet):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['post'])
+    def search(self, request):
+        """
+        POST /api/locals/search/
+        Busca todos los locales libres en una ventana de tiempo
+        
+        Body:
+        {
+            "start_time": "2024-01-16T10:00:00Z",
+            "end_time": "2024-01-16T12:00:00Z",
+            "min_capacity": 30 (opcional),
+            "local_type": "LABORATORIO" (opcional),
+            "equipment": [{"equipment": "uuid", "quantity": 1}] (opcional),
+            "next_slots": 3 (opcional, huecos libres siguientes por local),
+            "search_until": "2024-01-23T00:00:00Z" (opcional, límite de huecos)
+        }
+        
+        Sin ``next_slots`` retorna solo los locales libres. Con ``next_slots``
+        retorna todos los locales candidatos, cada uno con ``is_free`` y sus
+        próximos huecos de la misma duración. Resuelve todo con una consulta
+        de locales y una de reservas; los huecos se calculan en memoria.
+        """
+        serializer = LocalSearchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        data = serializer.validated_data
+        start_time = data['start_time']
+        end_time = data['end_time']
+        search_until = data['search_until']
+        next_slots = data['next_slots']
+        duration = end_time - start_time
+        
+        locals_qs = Local.objects.filter(is_active=True)
+        if data.get('min_capacity'):
+            locals_qs = locals_qs.filter(capacity__gte=data['min_capacity'])
+        if data.get('local_type'):
+            locals_qs = locals_qs.filter(local_type=data['local_type'])
+        
+        requirements = data.get('equipment') or []
+        if requirements:
+            matches = Q()
+            for req in requirements:
+                matches |= Q(
+                    equipment_items__equipment_id=req['equipment'],
+                    equipment_items__quantity__gte=req['quantity'],
+                    equipment_items__operational=True,
+                )
+            locals_qs = locals_qs.annotate(
+                matched_equipment=Count('equipment_items', filter=matches, distinct=True)
+            ).filter(matched_equipment=len({req['equipment'] for req in requirements}))
+        
+        candidates = list(locals_qs.order_by('code'))
+        
+        # Una sola consulta de reservas para todos los locales candidatos
+        horizon = search_until if next_slots else end_time
+        busy_by_local = {local.pk: [] for local in candidates}
+        busy = LocalReservation.objects.filter(
+            local_id__in=list(busy_by_local),
+            state__in=BLOCKING_STATES,
+            start_time__lt=horizon,
+            end_time__gt=start_time,
+        ).order_by('start_time').values_list('local_id', 'start_time', 'end_time')
+        for local_id, busy_start, busy_end in busy:
+            busy_by_local[local_id].append((busy_start, busy_end))
+        
+        results = []
+        for local in candidates:
+            intervals = busy_by_local[local.pk]
+            is_free = not any(
+                busy_start < end_time and busy_end > start_time
+                for busy_start, busy_end in intervals
+            )
+            if not is_free and not next_slots:
+                continue
+            item = {
+                'id': str(local.pk),
+                'name': local.name,
+                'code': local.code,
+                'local_type': local.local_type,
+                'local_type_display': local.get_local_type_display(),
+                'capacity': local.capacity,
+                'requires_approval': local.requires_approval,
+                'is_free': is_free,
+            }
+            if next_slots:
+                item['next_slots'] = [
+                    {'start_time': gap_start, 'end_time': gap_end}
+                    for gap_start, gap_end in free_gaps(
+                        intervals, start_time, search_until, duration, limit=next_slots
+                    )
+                ]
+            results.append(item)
+        
+        return Response({
+            'start_time': start_time,
+            'end_time': end_time,
+            'count': sum(1 for item in results if item['is_free']),
+            'results': results,
+        })
+    
     @action(detail=True, methods=['get'])
     def reservations(self, request, pk=None):
         """
@@ -244,107 +365,146 @@ class LocalViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['get'])
     def statistics(self, request, pk=None):
         """
-        GET /api/locals/{id}/statistics/
-        Obtiene estadísticas del local
+        GET /api/locals/{id}/statistics/?date_from=2024-01-01&date_to=2024-01-31
+        Obtiene estadísticas del local (ventana de fechas opcional)
         """
         local = self.get_object()
-        reservations = local.reservations.all()
-        
-        stats = {
-            'total_reservations': reservations.count(),
-            'approved_reservations': reservations.filter(
-                state=ReservationStateEnum.APROBADA
-            ).count(),
-            'pending_reservations': reservations.filter(
-                state=ReservationStateEnum.PENDIENTE
-            ).count(),
-            'rejected_reservations': reservations.filter(
-                state=ReservationStateEnum.RECHAZADA
-            ).count(),
-            'cancelled_reservations': reservations.filter(
-                state=ReservationStateEnum.CANCELADA
-            ).count(),
-            'upcoming_reservations': reservations.filter(
-                state=ReservationStateEnum.APROBADA,
-                start_time__gte=timezone.now()
-            ).count(),
-            'average_duration_hours': 0,
-            'most_common_purpose': None,
-        }
-        
-        # Calcular duración promedio
-        approved = reservations.filter(state=ReservationStateEnum.APROBADA)
-        if approved.exists():
-            durations = [r.duration_hours for r in approved]
-            stats['average_duration_hours'] = sum(durations) / len(durations)
-        
-        # Propósito más común
-        purpose_counts = reservations.values('purpose').annotate(
-            count=Count('purpose')
-        ).order_by('-count').first()
-        
-        if purpose_counts:
-            stats['most_common_purpose'] = dict(
-                ReservationPurposeEnum.choices
-            ).get(purpose_counts['purpose'])
-        
+        window, error = self._statistics_window(request)
+        if error:
+            return error
+
+        stats = reservation_statistics([local.pk], **window)[local.pk]
         serializer = LocalStatisticsSerializer(stats)
         return Response(serializer.data)
-    
+
+    @action(detail=False, methods=['get'], url_path='statistics', url_name='campus-statistics')
+    def campus_statistics(self, request):
+        """
+        GET /api/locals/statistics/?date_from=...&date_to=...[&local_type=AULA]
+        Estadísticas de todos los locales en una sola respuesta
+        """
+        window, error = self._statistics_window(request)
+        if error:
+            return error
+
+        locals_ = list(self.filter_queryset(self.get_queryset()).only('id', 'name', 'code'))
+        stats = reservation_statistics([local.pk for local in locals_], **window)
+        return Response({
+            'date_from': window['date_from'],
+            'date_to': window['date_to'],
+            'results': [
+                {
+                    'id': local.pk,
+                    'name': local.name,
+                    'code': local.code,
+                    **LocalStatisticsSerializer(stats[local.pk]).data,
+                }
+                for local in locals_
+            ],
+        })
+
+    def _statistics_window(self, request):
+        """Lee ``date_from`` / ``date_to``; retorna ``(window, error_response)``."""
+        window = {}
+        for param in ('date_from', 'date_to'):
+            value = request.query_params.get(param)
+            try:
+                window[param] = parse_date(value) if value else None
+            except ValueError:
+                window[param] = None
+            if value and window[param] is None:
+                return None, Response(
+                    {'error': f'Formato de {param} inválido. Use YYYY-MM-DD'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        if window['date_from'] and window['date_to'] and window['date_from'] > window['date_to']:
+            return None, Response(
+                {'error': 'date_from debe ser anterior o igual a date_to'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return window, None
+
     @action(detail=True, methods=['get'])
     def calendar(self, request, pk=None):
         """
         GET /api/locals/{id}/calendar/?month=2024-01
-        Obtiene las reservas del local organizadas por día para un mes
+        Obtiene las reservas del local organizadas por día para un mes.
+
+        Se sirve desde una proyección cacheada y admite GET condicional
+        (If-None-Match / If-Modified-Since).
         """
         local = self.get_object()
+        return self._month_calendar_response(
+            request,
+            [local],
+            lambda month_str, projections: {
+                'month': month_str,
+                'local': projections[local.pk]['local'],
+                'calendar': projections[local.pk]['calendar'],
+            },
+        )
+
+    @action(detail=False, methods=['get'], url_path='calendar', url_name='campus-calendar')
+    def campus_calendar(self, request):
+        """
+        GET /api/locals/calendar/?month=2024-01[&local_type=AULA]
+        Grilla mensual de todos los locales activos en una sola respuesta.
+        """
+        locals_ = list(self.filter_queryset(self.get_queryset()).filter(is_active=True))
+        return self._month_calendar_response(
+            request,
+            locals_,
+            lambda month_str, projections: {
+                'month': month_str,
+                'locals': [
+                    {
+                        'local': projections[local.pk]['local'],
+                        'calendar': projections[local.pk]['calendar'],
+                    }
+                    for local in locals_
+                    if local.pk in projections
+                ],
+            },
+        )
+
+    def _month_calendar_response(self, request, locals_, render):
+        """Respuesta de calendario con ETag / Last-Modified y 304."""
         month_str = request.query_params.get('month')
-        
         if not month_str:
             return Response(
                 {'error': 'Se requiere el parámetro month (formato: YYYY-MM)'},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        
         try:
-            year, month = map(int, month_str.split('-'))
-            start_date = datetime(year, month, 1)
-            
-            # Calcular último día del mes
-            if month == 12:
-                end_date = datetime(year + 1, 1, 1)
-            else:
-                end_date = datetime(year, month + 1, 1)
-            
-            # Obtener reservas del mes
-            reservations = local.reservations.filter(
-                state__in=[ReservationStateEnum.APROBADA, ReservationStateEnum.EN_CURSO],
-                start_time__gte=start_date,
-                start_time__lt=end_date
-            ).order_by('start_time')
-            
-            # Organizar por día
-            calendar_data = {}
-            for reservation in reservations:
-                date_key = reservation.start_time.date().isoformat()
-                if date_key not in calendar_data:
-                    calendar_data[date_key] = []
-                calendar_data[date_key].append(
-                    ReservationListSerializer(reservation).data
-                )
-            
-            return Response({
-                'month': month_str,
-                'local': LocalListSerializer(local).data,
-                'calendar': calendar_data
-            })
-            
+            year, month = parse_month(month_str)
         except (ValueError, TypeError):
             return Response(
                 {'error': 'Formato de mes inválido. Use YYYY-MM'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        local_ids = [local.pk for local in locals_]
+        generations = get_local_generations(local_ids)
+        etag = calendar_etag(local_ids, year, month, generations)
+
+        # El ETag no requiere construir la proyección
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        projections = get_month_projections(locals_, year, month, generations)
+        last_modified = max(
+            (projection['last_modified'] for projection in projections.values()),
+            default=None,
+        )
+
+        response = Response(render(month_str, projections))
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
 
 # ============================================================================
 # VIEWSET DE RESERVAS
@@ -367,6 +527,9 @@ class LocalReservationViewSet(viewsets.ModelViewSet):
     - GET /api/reservations/{id}/history/ - Historial de cambios
     - GET /api/reservations/my_reservations/ - Mis reservas
     - GET /api/reservations/pending/ - Pendientes de aprobación (staff)
+    - GET /api/reservations/feed-token/ - URLs de suscripción iCal
+    - POST /api/reservations/feed-token/rotate/ - Revocar las URLs iCal emitidas
+    - POST /api/reservations/bulk-approve/ | bulk-reject/ | bulk-cancel/ - En lote (staff)
     """
     
     queryset = LocalReservation.objects.all()
@@ -394,11 +557,13 @@ class LocalReservationViewSet(viewsets.ModelViewSet):
             return ReservationCancelSerializer
         elif self.action == 'history':
             return ReservationHistorySerializer
+        elif self.action in ['bulk_approve', 'bulk_reject', 'bulk_cancel']:
+            return ReservationBulkActionSerializer
         return ReservationDetailSerializer
     
     def get_permissions(self):
         """Define permisos según la acción"""
-        if self.action in ['approve', 'reject', 'pending']:
+        if self.action in ['approve', 'reject', 'pending', 'bulk_approve', 'bulk_reject', 'bulk_cancel']:
             return [CanApproveReservations()]
         elif self.action in ['update', 'partial_update', 'destroy', 'cancel']:
             return [IsReservationOwnerOrAdmin()]
@@ -413,10 +578,9 @@ class LocalReservationViewSet(viewsets.ModelViewSet):
         )
 
         user = self.request.user
-        user_type = getattr(user, 'user_type', '')
 
         # Gestores de otros módulos no ven reservas
-        if user_type in _FOREIGN_MODULE_ROLES:
+        if is_foreign_module_user(user):
             return queryset.none()
 
         # Staff del módulo de reservas (admin / GESTOR_RESERVAS) ve todas
@@ -453,6 +617,45 @@ class LocalReservationViewSet(viewsets.ModelViewSet):
         serializer = ReservationListSerializer(queryset, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'], url_path='feed-token')
+    def feed_token(self, request):
+        """
+        GET /api/reservations/feed-token/[?local={id}]
+        Token firmado y URLs de suscripción iCal (Outlook, Thunderbird, ...)
+        """
+        return self._feed_urls(request, make_feed_token(request.user))
+
+    @action(detail=False, methods=['post'], url_path='feed-token/rotate')
+    def rotate_feed_token(self, request):
+        """
+        POST /api/reservations/feed-token/rotate/[?local={id}]
+        Rota la clave de feed: las URLs de suscripción anteriores dejan de
+        funcionar. Retorna las nuevas.
+        """
+        return self._feed_urls(request, rotate_feed_key(request.user))
+
+    def _feed_urls(self, request, token):
+        query = urlencode({'token': token})
+        data = {
+            'token': token,
+            'my_reservations_url': request.build_absolute_uri(
+                f"{reverse('labs:my-reservations-feed')}?{query}"
+            ),
+        }
+        local_id = request.query_params.get('local')
+        if local_id:
+            try:
+                local = Local.objects.get(pk=local_id)
+            except (Local.DoesNotExist, DjangoValidationError):
+                return Response(
+                    {'error': 'Local no encontrado'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            data['local_feed_url'] = request.build_absolute_uri(
+                f"{reverse('labs:local-feed', kwargs={'pk': local.pk})}?{query}"
+            )
+        return Response(data)
+
     @action(detail=False, methods=['get'])
     def upcoming(self, request):
         """
@@ -644,6 +847,66 @@ class LocalReservationViewSet(viewsets.ModelViewSet):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['post'], url_path='bulk-approve',
+            permission_classes=[CanApproveReservations])
+    def bulk_approve(self, request):
+        """
+        POST /api/reservations/bulk-approve/
+        Aprueba un lote de reservas pendientes (solo staff)
+        
+        Body:
+        {
+            "ids": ["uuid", ...],
+            "observation": "Comentario opcional"
+        }
+        """
+        return self._bulk_transition(request, 'approve')
+    
+    @action(detail=False, methods=['post'], url_path='bulk-reject',
+            permission_classes=[CanApproveReservations])
+    def bulk_reject(self, request):
+        """
+        POST /api/reservations/bulk-reject/
+        Rechaza un lote de reservas pendientes (solo staff)
+        
+        Body:
+        {
+            "ids": ["uuid", ...],
+            "reason": "Motivo del rechazo"
+        }
+        """
+        return self._bulk_transition(request, 'reject')
+    
+    @action(detail=False, methods=['post'], url_path='bulk-cancel',
+            permission_classes=[CanApproveReservations])
+    def bulk_cancel(self, request):
+        """
+        POST /api/reservations/bulk-cancel/
+        Cancela un lote de reservas (solo staff)
+        
+        Body:
+        {
+            "ids": ["uuid", ...],
+            "reason": "Motivo de la cancelación"
+        }
+        """
+        return self._bulk_transition(request, 'cancel')
+    
+    def _bulk_transition(self, request, bulk_action):
+        serializer = ReservationBulkActionSerializer(
+            data=request.data,
+            context={'request': request, 'bulk_action': bulk_action},
+        )
+        serializer.is_valid(raise_exception=True)
+        updated, skipped = bulk_transition(
+            bulk_action,
+            serializer.validated_data['ids'],
+            request.user,
+            reason=serializer.validated_data['reason'],
+            observation=serializer.validated_data.get('observation'),
+        )
+        return Response({'updated': updated, 'skipped': skipped})
+    
     @action(detail=True, methods=['post'], permission_classes=[CanApproveReservations])
     def start(self, request, pk=None):
         """
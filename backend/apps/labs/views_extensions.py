@@ -1,7 +1,7 @@
 """
 Views adicionales para el módulo labs:
 - Check-in / check-out de una reserva
-- Export iCal (.ics)
+- Export iCal (.ics) de una reserva y feeds de suscripción por local / usuario
 - Creación bulk desde una ReservationSeries
 - Catálogo de equipamiento
 """
@@ -11,19 +11,32 @@ from datetime import datetime
 
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
 from rest_framework import permissions, serializers, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
 from apps.audit.services import log_event
-
+from apps.platform.utils.streaming import streaming_response
+
+from .feeds import (
+    FEED_CACHE_TTL,
+    feed_token_user,
+    local_feed_etag,
+    stream_local_feed,
+    stream_user_feed,
+    user_feed_etag,
+)
 from .models import (
     Equipment,
+    Local,
     LocalEquipment,
     LocalReservation,
     ReservationCheckIn,
     ReservationSeries,
 )
+from .permissions import is_foreign_module_user
+from .services import expand_series
 
 
 class EquipmentSerializer(serializers.ModelSerializer):
@@ -98,35 +111,13 @@ class ReservationSeriesViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'])
     def expand(self, request, pk=None):
-        """Genera las reservas reales a partir de la serie (con validación de conflictos)."""
+        """Genera las reservas reales a partir de la serie (con validación de conflictos).
+
+        Los conflictos se calculan en memoria contra una única consulta y las
+        ocurrencias válidas se insertan en bloque dentro de una transacción.
+        """
         series = self.get_object()
-        created, skipped = [], []
-        for occ in series.expand():
-            # Intentar crear la reserva; si hay conflicto, se saltea
-            try:
-                res = LocalReservation(
-                    user=request.user,
-                    local=series.local,
-                    start_time=occ['start_time'],
-                    end_time=occ['end_time'],
-                    purpose=series.purpose,
-                    purpose_detail=series.purpose_detail,
-                    expected_attendees=series.expected_attendees,
-                    responsible_name=series.responsible_name,
-                    responsible_phone=series.responsible_phone,
-                    responsible_email=series.responsible_email,
-                    state='PENDIENTE',
-                )
-                res.save()
-                created.append(str(res.pk))
-            except Exception as exc:  # noqa: BLE001
-                skipped.append({'start': str(occ['start_time']), 'error': str(exc)})
-        log_event(
-            action='create',
-            resource=series,
-            description='Expansión de serie',
-            metadata={'created': len(created), 'skipped': len(skipped)},
-        )
+        created, skipped = expand_series(series, request.user)
         return Response({'created': created, 'skipped': skipped})
 
 
@@ -161,6 +152,66 @@ def reservation_ical(request, pk):
     return response
 
 
+def _feed_user(request):
+    """Usuario del token firmado (``?token=``) o de la sesión."""
+    token = request.GET.get('token')
+    if token:
+        return feed_token_user(token)
+    if request.user.is_authenticated:
+        return request.user
+    return None
+
+
+def _feed_response(request, etag, build):
+    """Responde 304 si el ETag coincide; si no, ``build()`` → ``(iterador, nombre)``.
+
+    ``build`` sólo se llama sin 304, así que las lecturas de BD que haga
+    (p.ej. el `Local`) no cuestan nada a los sondeos sin cambios.
+    """
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    content, filename = build()
+    response = streaming_response(request, content, content_type='text/calendar; charset=utf-8')
+    response['ETag'] = etag
+    response['Content-Disposition'] = f'inline; filename="{filename}"'
+    patch_cache_control(response, private=True, max_age=FEED_CACHE_TTL)
+    return response
+
+
+def local_feed(request, pk):
+    """Feed iCal de suscripción con las reservas confirmadas de un local."""
+    user = _feed_user(request)
+    if user is None or is_foreign_module_user(user):
+        return HttpResponse(status=403)
+    try:
+        import icalendar  # noqa: F401
+    except ImportError:
+        return HttpResponse('icalendar no instalado', status=503)
+
+    etag = local_feed_etag(pk)
+
+    def build():
+        local = get_object_or_404(Local, pk=pk)
+        return stream_local_feed(local, etag), f'{local.code}.ics'
+
+    return _feed_response(request, etag, build)
+
+
+def my_reservations_feed(request):
+    """Feed iCal personal con las reservas del usuario del token."""
+    user = _feed_user(request)
+    if user is None:
+        return HttpResponse(status=403)
+    try:
+        import icalendar  # noqa: F401
+    except ImportError:
+        return HttpResponse('icalendar no instalado', status=503)
+
+    etag = user_feed_etag(user.pk)
+    return _feed_response(request, etag, lambda: (stream_user_feed(user, etag), 'mis-reservas.ics'))
+
+
 class CheckInView(viewsets.ViewSet):
     """Endpoints de check-in/out para reservas."""
 
@@ -1,11 +1,15 @@
-from .models import Notificacion, Usuario
+from . import counters
 
 def notificacionesContext(request):
     try:
         usuario = request.user
-        notificaciones_count = Notificacion.objects.filter(para=usuario).count
+        if not usuario.is_authenticated:
+            return {}
+        # Una búsqueda por clave primaria (ver counters.py), no un COUNT por render
+        contador = counters.get_counts(usuario.pk)
         return {
-            'notificaciones_count': notificaciones_count,
+            'notificaciones_count': contador['total'],
+            'notificaciones_sin_leer': contador['sin_leer'],
         }
     except:
-        return {}
\ No newline at end of file
+        return {}
@@ -0,0 +1,169 @@
+"""
+Contadores de notificaciones por usuario (total, sin leer, urgentes).
+
+`estadisticas`, el badge y el stream SSE contaban filas de `Notificacion` en
+cada lectura. Ahora leen una fila de `ContadorNotificaciones` por clave
+primaria, que se actualiza con ``F()`` en la misma transacción que el cambio:
+
+- ``save()`` / ``delete()`` de una notificación: signals (`signals.py`), con
+  los valores anteriores del ``FieldTracker`` del modelo.
+- ``bulk_create`` (`notify_many`, `notify_state_changes`,
+  `Notificacion.notificar_multiple`): `add_created`.
+- ``update()`` / borrados masivos (`marcar_todas_leidas`,
+  `limpiar_expiradas`): `apply_many` con los deltas agregados, dentro de
+  `suspended()` si además se disparan los signals.
+
+Una fila ausente (usuarios anteriores a los contadores) no se incrementa: se
+recalcula desde `Notificacion` al primer uso. `rebuild(user_ids)` repara
+contadores desviados.
+
+- `get_counts(user_id)` — ``{'total', 'sin_leer', 'urgentes'}``.
+- `unread_counts(user_ids)` — ``{str(id): sin_leer}`` en una consulta.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterable
+
+from django.db.models import Count, F, Q
+
+from .models import ContadorNotificaciones, Notificacion
+
+URGENTE = 'CRITICAL'
+FIELDS = ('total', 'sin_leer', 'urgentes')
+
+_suspended: ContextVar[bool] = ContextVar('notification_counters_suspended', default=False)
+
+
+def contribution(visto: bool, prioridad: str) -> tuple[int, int, int]:
+    """Lo que aporta una notificación a ``(total, sin_leer, urgentes)``."""
+    return 1, 0 if visto else 1, 1 if prioridad == URGENTE else 0
+
+
+def _scale(delta, sign: int) -> tuple[int, int, int]:
+    return tuple(sign * value for value in delta)
+
+
+def _add(a, b) -> tuple[int, int, int]:
+    return tuple(x + y for x, y in zip(a, b))
+
+
+@contextmanager
+def suspended():
+    """Desactiva los signals de contadores (el llamador aplica deltas agregados)."""
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+
+
+def is_suspended() -> bool:
+    return _suspended.get()
+
+
+def deltas_for(queryset, sign: int = 1) -> dict:
+    """Aporte agregado por usuario de las filas de ``queryset`` (una consulta)."""
+    rows = (
+        queryset.order_by().values('para_id').annotate(
+            n_total=Count('id'),
+            n_sin_leer=Count('id', filter=Q(visto=False)),
+            n_urgentes=Count('id', filter=Q(prioridad=URGENTE)),
+        )
+    )
+    return {
+        row['para_id']: _scale((row['n_total'], row['n_sin_leer'], row['n_urgentes']), sign)
+        for row in rows
+    }
+
+
+def apply(user_id, delta: tuple[int, int, int]) -> None:
+    apply_many({user_id: delta})
+
+
+def apply_many(deltas: dict) -> None:
+    """Suma ``{user_id: (total, sin_leer, urgentes)}`` a los contadores.
+
+    Un UPDATE por delta distinto (en un aviso masivo todos comparten delta).
+    Las filas que no existen se recalculan completas después.
+    """
+    by_delta: dict[tuple, list] = defaultdict(list)
+    for user_id, delta in deltas.items():
+        if any(delta):
+            by_delta[tuple(delta)].append(user_id)
+
+    short = False
+    for delta, user_ids in by_delta.items():
+        updated = ContadorNotificaciones.objects.filter(pk__in=user_ids).update(**{
+            field: F(field) + value for field, value in zip(FIELDS, delta) if value
+        })
+        short = short or updated < len(user_ids)
+
+    if short:
+        user_ids = {uid for ids in by_delta.values() for uid in ids}
+        existing = set(ContadorNotificaciones.objects.filter(pk__in=user_ids).values_list('pk', flat=True))
+        rebuild(user_ids - existing, create_only=True)
+
+
+def add_created(notifications: Iterable[Notificacion]) -> None:
+    """Cuenta notificaciones creadas sin ``save()`` (``bulk_create``)."""
+    if is_suspended():
+        return
+    deltas: dict = {}
+    for notification in notifications:
+        delta = contribution(notification.visto, notification.prioridad)
+        deltas[notification.para_id] = _add(deltas.get(notification.para_id, (0, 0, 0)), delta)
+    apply_many(deltas)
+
+
+def rebuild(user_ids: Iterable, *, create_only: bool = False) -> dict:
+    """Recalcula los contadores de ``user_ids`` desde `Notificacion`."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    counts = {uid: (0, 0, 0) for uid in user_ids}
+    counts.update(deltas_for(Notificacion.objects.filter(para_id__in=user_ids)))
+    rows = [
+        ContadorNotificaciones(usuario_id=uid, **dict(zip(FIELDS, values)))
+        for uid, values in counts.items()
+    ]
+    if create_only:
+        # Otra transacción pudo crear la fila entre medias: la suya vale
+        ContadorNotificaciones.objects.bulk_create(rows, ignore_conflicts=True)
+    else:
+        ContadorNotificaciones.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=['usuario'], update_fields=list(FIELDS),
+        )
+    return counts
+
+
+def _user_pk(value):
+    return ContadorNotificaciones._meta.pk.target_field.to_python(value)
+
+
+def _read(user_ids: set) -> dict:
+    found = {
+        row[0]: tuple(max(0, value) for value in row[1:])
+        for row in ContadorNotificaciones.objects.filter(pk__in=user_ids).values_list('pk', *FIELDS)
+    }
+    missing = user_ids - set(found)
+    if missing:
+        found.update(rebuild(missing, create_only=True))
+    return found
+
+
+def get_counts(user_id) -> dict[str, int]:
+    """Contadores de un usuario: una búsqueda por clave primaria."""
+    user_id = _user_pk(user_id)
+    values = _read({user_id})[user_id]
+    return dict(zip(FIELDS, values))
+
+
+def unread_counts(user_ids: Iterable) -> dict[str, int]:
+    """``{str(user_id): sin_leer}`` de varios usuarios."""
+    ids = {_user_pk(uid) for uid in user_ids}
+    if not ids:
+        return {}
+    return {str(uid): values[1] for uid, values in _read(ids).items()}
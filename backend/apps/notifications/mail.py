@@ -0,0 +1,237 @@
+"""
+Backend SMTP con sesiones reutilizables entre tareas del mismo worker.
+
+`send_email_task` abre una conexión por email (`msg.send()` crea un backend
+nuevo): conexión + handshake TLS + AUTH por cada mensaje, que en los picos de
+cambios de estado de fin de curso domina el tiempo del worker.
+`PooledSMTPBackend` devuelve la sesión autenticada a un pool del proceso al
+cerrar, y el siguiente envío la toma de ahí.
+
+- Una sesión ociosa más de ``EMAIL_POOL_MAX_IDLE`` segundos, o que ya envió
+  ``EMAIL_POOL_MAX_MESSAGES`` mensajes, se cierra en vez de reutilizarse (los
+  relays cortan las sesiones inactivas y limitan mensajes por conexión).
+- Si el servidor cortó la sesión, el mensaje se reintenta una vez con una
+  conexión nueva.
+- El pool guarda como mucho ``EMAIL_POOL_SIZE`` sesiones ociosas por destino.
+
+Métricas: cada sesión cuenta mensajes, bytes y errores; `pool_stats()` las
+devuelve (con mensajes/segundo) y al retirarse una sesión se registran en el
+log. El pool es por proceso: con Celery prefork cada worker tiene el suyo.
+
+Sólo lo usa `send_email_batch_task` (cuando ``EMAIL_BACKEND`` es el SMTP de
+Django); el resto de procesos conserva el backend global:
+
+    NOTIFICATIONS_EMAIL_BACKEND = 'apps.notifications.mail.PooledSMTPBackend'
+"""
+from __future__ import annotations
+
+import atexit
+import logging
+import smtplib
+import ssl
+import threading
+import time
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.mail.backends.smtp import EmailBackend
+from django.core.mail.message import sanitize_address
+
+logger = logging.getLogger(__name__)
+
+# Errores que indican que la sesión ya no sirve (no que el mensaje es inválido)
+DISCONNECT_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, ssl.SSLError, TimeoutError)
+
+
+@dataclass
+class _Session:
+    key: tuple
+    smtp: object
+    opened_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    messages: int = 0
+    bytes_sent: int = 0
+    errors: int = 0
+
+    def stats(self) -> dict:
+        elapsed = max(self.last_used - self.opened_at, 1e-6)
+        host, port, username = self.key[:3]
+        return {
+            'host': host,
+            'port': port,
+            'username': username,
+            'age': round(time.monotonic() - self.opened_at, 1),
+            'messages': self.messages,
+            'bytes': self.bytes_sent,
+            'errors': self.errors,
+            'messages_per_second': round(self.messages / elapsed, 2) if self.messages else 0.0,
+        }
+
+
+class _SMTPPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._idle: dict[tuple, list[_Session]] = {}
+        self._sessions: dict[int, _Session] = {}
+
+    @staticmethod
+    def _usable(session: _Session) -> bool:
+        max_idle = getattr(settings, 'EMAIL_POOL_MAX_IDLE', 60)
+        max_messages = getattr(settings, 'EMAIL_POOL_MAX_MESSAGES', 500)
+        return time.monotonic() - session.last_used < max_idle and session.messages < max_messages
+
+    def register(self, session: _Session) -> None:
+        with self._lock:
+            self._sessions[id(session)] = session
+
+    def checkout(self, key: tuple) -> _Session | None:
+        stale = []
+        with self._lock:
+            idle = self._idle.get(key, [])
+            session = None
+            while idle:
+                candidate = idle.pop()
+                if self._usable(candidate):
+                    session = candidate
+                    break
+                stale.append(candidate)
+        for candidate in stale:
+            self.retire(candidate)
+        return session
+
+    def checkin(self, session: _Session) -> bool:
+        """Devuelve la sesión al pool; False si hay que cerrarla."""
+        if not self._usable(session):
+            return False
+        with self._lock:
+            idle = self._idle.setdefault(session.key, [])
+            if len(idle) >= getattr(settings, 'EMAIL_POOL_SIZE', 2):
+                return False
+            idle.append(session)
+        return True
+
+    def retire(self, session: _Session) -> None:
+        with self._lock:
+            self._sessions.pop(id(session), None)
+        try:
+            session.smtp.quit()
+        except Exception:  # noqa: BLE001
+            try:
+                session.smtp.close()
+            except Exception:  # noqa: BLE001
+                pass
+        stats = session.stats()
+        logger.info(
+            'Sesión SMTP %s:%s cerrada: %d mensajes, %d bytes, %d errores, %.2f msg/s',
+            stats['host'], stats['port'], stats['messages'], stats['bytes'],
+            stats['errors'], stats['messages_per_second'],
+        )
+
+    def stats(self) -> list[dict]:
+        with self._lock:
+            idle = {id(s) for sessions in self._idle.values() for s in sessions}
+            return [
+                {**session.stats(), 'idle': id(session) in idle}
+                for session in self._sessions.values()
+            ]
+
+    def close_all(self) -> None:
+        with self._lock:
+            sessions = [s for idle in self._idle.values() for s in idle]
+            self._idle.clear()
+        for session in sessions:
+            self.retire(session)
+
+
+_pool = _SMTPPool()
+atexit.register(_pool.close_all)
+
+
+def pool_stats() -> list[dict]:
+    """Métricas de las sesiones SMTP vivas de este proceso."""
+    return _pool.stats()
+
+
+def close_pool() -> None:
+    """Cierra las sesiones ociosas (tests, apagado del worker)."""
+    _pool.close_all()
+
+
+class PooledSMTPBackend(EmailBackend):
+    """`EmailBackend` de Django que reutiliza sesiones SMTP autenticadas."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._session: _Session | None = None
+
+    @property
+    def _pool_key(self) -> tuple:
+        return (self.host, self.port, self.username, self.use_ssl, self.use_tls)
+
+    def open(self):
+        if self.connection:
+            return False
+        session = _pool.checkout(self._pool_key)
+        if session is not None:
+            self._session, self.connection = session, session.smtp
+            return True
+        return self._connect()
+
+    def _connect(self):
+        opened = super().open()
+        if self.connection is not None:
+            self._session = _Session(self._pool_key, self.connection)
+            _pool.register(self._session)
+        return opened
+
+    def close(self):
+        if self.connection is None:
+            return
+        session, self._session, self.connection = self._session, None, None
+        if session is not None and not _pool.checkin(session):
+            _pool.retire(session)
+
+    def _discard(self) -> None:
+        session, self._session, self.connection = self._session, None, None
+        if session is not None:
+            _pool.retire(session)
+
+    def send_messages(self, email_messages):
+        try:
+            return super().send_messages(email_messages)
+        except Exception:
+            # Django no cierra la conexión si `_send` lanza: no devolverla al pool
+            with self._lock:
+                self._discard()
+            raise
+
+    def _send(self, email_message):
+        if not email_message.recipients():
+            return False
+        encoding = email_message.encoding or settings.DEFAULT_CHARSET
+        from_email = sanitize_address(email_message.from_email, encoding)
+        recipients = [sanitize_address(addr, encoding) for addr in email_message.recipients()]
+        payload = email_message.message().as_bytes(linesep='\r\n')
+
+        for attempt in range(2):
+            try:
+                self.connection.sendmail(from_email, recipients, payload)
+            except DISCONNECT_ERRORS as exc:
+                # Sesión cortada por el servidor: una conexión nueva y reintento
+                self._discard()
+                if attempt or self._connect() is None:
+                    if not self.fail_silently:
+                        raise
+                    return False
+                logger.info('Sesión SMTP caída (%s), reconectado', exc)
+                continue
+            except smtplib.SMTPException:
+                self._session.errors += 1
+                if not self.fail_silently:
+                    raise
+                return False
+            self._session.messages += 1
+            self._session.bytes_sent += len(payload)
+            self._session.last_used = time.monotonic()
+            return True
+        return False
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:56
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill(apps, schema_editor):
+    # Contadores iniciales desde las notificaciones existentes (los usuarios
+    # sin notificaciones se crean al primer uso)
+    from django.db.models import Count, Q
+
+    Notificacion = apps.get_model('notifications', 'Notificacion')
+    ContadorNotificaciones = apps.get_model('notifications', 'ContadorNotificaciones')
+    rows = (
+        Notificacion.objects.order_by().values('para_id').annotate(
+            total=Count('id'),
+            sin_leer=Count('id', filter=Q(visto=False)),
+            urgentes=Count('id', filter=Q(prioridad='CRITICAL')),
+        )
+    )
+    ContadorNotificaciones.objects.bulk_create(
+        (ContadorNotificaciones(usuario_id=row.pop('para_id'), **row) for row in rows.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('platform', '0012_user_personal_photo'),
+        ('notifications', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorNotificaciones',
+            fields=[
+                ('usuario', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='contador_notificaciones', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Usuario')),
+                ('total', models.IntegerField(default=0, verbose_name='Total')),
+                ('sin_leer', models.IntegerField(default=0, verbose_name='Sin leer')),
+                ('urgentes', models.IntegerField(default=0, verbose_name='Urgentes')),
+            ],
+            options={
+                'verbose_name': 'Contador de notificaciones',
+                'verbose_name_plural': 'Contadores de notificaciones',
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
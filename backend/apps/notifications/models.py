@@ -2,6 +2,7 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 from django.db.models import Q
+from model_utils import FieldTracker
 from apps.platform.models import User as Usuario
 from apps.platform.models.base_models import TimeStampedModel, StatusMixin
 
@@ -53,6 +54,19 @@ class Notificacion(TimeStampedModel, StatusMixin):
         ('URGENT', _('Urgente')),
     ]
     
+    # Icono por defecto según el tipo
+    ICONOS_TIPO = {
+        'INFO': 'info-circle',
+        'WARNING': 'exclamation-triangle',
+        'ERROR': 'times-circle',
+        'SUCCESS': 'check-circle',
+        'SYSTEM': 'cog',
+        'ACADEMIC': 'graduation-cap',
+        'PROCEDURE': 'file-alt',
+        'MAINTENANCE': 'tools',
+        'URGENT': 'exclamation',
+    }
+    
     # Prioridad de la notificación
     PRIORIDAD_CHOICES = [
         ('LOW', _('Baja')),
@@ -151,6 +165,9 @@ class Notificacion(TimeStampedModel, StatusMixin):
     
     # Manager personalizado
     objects = NotificationManager()
+
+    # Campos que mueven los contadores de `ContadorNotificaciones` (ver counters.py)
+    tracker = FieldTracker(fields=['para_id', 'visto', 'prioridad'])
     
     class Meta:
         app_label = 'notifications'
@@ -209,18 +226,7 @@ class Notificacion(TimeStampedModel, StatusMixin):
         
         # Asignar icono por defecto según el tipo
         if not self.icono:
-            iconos_tipo = {
-                'INFO': 'info-circle',
-                'WARNING': 'exclamation-triangle',
-                'ERROR': 'times-circle',
-                'SUCCESS': 'check-circle',
-                'SYSTEM': 'cog',
-                'ACADEMIC': 'graduation-cap',
-                'PROCEDURE': 'file-alt',
-                'MAINTENANCE': 'tools',
-                'URGENT': 'exclamation',
-            }
-            self.icono = iconos_tipo.get(self.tipo, 'bell')
+            self.icono = self.ICONOS_TIPO.get(self.tipo, 'bell')
         
         super().save(*args, **kwargs)
 
@@ -338,18 +344,58 @@ class Notificacion(TimeStampedModel, StatusMixin):
             )
             notificaciones.append(notificacion)
         
-        return cls.objects.bulk_create(notificaciones)
+        from django.db import transaction
+        from . import counters
+
+        with transaction.atomic():
+            creadas = cls.objects.bulk_create(notificaciones)
+            counters.add_created(creadas)
+        return creadas
 
     @classmethod
     def limpiar_expiradas(cls):
         """
         Método de clase para limpiar notificaciones expiradas
         """
+        from django.db import transaction
         from django.utils import timezone
+        from . import counters
+
         expiradas = cls.objects.filter(
             expira_en__lt=timezone.now(),
             visto=True
         )
-        count = expiradas.count()
-        expiradas.delete()
-        return count
\ No newline at end of file
+        # Un UPDATE de contadores por usuario en vez de uno por fila borrada
+        with transaction.atomic(), counters.suspended():
+            deltas = counters.deltas_for(expiradas, sign=-1)
+            count, _ = expiradas.delete()
+            counters.apply_many(deltas)
+        return count
+
+
+class ContadorNotificaciones(models.Model):
+    """
+    Contadores desnormalizados de las notificaciones de un usuario.
+
+    Los mantiene `counters.py` en la misma transacción que cada cambio; leerlos
+    es una búsqueda por clave primaria. Una fila ausente se recalcula desde
+    `Notificacion` la primera vez que se necesita.
+    """
+    usuario = models.OneToOneField(
+        Usuario,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='contador_notificaciones',
+        verbose_name=_("Usuario")
+    )
+    total = models.IntegerField(default=0, verbose_name=_("Total"))
+    sin_leer = models.IntegerField(default=0, verbose_name=_("Sin leer"))
+    urgentes = models.IntegerField(default=0, verbose_name=_("Urgentes"))
+
+    class Meta:
+        app_label = 'notifications'
+        verbose_name = _("Contador de notificaciones")
+        verbose_name_plural = _("Contadores de notificaciones")
+
+    def __str__(self):
+        return f"{self.usuario_id}: {self.sin_leer}/{self.total}"
@@ -0,0 +1,263 @@
+"""
+Push de notificaciones en tiempo real (Server-Sent Events).
+
+El frontend consultaba `sin_leer` y `estadisticas` cada dos minutos por
+pestaña: tres COUNT por usuario y pestaña aunque nada cambiara. Ahora cada
+pestaña abre ``GET /notificaciones/stream/`` y recibe:
+
+- ``event: unread`` — ``{"sin_leer": n}`` al conectar y cada vez que cambia.
+- ``event: notification`` — la notificación nueva (campos básicos).
+
+Los eventos se publican por usuario en un pub/sub:
+
+- ``NOTIFICATIONS_PUBSUB_URL`` con una URL de Redis: canal
+  ``tuho:notifications:user:<id>``. Necesario con varios procesos (workers
+  ASGI, Celery), que es lo normal en producción.
+- Vacío (desarrollo): colas `asyncio` dentro del proceso. Sólo llegan los
+  eventos publicados por el mismo proceso.
+
+La publicación se hace al confirmar la transacción, y sólo se lee el
+contador (`counters`) de los usuarios que tienen un stream abierto.
+
+- `publish_created(notifications)` / `publish_unread(user_ids)` — productores.
+- `subscribe(user_id)` — `Subscription` con ``next_event()`` / ``close()``.
+- `format_event(event, data)` — serialización SSE.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict
+from typing import Iterable
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+from . import counters
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_PREFIX = 'tuho:notifications:user'
+NOTIFICATION_FIELDS = ('id', 'tipo', 'prioridad', 'asunto', 'cuerpo', 'url_accion', 'icono', 'visto', 'created_at')
+
+
+def channel_name(user_id) -> str:
+    return f'{CHANNEL_PREFIX}:{user_id}'
+
+
+def format_event(event: str, data) -> bytes:
+    payload = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+    return f'event: {event}\ndata: {payload}\n\n'.encode('utf-8')
+
+
+# ------------------------------------------------------------
+# Brokers
+# ------------------------------------------------------------
+
+class _QueueSubscription:
+    def __init__(self, broker: 'InProcessBroker', key: str, heartbeat: float):
+        self._broker, self._key, self._heartbeat = broker, key, heartbeat
+        self._loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=100)
+
+    def _put(self, message: str) -> None:
+        try:
+            self._queue.put_nowait(message)
+        except asyncio.QueueFull:
+            pass  # cliente que no consume: el próximo `unread` lo corrige
+
+    async def get(self) -> str | None:
+        try:
+            return await asyncio.wait_for(self._queue.get(), self._heartbeat)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self) -> None:
+        self._broker._remove(self)
+
+
+class InProcessBroker:
+    """Colas `asyncio` por usuario, dentro del proceso."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions: dict[str, set[_QueueSubscription]] = defaultdict(set)
+
+    def listening(self, user_ids: Iterable) -> set[str]:
+        with self._lock:
+            return {str(uid) for uid in user_ids if self._subscriptions.get(str(uid))}
+
+    def publish(self, user_id, message: str) -> None:
+        with self._lock:
+            targets = list(self._subscriptions.get(str(user_id), ()))
+        for subscription in targets:
+            try:
+                subscription._loop.call_soon_threadsafe(subscription._put, message)
+            except RuntimeError:  # loop ya cerrado
+                pass
+
+    async def open(self, user_id, heartbeat: float) -> _QueueSubscription:
+        subscription = _QueueSubscription(self, str(user_id), heartbeat)
+        with self._lock:
+            self._subscriptions[subscription._key].add(subscription)
+        return subscription
+
+    def _remove(self, subscription: _QueueSubscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription._key)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription._key]
+
+
+class _RedisSubscription:
+    def __init__(self, client, pubsub, heartbeat: float):
+        self._client, self._pubsub, self._heartbeat = client, pubsub, heartbeat
+
+    async def get(self) -> str | None:
+        message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=self._heartbeat)
+        if message is None:
+            return None
+        data = message['data']
+        return data.decode() if isinstance(data, bytes) else data
+
+    async def close(self) -> None:
+        try:
+            await self._pubsub.unsubscribe()
+            await self._pubsub.aclose()
+        finally:
+            await self._client.aclose()
+
+
+class RedisBroker:
+    """Pub/sub de Redis: funciona entre procesos y con Celery."""
+
+    def __init__(self, url: str):
+        import redis
+
+        self.url = url
+        self._client = redis.Redis.from_url(url)
+
+    def listening(self, user_ids: Iterable) -> set[str]:
+        channels = [channel_name(uid) for uid in user_ids]
+        if not channels:
+            return set()
+        counts = self._client.pubsub_numsub(*channels)
+        return {
+            (channel.decode() if isinstance(channel, bytes) else channel).rsplit(':', 1)[1]
+            for channel, count in counts if count
+        }
+
+    def publish(self, user_id, message: str) -> None:
+        self._client.publish(channel_name(user_id), message)
+
+    async def open(self, user_id, heartbeat: float) -> _RedisSubscription:
+        from redis import asyncio as aioredis
+
+        client = aioredis.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(channel_name(user_id))
+        return _RedisSubscription(client, pubsub, heartbeat)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            url = getattr(settings, 'NOTIFICATIONS_PUBSUB_URL', '')
+            if url:
+                try:
+                    _broker = RedisBroker(url)
+                except ImportError:
+                    logger.warning('redis no está instalado; notificaciones en tiempo real sólo en el proceso')
+            if _broker is None:
+                _broker = InProcessBroker()
+        return _broker
+
+
+# ------------------------------------------------------------
+# Productores
+# ------------------------------------------------------------
+
+def _publish(user_id, event: str, data) -> None:
+    get_broker().publish(user_id, json.dumps([event, data], cls=DjangoJSONEncoder, ensure_ascii=False))
+
+
+def notification_payload(notification) -> dict:
+    return {field: getattr(notification, field) for field in NOTIFICATION_FIELDS}
+
+
+def _safe(fn):
+    # El push es best-effort: nunca debe romper la operación que lo origina
+    def wrapper(*args, **kwargs):
+        try:
+            fn(*args, **kwargs)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning('No se pudo publicar evento de notificaciones: %s', exc)
+    return wrapper
+
+
+def publish_created(notifications: Iterable) -> None:
+    """Publica notificaciones nuevas y el contador de sus destinatarios."""
+    payloads = [(n.para_id, notification_payload(n)) for n in notifications if n.pk]
+    if not payloads:
+        return
+
+    @_safe
+    def send():
+        listening = get_broker().listening({uid for uid, _ in payloads})
+        if not listening:
+            return
+        for user_id, payload in payloads:
+            if str(user_id) in listening:
+                _publish(user_id, 'notification', payload)
+        for user_id, count in counters.unread_counts(listening).items():
+            _publish(user_id, 'unread', {'sin_leer': count})
+
+    transaction.on_commit(send)
+
+
+def publish_unread(user_ids: Iterable) -> None:
+    """Publica el contador de no leídas de ``user_ids`` (si están escuchando)."""
+    user_ids = set(user_ids)
+
+    @_safe
+    def send():
+        listening = get_broker().listening(user_ids)
+        for user_id, count in counters.unread_counts(listening).items() if listening else ():
+            _publish(user_id, 'unread', {'sin_leer': count})
+
+    transaction.on_commit(send)
+
+
+# ------------------------------------------------------------
+# Consumidor
+# ------------------------------------------------------------
+
+class Subscription:
+    """Stream de eventos de un usuario; cerrar siempre con `close()`."""
+
+    def __init__(self, channel):
+        self._channel = channel
+
+    async def next_event(self) -> tuple[str, dict] | None:
+        """Próximo evento ``(nombre, datos)``, o None tras un latido sin eventos."""
+        message = await self._channel.get()
+        return None if message is None else tuple(json.loads(message))
+
+    async def close(self) -> None:
+        await self._channel.close()
+
+
+async def subscribe(user_id) -> Subscription:
+    """Suscribe al usuario; los eventos publicados desde aquí no se pierden."""
+    heartbeat = getattr(settings, 'NOTIFICATIONS_SSE_HEARTBEAT', 20)
+    return Subscription(await get_broker().open(user_id, heartbeat))
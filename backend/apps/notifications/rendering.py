@@ -0,0 +1,104 @@
+"""
+Render de los emails de notificaciones con plantillas compiladas en caché.
+
+`render_to_string` resuelve la plantilla en cada llamada (con ``DEBUG`` no
+hay loader cacheado) y el texto plano salía de `strip_tags` sobre el HTML
+renderizado, un parseo por mensaje. Aquí:
+
+- Cada plantilla se resuelve y compila una vez por proceso.
+- La variante de texto es una plantilla hermana ``.txt`` (misma convención
+  que los emails de `platform.utils.users`), también compilada una vez. Si
+  no existe se recuerda la ausencia y se usa `strip_tags` del HTML.
+- `render_emails` renderiza una plantilla contra muchos contextos y reutiliza
+  el resultado de los contextos repetidos: en un aviso masivo (`notify_many`)
+  todos comparten contexto y se renderiza una sola vez.
+
+- `render_email(template, context, body)` — ``(texto, html)``.
+- `render_emails(template, contexts, bodies)` — lo mismo en lote.
+- `clear_cache()` — olvida las plantillas compiladas.
+"""
+from __future__ import annotations
+
+import json
+import logging
+from functools import lru_cache
+
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.template import TemplateDoesNotExist
+from django.template.loader import get_template
+from django.utils.autoreload import file_changed
+from django.utils.html import strip_tags
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=128)
+def _compiled(name: str):
+    """Plantilla compilada, o None si no existe (la ausencia también se cachea)."""
+    try:
+        return get_template(name)
+    except TemplateDoesNotExist:
+        return None
+
+
+def _text_variant(name: str) -> str:
+    return name.rsplit('.', 1)[0] + '.txt'
+
+
+def clear_cache() -> None:
+    _compiled.cache_clear()
+
+
+@receiver(setting_changed)
+def _on_setting_changed(setting, **kwargs):
+    if setting == 'TEMPLATES':
+        clear_cache()
+
+
+@receiver(file_changed)
+def _on_file_changed(file_path, **kwargs):
+    # runserver recarga las plantillas sin reiniciar el proceso
+    if file_path.suffix in ('.html', '.txt'):
+        clear_cache()
+
+
+def render_email(template: str | None, context: dict, body: str = '') -> tuple[str, str | None]:
+    """``(texto, html)`` de un email; sin plantilla (o si falla) ``(body, None)``."""
+    if not template:
+        return body, None
+    html_template = _compiled(template)
+    if html_template is None:
+        logger.warning('No se encontró el template de email %s', template)
+        return body, None
+    try:
+        html = html_template.render(context)
+        text_template = _compiled(_text_variant(template))
+        text = text_template.render(context).strip() if text_template else strip_tags(html)
+    except Exception as exc:  # noqa: BLE001
+        logger.warning('No se pudo renderizar template %s: %s', template, exc)
+        return body, None
+    return text, html
+
+
+def _context_key(context: dict, body: str):
+    try:
+        return json.dumps([context, body], sort_keys=True)
+    except (TypeError, ValueError):
+        return None  # contexto con objetos: no se comparte
+
+
+def render_emails(template: str | None, contexts: list[dict], bodies: list[str] | None = None) -> list[tuple[str, str | None]]:
+    """`render_email` para muchos contextos de una misma plantilla."""
+    bodies = bodies if bodies is not None else [''] * len(contexts)
+    rendered: dict[str, tuple[str, str | None]] = {}
+    results = []
+    for context, body in zip(contexts, bodies):
+        key = _context_key(context, body)
+        if key is None:
+            results.append(render_email(template, context, body))
+            continue
+        if key not in rendered:
+            rendered[key] = render_email(template, context, body)
+        results.append(rendered[key])
+    return results
@@ -3,9 +3,11 @@ Servicio unificado de notificaciones.
 
 Puntos de entrada:
 - `notify(user, ...)` — crea una Notificacion en BD y (opcionalmente) envía email.
-- `notify_many(users, ...)` — envía a múltiples usuarios.
+- `notify_many(users, ...)` — mismo aviso a muchos usuarios: valida una vez,
+  inserta por bloques con `bulk_create` y envía los emails en lotes.
 - `notify_state_change(procedure, old_state, new_state, actor=None)` — helper para
   trámites/reservas que cambian de estado.
+- `notify_state_changes(changes)` — igual, en lote (un INSERT y una tarea de email).
 
 Los emails se envían vía Celery (tarea `send_email_task`). Si `CELERY_TASK_ALWAYS_EAGER=True`
 (por defecto en DEBUG), el envío es síncrono.
@@ -17,13 +19,18 @@ from typing import Iterable
 
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives
-from django.template.loader import render_to_string
-from django.utils.html import strip_tags
+from django.db import models, transaction
 
+from . import counters, realtime
 from .models import Notificacion
+from .rendering import render_email
 
 logger = logging.getLogger(__name__)
 
+# Filas por `bulk_create` y emails por tarea (una conexión SMTP) en `notify_many`
+NOTIFY_MANY_CHUNK_SIZE = 1000
+EMAIL_BATCH_SIZE = 200
+
 
 # ------------------------------------------------------------
 # Core
@@ -78,13 +85,95 @@ def notify(
     return notif
 
 
-def notify_many(users: Iterable, **kwargs) -> list[Notificacion]:
-    results = []
+def notify_many(
+    users: Iterable,
+    *,
+    subject: str,
+    body: str,
+    tipo: str = 'INFO',
+    prioridad: str = 'MEDIUM',
+    from_user=None,
+    url_accion: str | None = None,
+    extra: dict | None = None,
+    send_email: bool = True,
+    email_template: str | None = None,
+    email_context: dict | None = None,
+    chunk_size: int = NOTIFY_MANY_CHUNK_SIZE,
+) -> list[Notificacion]:
+    """Envía el mismo aviso a muchos usuarios (anuncios a toda una facultad).
+
+    El payload es igual para todos, así que se valida una sola vez
+    (`full_clean` sin ``para``) y las filas se insertan con `bulk_create` en
+    bloques de ``chunk_size``. Los emails se encolan en lotes de
+    `EMAIL_BATCH_SIZE` (`send_email_batch_task`, una conexión SMTP por lote).
+    Acepta los mismos argumentos que `notify`.
+    """
+    prototype = Notificacion(
+        tipo=tipo,
+        prioridad=prioridad,
+        asunto=subject[:255].strip(),
+        cuerpo=body.strip(),
+        de=from_user,
+        url_accion=url_accion,
+        datos_adicionales=extra or {},
+    )
+    prototype.icono = Notificacion.ICONOS_TIPO.get(tipo, 'bell')
+    try:
+        prototype.full_clean(exclude=['para'])
+        valid = True
+    except Exception as exc:  # noqa: BLE001
+        logger.exception('notify_many: payload inválido, no se crean notificaciones: %s', exc)
+        valid = False
+
+    fields = {
+        field.attname: getattr(prototype, field.attname)
+        for field in Notificacion._meta.concrete_fields
+        if not field.primary_key and field.name != 'para'
+    }
+    context = _serializable_context(email_context or {}) if send_email else {}
+    if isinstance(users, models.QuerySet):
+        users = users.iterator(chunk_size=chunk_size)
+
+    created: list[Notificacion] = []
+    emails: list[dict] = []
+    rows: list[Notificacion] = []
+
+    def flush_rows():
+        if valid and rows:
+            try:
+                with transaction.atomic():
+                    batch = Notificacion.objects.bulk_create(rows)
+                    counters.add_created(batch)
+                created.extend(batch)
+                realtime.publish_created(batch)
+            except Exception as exc:  # noqa: BLE001
+                logger.exception('Error creando notificaciones en lote: %s', exc)
+        rows.clear()
+
+    def flush_emails():
+        if emails:
+            _enqueue_email_batch(list(emails))
+        emails.clear()
+
     for user in users:
-        n = notify(user, **kwargs)
-        if n is not None:
-            results.append(n)
-    return results
+        if user is None or not getattr(user, 'pk', None):
+            continue
+        rows.append(Notificacion(para=user, **fields))
+        if len(rows) >= chunk_size:
+            flush_rows()
+        if send_email and getattr(user, 'email', None):
+            emails.append({
+                'to': user.email,
+                'subject': subject,
+                'body': body,
+                'template': email_template,
+                'context': context,
+            })
+            if len(emails) >= EMAIL_BATCH_SIZE:
+                flush_emails()
+    flush_rows()
+    flush_emails()
+    return created
 
 
 def notify_state_change(procedure, *, old_state: str | None, new_state: str, actor=None, reason: str = '') -> None:
@@ -96,6 +185,71 @@ def notify_state_change(procedure, *, old_state: str | None, new_state: str, act
     if target_user is None:
         return
 
+    notify(
+        target_user,
+        **_state_change_payload(procedure, target_user, old_state=old_state, new_state=new_state, reason=reason),
+        from_user=actor,
+    )
+
+
+def notify_state_changes(changes: Iterable[dict], *, actor=None, send_email: bool = True) -> list[Notificacion]:
+    """Versión en lote de `notify_state_change`.
+
+    Cada elemento de `changes` es un dict con ``procedure``, ``old_state``,
+    ``new_state`` y opcionalmente ``reason``. Crea todas las notificaciones con
+    un solo `bulk_create` (el payload lo genera el sistema, no hace falta
+    `full_clean` por fila) y encola los emails en una única tarea.
+    """
+    notifications: list[Notificacion] = []
+    emails: list[dict] = []
+    for change in changes:
+        procedure = change['procedure']
+        target_user = _get_procedure_target_user(procedure)
+        if target_user is None or not getattr(target_user, 'pk', None):
+            continue
+        payload = _state_change_payload(
+            procedure,
+            target_user,
+            old_state=change.get('old_state'),
+            new_state=change['new_state'],
+            reason=change.get('reason', ''),
+        )
+        notifications.append(Notificacion(
+            tipo=payload['tipo'],
+            prioridad=payload['prioridad'],
+            asunto=payload['subject'][:255],
+            cuerpo=payload['body'],
+            para=target_user,
+            de=actor,
+            url_accion=payload['url_accion'],
+            datos_adicionales=payload['extra'],
+            icono=Notificacion.ICONOS_TIPO.get(payload['tipo'], 'bell'),
+        ))
+        if send_email and getattr(target_user, 'email', None):
+            emails.append({
+                'to': target_user.email,
+                'subject': payload['subject'],
+                'body': payload['body'],
+                'template': payload['email_template'],
+                'context': _serializable_context(payload['email_context']),
+            })
+
+    try:
+        with transaction.atomic():
+            created = Notificacion.objects.bulk_create(notifications)
+            counters.add_created(created)
+        realtime.publish_created(created)
+    except Exception as exc:  # noqa: BLE001
+        logger.exception('Error creando notificaciones en lote: %s', exc)
+        created = []
+
+    if emails:
+        _enqueue_email_batch(emails)
+    return created
+
+
+def _state_change_payload(procedure, target_user, *, old_state: str | None, new_state: str, reason: str = '') -> dict:
+    """Arma asunto, cuerpo, metadatos y contexto de email de un cambio de estado."""
     resource_name = procedure.__class__.__name__
     subject = f'Actualización de tu {resource_name}'
     body_parts = [
@@ -110,23 +264,21 @@ def notify_state_change(procedure, *, old_state: str | None, new_state: str, act
     action_url = _build_action_url(procedure)
     priority = 'HIGH' if new_state.upper() in ('RECHAZADO', 'RECHAZADA', 'CANCELADO', 'CANCELADA') else 'MEDIUM'
 
-    notify(
-        target_user,
-        subject=subject,
-        body='\n'.join(body_parts),
-        tipo='PROCEDURE',
-        prioridad=priority,
-        from_user=actor,
-        url_accion=action_url,
-        extra={
-            'procedure_id': procedure.pk,
+    return {
+        'subject': subject,
+        'body': '\n'.join(body_parts),
+        'tipo': 'PROCEDURE',
+        'prioridad': priority,
+        'url_accion': action_url,
+        'extra': {
+            'procedure_id': str(procedure.pk),
             'resource_type': f'{procedure._meta.app_label}.{procedure._meta.object_name}',
             'old_state': old_state,
             'new_state': new_state,
             'reason': reason,
         },
-        email_template='emails/state_change.html',
-        email_context={
+        'email_template': 'emails/state_change.html',
+        'email_context': {
             'user': target_user,
             'procedure': procedure,
             'resource_name': resource_name,
@@ -135,7 +287,7 @@ def notify_state_change(procedure, *, old_state: str | None, new_state: str, act
             'reason': reason,
             'action_url': action_url,
         },
-    )
+    }
 
 
 # ------------------------------------------------------------
@@ -158,15 +310,27 @@ def _enqueue_email(*, to: str, subject: str, body: str, template: str | None, co
         _send_email_sync(to=to, subject=subject, body=body, template=template, context=context)
 
 
-def _send_email_sync(*, to: str, subject: str, body: str, template: str | None, context: dict) -> None:
-    html_content = None
-    if template:
+def _enqueue_email_batch(messages: list[dict]) -> None:
+    """Encola varios emails en una sola tarea (una conexión SMTP por lote).
+
+    El encolado espera al commit: los lotes salen de transiciones masivas
+    (`apps.labs.services.bulk_transition`, `advance_reservation_states`) que
+    aún pueden revertirse, y el worker podría enviar antes del commit.
+    """
+    def enqueue():
         try:
-            html_content = render_to_string(template, context)
+            from .tasks import send_email_batch_task  # import local para evitar ciclo
+            send_email_batch_task.delay(messages=messages)
         except Exception as exc:  # noqa: BLE001
-            logger.warning('No se pudo renderizar template %s: %s', template, exc)
+            logger.warning('No se pudo encolar lote de emails (fallback a síncrono): %s', exc)
+            for message in messages:
+                _send_email_sync(**message)
+
+    transaction.on_commit(enqueue)
+
 
-    text_body = strip_tags(html_content) if html_content else body
+def _send_email_sync(*, to: str, subject: str, body: str, template: str | None, context: dict) -> None:
+    text_body, html_content = render_email(template, context, body)
     msg = EmailMultiAlternatives(
         subject=subject,
         body=text_body,
@@ -182,18 +346,38 @@ def _send_email_sync(*, to: str, subject: str, body: str, template: str | None,
 
 
 def _serializable_context(context: dict) -> dict:
-    """Convierte un contexto a algo serializable JSON (para pasar a Celery)."""
+    """Convierte un contexto a algo serializable JSON (para pasar a Celery).
+
+    Las instancias de modelo se reducen a un dict con los atributos que usan
+    las plantillas (``pk``, ``username``, ``get_full_name``…), de modo que
+    ``{{ user.get_full_name }}`` siga funcionando del lado del worker.
+    """
+    import json
+
     safe = {}
     for key, value in context.items():
+        if isinstance(value, models.Model):
+            safe[key] = _model_snapshot(value)
+            continue
         try:
-            import json
-            json.dumps(value, default=str)
+            json.dumps(value)
             safe[key] = value
         except (TypeError, ValueError):
             safe[key] = str(value)
     return safe
 
 
+def _model_snapshot(instance) -> dict:
+    snapshot = {'pk': str(instance.pk), 'str': str(instance)}
+    for attr in ('username', 'email', 'first_name', 'last_name', 'state'):
+        value = getattr(instance, attr, None)
+        if isinstance(value, str):
+            snapshot[attr] = value
+    if callable(getattr(instance, 'get_full_name', None)):
+        snapshot['get_full_name'] = instance.get_full_name()
+    return snapshot
+
+
 # ------------------------------------------------------------
 # Helpers para introspección de Procedure
 # ------------------------------------------------------------
@@ -0,0 +1,51 @@
+"""
+Cambios de notificaciones hechos con ``save()`` / ``delete()``:
+
+- ajustan los contadores de `ContadorNotificaciones` (`counters`), y
+- se publican en el stream SSE (`realtime`).
+
+Los ``bulk_create`` y ``update()`` no emiten signals: sus llamadores hacen
+ambas cosas explícitamente (`services.notify_many`,
+`NotificacionViewSet.marcar_todas_leidas`, `Notificacion.limpiar_expiradas`).
+"""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import counters, realtime
+from .models import Notificacion
+
+
+def _update_counters(instance) -> None:
+    # Valores anteriores según el tracker; el destinatario también puede cambiar
+    changed = instance.tracker.changed()
+    if not changed:
+        return
+    old_user = changed.get('para_id', instance.para_id)
+    old = counters.contribution(changed.get('visto', instance.visto), changed.get('prioridad', instance.prioridad))
+    new = counters.contribution(instance.visto, instance.prioridad)
+    if old_user == instance.para_id:
+        counters.apply(instance.para_id, tuple(n - o for n, o in zip(new, old)))
+    else:
+        counters.apply_many({old_user: tuple(-o for o in old), instance.para_id: new})
+
+
+@receiver(post_save, sender=Notificacion)
+def _on_saved(sender, instance, created, update_fields=None, **kwargs):
+    if not counters.is_suspended():
+        if created:
+            counters.apply(instance.para_id, counters.contribution(instance.visto, instance.prioridad))
+        else:
+            _update_counters(instance)
+
+    if created:
+        realtime.publish_created([instance])
+    elif update_fields is None or 'visto' in update_fields:
+        realtime.publish_unread([instance.para_id])
+
+
+@receiver(post_delete, sender=Notificacion)
+def _on_deleted(sender, instance, **kwargs):
+    if not counters.is_suspended():
+        counters.apply(instance.para_id, tuple(-v for v in counters.contribution(instance.visto, instance.prioridad)))
+    if not instance.visto:
+        realtime.publish_unread([instance.para_id])
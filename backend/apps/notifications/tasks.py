@@ -32,18 +32,10 @@ except ImportError:  # pragma: no cover
 def send_email_task(self, *, to: str, subject: str, body: str, template: str | None = None, context: dict | None = None):
     """Envía un email (plain + HTML si hay template)."""
     from django.core.mail import EmailMultiAlternatives
-    from django.template.loader import render_to_string
-    from django.utils.html import strip_tags
 
-    context = context or {}
-    html_content = None
-    if template:
-        try:
-            html_content = render_to_string(template, context)
-        except Exception as exc:  # noqa: BLE001
-            logger.warning('No se pudo renderizar template %s: %s', template, exc)
+    from .rendering import render_email
 
-    text_body = strip_tags(html_content) if html_content else body
+    text_body, html_content = render_email(template, context or {}, body)
     msg = EmailMultiAlternatives(
         subject=subject,
         body=text_body,
@@ -54,3 +46,91 @@ def send_email_task(self, *, to: str, subject: str, body: str, template: str | N
         msg.attach_alternative(html_content, 'text/html')
     msg.send(fail_silently=False)
     return True
+
+
+# Reintentos de `send_email_batch_task` (sólo con los mensajes no enviados)
+EMAIL_BATCH_MAX_RETRIES = 3
+EMAIL_BATCH_RETRY_DELAY = 60
+
+SMTP_EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
+
+
+def batch_email_connection():
+    """Conexión de los lotes: `NOTIFICATIONS_EMAIL_BACKEND` en lugar del SMTP de Django.
+
+    Cualquier otro ``EMAIL_BACKEND`` (console en desarrollo, locmem en tests)
+    se respeta tal cual.
+    """
+    from django.core.mail import get_connection
+
+    backend = settings.EMAIL_BACKEND
+    if backend == SMTP_EMAIL_BACKEND:
+        backend = getattr(settings, 'NOTIFICATIONS_EMAIL_BACKEND', None) or backend
+    return get_connection(backend, fail_silently=False)
+
+
+@shared_task(bind=True, max_retries=EMAIL_BATCH_MAX_RETRIES)
+def send_email_batch_task(self, *, messages: list[dict]):
+    """Envía un lote de emails reutilizando una sola conexión SMTP.
+
+    Cada elemento de `messages` tiene las mismas claves que `send_email_task`
+    (``to``, ``subject``, ``body``, ``template``, ``context``).
+
+    Los mensajes se entregan uno a uno sobre la misma conexión: si alguno
+    falla, el reintento lleva sólo los que no salieron (reintentar el lote
+    entero duplicaría los ya entregados). Retorna cuántos se enviaron.
+    """
+    from django.core.mail import EmailMultiAlternatives
+
+    from .rendering import render_emails
+
+    # Una pasada de render por plantilla; los contextos repetidos se reutilizan
+    rendered: list = [None] * len(messages)
+    by_template: dict = {}
+    for index, message in enumerate(messages):
+        by_template.setdefault(message.get('template'), []).append(index)
+    for template, indexes in by_template.items():
+        results = render_emails(
+            template,
+            [messages[i].get('context') or {} for i in indexes],
+            [messages[i]['body'] for i in indexes],
+        )
+        for index, result in zip(indexes, results):
+            rendered[index] = result
+
+    sent = 0
+    failed: list[dict] = []
+    error: Exception | None = None
+    connection = batch_email_connection()
+    try:
+        connection.open()
+    except Exception as exc:  # noqa: BLE001
+        failed, error = list(messages), exc
+    else:
+        try:
+            for message, (text_body, html_content) in zip(messages, rendered):
+                msg = EmailMultiAlternatives(
+                    subject=message['subject'],
+                    body=text_body,
+                    from_email=getattr(settings, 'DEFAULT_FROM_EMAIL', None),
+                    to=[message['to']],
+                    connection=connection,
+                )
+                if html_content:
+                    msg.attach_alternative(html_content, 'text/html')
+                try:
+                    sent += msg.send()
+                except Exception as exc:  # noqa: BLE001
+                    failed.append(message)
+                    error = exc
+        finally:
+            connection.close()
+
+    if failed:
+        logger.warning('Lote de emails: %d enviados, %d fallidos (%s)', sent, len(failed), error)
+        raise self.retry(
+            kwargs={'messages': failed},
+            exc=error,
+            countdown=EMAIL_BATCH_RETRY_DELAY * 2 ** self.request.retries,
+        )
+    return sent
@@ -2,6 +2,7 @@ from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.utils import timezone
 from datetime import timedelta
+from . import counters
 from .models import Notificacion
 
 User = get_user_model()
@@ -147,3 +148,384 @@ class NotificacionModelTests(TestCase):
         
         self.assertEqual(len(notificaciones), 2)
 
+
+
+class NotifyManyTests(TestCase):
+    """Fan-out: filas por bloques y emails en lotes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuarios = [
+            User.objects.create_user(
+                username=f'fanout{i}',
+                email=f'fanout{i}@test.com',
+                password='testpass123',
+                id_card=f'8501010001{i}',
+            )
+            for i in range(5)
+        ]
+        counters.rebuild(u.pk for u in cls.usuarios)
+
+    def test_bulk_inserts_in_chunks_and_batches_emails(self):
+        from unittest import mock
+        from . import services
+
+        with mock.patch.object(services, 'EMAIL_BATCH_SIZE', 3), \
+                mock.patch.object(services, '_enqueue_email_batch') as enqueue:
+            # Validación única (2 CheckConstraint) + usuarios + 2 bloques de
+            # (SAVEPOINT, INSERT, UPDATE de contadores, RELEASE)
+            with self.assertNumQueries(11):
+                creadas = services.notify_many(
+                    User.objects.filter(username__startswith='fanout').order_by('username'),
+                    subject='Aviso general',
+                    body='Mañana no hay docencia en la facultad.',
+                    tipo='ACADEMIC',
+                    chunk_size=3,
+                )
+
+        self.assertEqual(len(creadas), 5)
+        self.assertEqual(Notificacion.objects.filter(asunto='Aviso general').count(), 5)
+        self.assertEqual(Notificacion.objects.filter(asunto='Aviso general').first().icono,
+                         Notificacion.ICONOS_TIPO['ACADEMIC'])
+        self.assertEqual(counters.get_counts(self.usuarios[4].pk), {'total': 1, 'sin_leer': 1, 'urgentes': 0})
+        lotes = [call.args[0] for call in enqueue.call_args_list]
+        self.assertEqual([len(lote) for lote in lotes], [3, 2])
+        self.assertEqual(lotes[1][-1]['to'], 'fanout4@test.com')
+
+    def test_invalid_payload_is_rejected_once(self):
+        from . import services
+
+        creadas = services.notify_many(self.usuarios, subject='Hey', body='Cuerpo corto', send_email=False)
+        self.assertEqual(creadas, [])
+        self.assertFalse(Notificacion.objects.exists())
+
+
+class NotificationCounterTests(TestCase):
+    """Contadores desnormalizados: se mantienen en cada camino de escritura."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user(
+            username='contador',
+            email='contador@test.com',
+            password='testpass123',
+            id_card='85010100030',
+        )
+        cls.otro = User.objects.create_user(
+            username='contador2',
+            email='contador2@test.com',
+            password='testpass123',
+            id_card='85010100031',
+        )
+
+    def crear(self, para=None, **kwargs):
+        return Notificacion.objects.create(
+            asunto='Aviso de prueba',
+            cuerpo='Contenido de la notificación de prueba.',
+            para=para or self.usuario,
+            **kwargs
+        )
+
+    def assertCounts(self, user, total, sin_leer, urgentes):
+        self.assertEqual(counters.get_counts(user.pk), {'total': total, 'sin_leer': sin_leer, 'urgentes': urgentes})
+        # Igual que contar desde cero
+        self.assertEqual(counters.get_counts(user.pk), dict(zip(counters.FIELDS, counters.rebuild([user.pk])[user.pk])))
+
+    def test_save_update_and_delete(self):
+        self.crear()  # sin fila previa: se calcula desde Notificacion
+        urgente = self.crear(prioridad='CRITICAL')
+        self.assertCounts(self.usuario, 2, 2, 1)
+
+        urgente.marcar_como_leido()
+        self.assertCounts(self.usuario, 2, 1, 1)
+        urgente.marcar_como_no_leido()
+        urgente.prioridad = 'LOW'
+        urgente.save()
+        self.assertCounts(self.usuario, 2, 2, 0)
+
+        urgente.para = self.otro
+        urgente.save()
+        self.assertCounts(self.usuario, 1, 1, 0)
+        self.assertCounts(self.otro, 1, 1, 0)
+
+        urgente.delete()
+        self.assertCounts(self.otro, 0, 0, 0)
+
+    def test_bulk_paths(self):
+        from . import services
+
+        self.crear()
+        services.notify_many([self.usuario, self.otro], subject='Aviso general',
+                             body='Mañana no hay docencia.', send_email=False)
+        Notificacion.notificar_multiple([self.usuario], 'INFO', 'Aviso múltiple', 'Cuerpo del aviso.',
+                                        prioridad='CRITICAL')
+        self.assertCounts(self.usuario, 3, 3, 1)
+
+        self.client.force_login(self.usuario)
+        response = self.client.post('/api/v1/notificaciones/marcar_todas_leidas/')
+        self.assertEqual(response.status_code, 200)
+        self.assertCounts(self.usuario, 3, 0, 1)
+
+        Notificacion.objects.filter(para=self.usuario).update(expira_en=timezone.now() - timedelta(days=1))
+        self.assertEqual(Notificacion.limpiar_expiradas(), 3)
+        self.assertCounts(self.usuario, 0, 0, 0)
+        self.assertCounts(self.otro, 1, 1, 0)
+
+    def test_badge_reads_are_a_primary_key_lookup(self):
+        self.crear()
+        counters.get_counts(self.usuario.pk)
+        self.client.force_login(self.usuario)
+        with self.assertNumQueries(1):
+            counters.get_counts(self.usuario.pk)
+        response = self.client.get('/api/v1/notificaciones/estadisticas/')
+        self.assertEqual(response.json(), {'total': 1, 'sin_leer': 1, 'urgentes': 0, 'leidas': 0})
+
+
+class FlakyEmailBackend:
+    """Backend de prueba: falla una vez por cada destinatario en `fail_once`."""
+
+    fail_once: set = set()
+
+    def __new__(cls, *args, **kwargs):
+        from django.core.mail.backends.locmem import EmailBackend
+
+        class Backend(EmailBackend):
+            def send_messages(self, messages):
+                for message in messages:
+                    if message.to[0] in cls.fail_once:
+                        cls.fail_once.discard(message.to[0])
+                        raise ConnectionError('relay caído')
+                return super().send_messages(messages)
+
+        return Backend(*args, **kwargs)
+
+
+class EmailBatchTaskTests(TestCase):
+    """`send_email_batch_task` reintenta sólo lo no enviado y se encola al commit."""
+
+    MESSAGES = [
+        {'to': f'lote{i}@test.com', 'subject': 'Aviso', 'body': f'Cuerpo {i}', 'template': None, 'context': {}}
+        for i in range(3)
+    ]
+
+    def test_retry_resends_only_failed_messages(self):
+        from django.core import mail
+        from django.test import override_settings
+        from .tasks import send_email_batch_task
+
+        from celery.exceptions import Retry
+
+        FlakyEmailBackend.fail_once = {'lote1@test.com'}
+        with override_settings(EMAIL_BACKEND='apps.notifications.tests.FlakyEmailBackend'):
+            with self.assertRaises(Retry) as ctx:
+                send_email_batch_task.apply(kwargs={'messages': self.MESSAGES})
+            self.assertEqual(len(mail.outbox), 2)
+            # El reintento lleva sólo el mensaje que no salió
+            retry_messages = ctx.exception.sig.kwargs['messages']
+            self.assertEqual([m['to'] for m in retry_messages], ['lote1@test.com'])
+            self.assertEqual(send_email_batch_task.apply(kwargs={'messages': retry_messages}).get(), 1)
+
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox),
+                         ['lote0@test.com', 'lote1@test.com', 'lote2@test.com'])
+
+    def test_batch_uses_pooled_backend_in_place_of_smtp(self):
+        from django.test import override_settings
+        from . import mail
+        from .tasks import batch_email_connection
+
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+                               NOTIFICATIONS_EMAIL_BACKEND='apps.notifications.mail.PooledSMTPBackend'):
+            self.assertIsInstance(batch_email_connection(), mail.PooledSMTPBackend)
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+            self.assertNotIsInstance(batch_email_connection(), mail.PooledSMTPBackend)
+
+    def test_batch_is_enqueued_on_commit(self):
+        from unittest import mock
+        from . import services, tasks
+
+        with mock.patch.object(tasks.send_email_batch_task, 'delay') as delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                services._enqueue_email_batch(self.MESSAGES)
+                delay.assert_not_called()
+        delay.assert_called_once_with(messages=self.MESSAGES)
+
+
+class PooledSMTPBackendTests(TestCase):
+    """Sesiones SMTP reutilizadas entre envíos y reconexión si se cortan."""
+
+    class FakeSMTP:
+        instances = []
+
+        def __init__(self, host, port, **kwargs):
+            self.sent, self.logins, self.fail_next = [], 0, False
+            self.instances.append(self)
+
+        def login(self, username, password):
+            self.logins += 1
+
+        def sendmail(self, from_email, recipients, payload):
+            import smtplib
+            if self.fail_next:
+                self.fail_next = False
+                raise smtplib.SMTPServerDisconnected('cerrada por el servidor')
+            self.sent.append(recipients)
+
+        def quit(self):
+            pass
+
+        close = quit
+
+    def setUp(self):
+        from . import mail
+
+        self.FakeSMTP.instances = []
+        fake = self.FakeSMTP
+
+        class Backend(mail.PooledSMTPBackend):
+            connection_class = fake
+
+        self.Backend = Backend
+        self.addCleanup(mail.close_pool)
+
+    def send(self, to):
+        from django.core.mail import EmailMessage
+
+        backend = self.Backend(host='relay.test', port=25, username='u', password='p',
+                               use_tls=False, use_ssl=False)
+        return backend.send_messages([EmailMessage('Asunto', 'Cuerpo', 'noreply@test.com', [to])])
+
+    def test_session_is_reused_across_backends(self):
+        from . import mail
+
+        for i in range(3):
+            self.assertEqual(self.send(f'user{i}@test.com'), 1)
+        self.assertEqual(len(self.FakeSMTP.instances), 1)
+        self.assertEqual(self.FakeSMTP.instances[0].logins, 1)
+        stats = mail.pool_stats()
+        self.assertEqual([(s['messages'], s['idle']) for s in stats], [(3, True)])
+
+    def test_reconnects_when_the_server_dropped_the_session(self):
+        self.send('a@test.com')
+        self.FakeSMTP.instances[0].fail_next = True
+        self.assertEqual(self.send('b@test.com'), 1)
+        self.assertEqual(len(self.FakeSMTP.instances), 2)
+        self.assertEqual(self.FakeSMTP.instances[1].sent, [['b@test.com']])
+
+
+# Presupuesto para 200 emails con plantillas cacheadas (se miden ~50 ms; el
+# margen cubre máquinas de CI cargadas)
+RENDER_BATCH_BUDGET_SECONDS = 1.0
+
+
+class EmailRenderingTests(TestCase):
+    """Plantillas compiladas en caché, variante .txt y render en lote."""
+
+    def context(self, i):
+        return {
+            'user': {'username': f'user{i}', 'get_full_name': f'Usuario {i}'},
+            'procedure': {'pk': str(i)},
+            'resource_name': 'LocalReservation',
+            'old_state': 'PENDIENTE',
+            'new_state': 'APROBADA',
+            'reason': '',
+            'action_url': 'https://tuho.test/my-reservations',
+        }
+
+    def test_text_variant_and_missing_template(self):
+        from .rendering import render_email
+
+        text, html = render_email('emails/state_change.html', self.context(1), 'fallback')
+        self.assertIn('<strong>APROBADA</strong>', html)
+        self.assertTrue(text.startswith('Hola Usuario 1,'))
+        self.assertIn('Ver detalles: https://tuho.test/my-reservations', text)
+        self.assertEqual(render_email('emails/no_existe.html', {}, 'fallback'), ('fallback', None))
+
+    def test_batch_rendering_budget(self):
+        """Lote de 200: una compilación por plantilla, sin consultas y dentro de presupuesto."""
+        import time
+        from unittest import mock
+        from django.template.loader import render_to_string
+        from . import rendering
+
+        contexts = [self.context(i) for i in range(200)]
+        rendering.clear_cache()
+
+        with self.assertNumQueries(0):
+            start = time.perf_counter()
+            cached = rendering.render_emails('emails/state_change.html', contexts)
+            elapsed = time.perf_counter() - start
+        # HTML + variante de texto, compiladas una sola vez para todo el lote
+        self.assertLessEqual(rendering._compiled.cache_info().misses, 2)
+        self.assertLess(elapsed, RENDER_BATCH_BUDGET_SECONDS)
+        self.assertEqual(
+            [html for _, html in cached],
+            [render_to_string('emails/state_change.html', context) for context in contexts],
+        )
+
+        # Contextos repetidos: un solo render compartido
+        with mock.patch.object(rendering, 'render_email', wraps=rendering.render_email) as render:
+            shared = rendering.render_emails('emails/state_change.html', [self.context(0)] * 200)
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(len({id(result) for result in shared}), 1)
+
+
+class NotificationStreamTests(TestCase):
+    """Stream SSE: contador inicial y push al crear notificaciones."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user(
+            username='stream',
+            email='stream@test.com',
+            password='testpass123',
+            id_card='85010100020',
+        )
+
+    def crear(self, asunto='Nueva reserva aprobada'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notificacion.objects.create(
+                tipo='SUCCESS',
+                asunto=asunto,
+                cuerpo='Su reserva del laboratorio 3 fue aprobada.',
+                para=self.usuario,
+            )
+
+    async def test_pushes_new_notifications_and_unread_count(self):
+        import asyncio
+        import json
+        from asgiref.sync import sync_to_async
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        await sync_to_async(self.crear)('Primera')
+        token = await sync_to_async(lambda: str(AccessToken.for_user(self.usuario)))()
+
+        response = await self.async_client.get(f'/api/v1/notificaciones/stream/?token={token}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(response['Cache-Control'], 'no-cache')
+        stream = aiter(response.streaming_content)
+        try:
+            first = await asyncio.wait_for(anext(stream), 5)
+            self.assertIn(b'event: unread\ndata: {"sin_leer": 1}', first)
+
+            await sync_to_async(self.crear)('Segunda')
+            evento = await asyncio.wait_for(anext(stream), 5)
+            contador = await asyncio.wait_for(anext(stream), 5)
+        finally:
+            await stream.aclose()
+
+        self.assertTrue(evento.startswith(b'event: notification\n'))
+        self.assertEqual(json.loads(evento.split(b'data: ', 1)[1])['asunto'], 'Segunda')
+        self.assertEqual(contador, b'event: unread\ndata: {"sin_leer": 2}\n\n')
+
+    def test_requires_authentication(self):
+        response = self.client.get('/api/v1/notificaciones/stream/?token=invalido')
+        self.assertEqual(response.status_code, 401)
+
+    def test_wsgi_falls_back_to_single_event(self):
+        self.crear()
+        self.client.force_login(self.usuario)
+        response = self.client.get('/api/v1/notificaciones/stream/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.content, b'retry: 60000\nevent: unread\ndata: {"sin_leer": 1}\n\n')
@@ -15,6 +15,9 @@ urlpatterns = [
     path('borrar/', views.BorrarNotificaciones, name="BorrarNotificaciones"),
     path('visualizar/', views.VisualizarNotificaciones, name="VisualizarNotificaciones"),
 
+    # Stream SSE (antes del router: `stream/` no es un id)
+    path('stream/', views.notification_stream, name='notificaciones-stream'),
+
     # API REST
     path('', include(router.urls)),
 ]
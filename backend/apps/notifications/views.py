@@ -1,6 +1,12 @@
+import time
+
+from django.conf import settings
+from django.db import transaction
 from django.shortcuts import redirect, render
 from django.http.request import HttpRequest
-from django.http.response import HttpResponse
+from django.http.response import HttpResponse, HttpResponseNotAllowed, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from asgiref.sync import sync_to_async
 from django.contrib.auth.decorators import login_required
 from django.core.mail import send_mail
 from apps.platform.models.user import User
@@ -11,7 +17,9 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import AuthenticationFailed
 from .serializers import NotificacionSerializer
+from . import counters, realtime
 
 # Vistas tradicionales (con templates)
 @login_required
@@ -113,23 +121,22 @@ class NotificacionViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def estadisticas(self, request):
         """Retorna estadísticas de notificaciones del usuario"""
-        queryset = self.get_queryset()
-        total = queryset.count()
-        sin_leer = queryset.filter(visto=False).count()
-        urgentes = queryset.filter(prioridad='CRITICAL').count()
-        
+        contador = counters.get_counts(request.user.pk)
         return Response({
-            'total': total,
-            'sin_leer': sin_leer,
-            'urgentes': urgentes,
-            'leidas': total - sin_leer,
+            **contador,
+            'leidas': max(0, contador['total'] - contador['sin_leer']),
         })
     
     @action(detail=False, methods=['post'])
     def marcar_todas_leidas(self, request):
         """Marca todas las notificaciones como leídas"""
         notificaciones = self.get_queryset().filter(visto=False)
-        count = notificaciones.update(visto=True)
+        with transaction.atomic():
+            count = notificaciones.update(visto=True)
+            if count:
+                counters.apply(request.user.pk, (0, -count, 0))
+        if count:
+            realtime.publish_unread([request.user.pk])
         return Response({
             'mensaje': f'{count} notificaciones marcadas como leídas.'
         }, status=status.HTTP_200_OK)
@@ -140,4 +147,69 @@ class NotificacionViewSet(viewsets.ModelViewSet):
         count = Notificacion.limpiar_expiradas()
         return Response({
             'mensaje': f'{count} notificaciones expiradas eliminadas.'
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+        }, status=status.HTTP_200_OK)
+
+
+# Stream SSE (ver realtime.py)
+def _stream_user(request):
+    """Usuario del stream: sesión, o JWT de acceso en ``?token=`` / ``Authorization``.
+
+    `EventSource` no permite cabeceras, por eso el token puede ir en la URL.
+    """
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+    if request.user.is_authenticated:
+        return request.user
+    auth = JWTAuthentication()
+    raw = request.GET.get('token')
+    if not raw:
+        header = auth.get_header(request)
+        raw = auth.get_raw_token(header) if header else None
+    if not raw:
+        return None
+    try:
+        user = auth.get_user(auth.get_validated_token(raw))
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+    return user if user.is_active else None
+
+
+async def notification_stream(request: HttpRequest) -> HttpResponse:
+    """
+    GET /api/v1/notificaciones/stream/ — eventos ``unread`` y ``notification``
+    del usuario autenticado (text/event-stream).
+
+    Bajo WSGI no hay conexiones largas: responde el contador actual y pide al
+    cliente reconectar en un minuto (equivale al polling anterior).
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+    user = await sync_to_async(_stream_user)(request)
+    if user is None:
+        return JsonResponse({'detail': 'Autenticación requerida.'}, status=401)
+
+    if not isinstance(request, ASGIRequest):
+        initial = await sync_to_async(counters.get_counts)(user.pk)
+        body = b'retry: 60000\n' + realtime.format_event('unread', {'sin_leer': initial['sin_leer']})
+        response = HttpResponse(body, content_type='text/event-stream')
+    else:
+        async def events():
+            # Django 4.2 no avisa si el cliente se desconecta: el stream se
+            # corta a los NOTIFICATIONS_SSE_MAX_AGE segundos y EventSource
+            # reconecta solo (``retry``).
+            deadline = time.monotonic() + settings.NOTIFICATIONS_SSE_MAX_AGE
+            subscription = await realtime.subscribe(user.pk)
+            try:
+                initial = await sync_to_async(counters.get_counts)(user.pk)
+                yield b'retry: 5000\n' + realtime.format_event('unread', {'sin_leer': initial['sin_leer']})
+                while time.monotonic() < deadline:
+                    item = await subscription.next_event()
+                    yield b': keep-alive\n\n' if item is None else realtime.format_event(*item)
+            finally:
+                await subscription.close()
+
+        response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,4 +1,6 @@
+from django.apps import apps as django_apps
 from django.contrib import admin
+from django.db import transaction
 from .models.area import Area
 from .models.department import Department
 from .models.news import News
@@ -94,28 +96,42 @@ class ProcedureAdmin(admin.ModelAdmin):
         return obj.deadline.strftime('%d/%m/%Y')
     deadline_display.short_description = _('Fecha límite')
     
+    def _update_state(self, queryset, state):
+        """Cambia el estado en lote manteniendo `occupies_local` de las reservas.
+
+        `update()` no pasa por `LocalReservation.save()`, así que las reservas
+        del lote se sincronizan con `apps.labs.services.sync_occupies_local`.
+        """
+        with transaction.atomic():
+            ids = list(queryset.values_list('pk', flat=True))
+            updated = Procedure.objects.filter(pk__in=ids).update(state=state)
+            if django_apps.is_installed('apps.labs'):
+                from apps.labs.services import sync_occupies_local
+                sync_occupies_local(ids)
+        return updated
+
     @admin.action(description=_('Marcar como enviado'))
     def mark_as_submitted(self, request, queryset):
         """Marca trámites como enviados"""
-        updated = queryset.update(state='ENVIADO')
+        updated = self._update_state(queryset, 'ENVIADO')
         self.message_user(request, _(f'{updated} trámites marcados como enviados.'))
     
     @admin.action(description=_('Marcar como en proceso'))
     def mark_as_in_process(self, request, queryset):
         """Marca trámites como en proceso"""
-        updated = queryset.update(state='EN_PROCESO')
+        updated = self._update_state(queryset, 'EN_PROCESO')
         self.message_user(request, _(f'{updated} trámites marcados como en proceso.'))
     
     @admin.action(description=_('Marcar como aprobado'))
     def mark_as_approved(self, request, queryset):
         """Marca trámites como aprobados"""
-        updated = queryset.update(state='APROBADO')
+        updated = self._update_state(queryset, 'APROBADO')
         self.message_user(request, _(f'{updated} trámites marcados como aprobados.'))
     
     @admin.action(description=_('Marcar como rechazado'))
     def mark_as_rejected(self, request, queryset):
         """Marca trámites como rechazados"""
-        updated = queryset.update(state='RECHAZADO')
+        updated = self._update_state(queryset, 'RECHAZADO')
         self.message_user(request, _(f'{updated} trámites marcados como rechazados.'))
     
     def get_queryset(self, request):
@@ -0,0 +1,102 @@
+"""
+Tests de los endpoints JSON de reportes.
+"""
+from datetime import datetime, time, timedelta
+
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+
+from apps.labs.enums import LocalTypeEnum, ReservationPurposeEnum, ReservationStateEnum
+from apps.labs.models import Local, LocalReservation
+
+
+User = get_user_model()
+
+
+class LocalOccupancyReportTests(APITestCase):
+    """Ocupación por local: una agregación agrupada y tasa sobre horas de apertura."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User(
+            username='admin_occupancy', email='admin_occupancy@example.com',
+            first_name='Reporte', last_name='Ocupación', user_type='ADMIN',
+            id_card='99050534567', is_active=True, is_staff=True,
+        )
+        cls.admin.set_password('pwd12345')
+        cls.admin.save()
+        cls.local = Local.objects.create(
+            name='Lab ocupación', code='TEST-OCC-1',
+            local_type=LocalTypeEnum.LABORATORIO, capacity=30,
+        )
+        Local.objects.create(
+            name='Lab sin uso', code='TEST-OCC-2',
+            local_type=LocalTypeEnum.LABORATORIO, capacity=30,
+        )
+        # Lunes de dentro de dos semanas, 9:00
+        today = timezone.localdate()
+        cls.monday = today + timedelta(days=14 - today.weekday())
+        start = timezone.make_aware(datetime.combine(cls.monday, time(9)))
+        start = timezone.make_aware(datetime.combine(cls.monday, time(9)))
+        sunday_night = timezone.make_aware(datetime.combine(cls.monday + timedelta(days=6), time(20)))
+        # Lunes 9–16, lunes siguiente 9–11 y domingo 20:00 → lunes 4:00 (cruza de semana)
+        for begin, hours in ((start, 7), (start + timedelta(days=7), 2), (sunday_night, 8)):
+            LocalReservation.objects.create(
+                user=cls.admin,
+                local=cls.local,
+                start_time=begin,
+                end_time=begin + timedelta(hours=hours),
+                purpose=ReservationPurposeEnum.CLASE,
+                purpose_detail='Clase',
+                expected_attendees=10,
+                responsible_name='Reporte',
+                responsible_phone='52345683',
+                responsible_email='admin_occupancy@example.com',
+                state=ReservationStateEnum.APROBADA,
+            )
+
+    def _get(self, expected_status=status.HTTP_200_OK, **params):
+        client = APIClient()
+        client.force_authenticate(user=self.admin)
+        resp = client.get('/api/v1/reports/local-occupancy/', params)
+        self.assertEqual(resp.status_code, expected_status)
+        if expected_status != status.HTTP_200_OK:
+            return resp.json()
+        return {row['code']: row for row in resp.json()}
+
+    def test_occupancy_rate_over_open_hours(self):
+        rows = self._get(date_from=self.monday.isoformat(), date_to=self.monday.isoformat())
+        row = rows['TEST-OCC-1']
+        self.assertEqual(row['approved'], 1)
+        self.assertEqual(row['booked_hours'], 7.0)
+        self.assertEqual(row['open_hours'], 14)
+        self.assertEqual(row['occupancy_rate'], 0.5)
+        self.assertEqual(rows['TEST-OCC-2']['occupancy_rate'], 0.0)
+
+    def test_weekly_buckets_clip_each_week(self):
+        rows = self._get(
+            date_from=self.monday.isoformat(),
+            date_to=(self.monday + timedelta(days=13)).isoformat(),
+            bucket='week',
+        )
+        weeks = rows['TEST-OCC-1']['weeks']
+        # La reserva del domingo aporta 4 h a cada semana
+        self.assertEqual([w['booked_hours'] for w in weeks], [11.0, 6.0])
+        self.assertEqual(weeks[0]['open_hours'], 7 * 14)
+        self.assertEqual(rows['TEST-OCC-1']['booked_hours'], 17.0)
+        self.assertEqual(rows['TEST-OCC-1']['total_reservations'], 3)
+
+    def test_without_range_counts_all_time(self):
+        rows = self._get()
+        row = rows['TEST-OCC-1']
+        self.assertEqual(row['total_reservations'], 3)
+        self.assertEqual(row['approved'], 3)
+        self.assertIsNone(row['occupancy_rate'])
+        self.assertNotIn('weeks', row)
+
+    def test_invalid_dates_are_rejected(self):
+        self.assertIn('date_from', self._get(status.HTTP_400_BAD_REQUEST, date_from='2024-02-30')['error'])
+        self._get(status.HTTP_400_BAD_REQUEST, date_from='2024-03-02', date_to='2024-03-01')
+        self._get(status.HTTP_400_BAD_REQUEST, bucket='week')
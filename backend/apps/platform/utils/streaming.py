@@ -0,0 +1,54 @@
+"""
+Respuestas en streaming que no se bufferizan bajo ASGI.
+
+En Django 4.2, un `StreamingHttpResponse` con un iterador síncrono servido
+por ASGI se consume entero con ``sync_to_async(list)`` antes de enviar el
+primer byte (y se registra un warning): los volcados grandes (bitácora,
+feeds .ics) dejarían de usar memoria constante. Al revés, un iterador
+asíncrono bajo WSGI también se lee completo.
+
+`streaming_response` elige según el request: bajo ASGI envuelve el iterador
+en `aiter_sync`, que avanza cada chunk en el hilo síncrono del request
+(``thread_sensitive``), el mismo que tiene abierta la conexión a la BD y los
+cursores de servidor de ``.iterator()``.
+"""
+from __future__ import annotations
+
+from typing import AsyncIterator, Iterable
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+
+_DONE = object()
+
+
+def _next(iterator):
+    return next(iterator, _DONE)
+
+
+async def aiter_sync(iterable: Iterable[bytes]) -> AsyncIterator[bytes]:
+    """Iterador asíncrono sobre ``iterable`` que avanza en el hilo del request."""
+    iterator = iter(iterable)
+    step = sync_to_async(_next, thread_sensitive=True)
+    try:
+        while True:
+            chunk = await step(iterator)
+            if chunk is _DONE:
+                return
+            yield chunk
+    finally:
+        close = getattr(iterator, 'close', None)
+        if close is not None:
+            await sync_to_async(close, thread_sensitive=True)()
+
+
+def streaming_response(request, content: Iterable[bytes], **kwargs) -> StreamingHttpResponse:
+    """`StreamingHttpResponse` con el tipo de iterador que sirve el handler actual.
+
+    ``request`` puede ser un `HttpRequest` o un ``Request`` de DRF.
+    """
+    django_request = getattr(request, '_request', request)
+    if isinstance(django_request, ASGIRequest):
+        content = aiter_sync(content)
+    return StreamingHttpResponse(content, **kwargs)
@@ -3,15 +3,16 @@ Endpoints de reportes y analytics para admin dashboard.
 
 - /api/v1/reports/overview/    → KPIs agregados
 - /api/v1/reports/procedures/  → stats de trámites por estado/tipo/mes
-- /api/v1/reports/locals/      → ocupación por local
+- /api/v1/reports/local-occupancy/ → ocupación por local (rango / semanas)
 - /api/v1/reports/export.xlsx  → export consolidado
 """
 from __future__ import annotations
 
-from datetime import timedelta
+from datetime import datetime, time, timedelta
 
 from django.apps import apps
-from django.db.models import Count
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Q, Sum, Value
+from django.db.models.functions import Greatest, Least
 from django.http import HttpResponse
 from django.utils import timezone
 from rest_framework import permissions
@@ -114,28 +115,167 @@ def procedures_by_month(request):
     return Response(result)
 
 
+# Estados que ocupan efectivamente el local para el cálculo de ocupación
+OCCUPYING_STATES = ('APROBADA', 'EN_CURSO', 'FINALIZADA')
+OCCUPANCY_DEFAULT_DAYS = 30
+# Tope de semanas de ``bucket=week`` (una columna agregada por semana)
+OCCUPANCY_MAX_WEEKS = 106
+
+
+def _parse_date(value: str | None):
+    """Fecha ``YYYY-MM-DD``; ``None`` si falta. ValueError si es inválida."""
+    if not value:
+        return None
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _occupancy_range(params):
+    """Lee ``date_from`` / ``date_to``; retorna ``((date_from, date_to), error_response)``.
+
+    Sin ninguno de los dos el rango es ``None`` (todo el histórico).
+    """
+    dates = {}
+    for param in ('date_from', 'date_to'):
+        try:
+            dates[param] = _parse_date(params.get(param))
+        except ValueError:
+            return None, Response(
+                {'error': f'Formato de {param} inválido. Use YYYY-MM-DD'}, status=400,
+            )
+    date_from, date_to = dates['date_from'], dates['date_to']
+    if date_from is None and date_to is None:
+        return None, None
+    date_to = date_to or timezone.localdate()
+    date_from = date_from or date_to - timedelta(days=OCCUPANCY_DEFAULT_DAYS - 1)
+    if date_from > date_to:
+        return None, Response({'error': 'date_from debe ser anterior o igual a date_to'}, status=400)
+    return (date_from, date_to), None
+
+
+def _daily_open_hours() -> int:
+    """Horas de apertura diarias según `SystemSettings` (7–21 por defecto)."""
+    SystemSettings = _get_model('settings_runtime', 'SystemSettings')
+    if SystemSettings:
+        settings_obj = SystemSettings.load()
+        open_hour, close_hour = settings_obj.reservation_open_hour, settings_obj.reservation_close_hour
+    else:
+        open_hour, close_hour = 7, 21
+    return max(close_hour - open_hour, 0)
+
+
+def _occupancy(booked: timedelta | None, open_hours: float) -> tuple[float, float]:
+    booked_hours = booked.total_seconds() / 3600 if booked else 0.0
+    rate = round(booked_hours / open_hours, 4) if open_hours else 0.0
+    return round(booked_hours, 2), rate
+
+
+def _aware_day(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _booked_between(start, end):
+    """Suma de horas ocupadas recortadas a ``[start, end)``."""
+    return Sum(
+        ExpressionWrapper(
+            Least(F('end_time'), Value(end)) - Greatest(F('start_time'), Value(start)),
+            output_field=DurationField(),
+        ),
+        filter=Q(state__in=OCCUPYING_STATES, start_time__lt=end, end_time__gt=start),
+    )
+
+
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated, permissions.IsAdminUser])
 def local_occupancy(request):
-    """Ocupación por local (conteo de reservas aprobadas/ en curso / finalizadas)."""
+    """Ocupación por local.
+
+    Sin parámetros retorna los conteos de todo el histórico (``booked_hours``,
+    ``open_hours`` y ``occupancy_rate`` en ``null``). Con ``date_from`` /
+    ``date_to`` (YYYY-MM-DD; si falta uno, ``date_to`` es hoy y ``date_from``
+    30 días antes) cuenta las reservas que tocan el rango y calcula la
+    ocupación; ``bucket=week`` la desglosa por semana. Fechas inválidas o
+    invertidas → 400.
+
+    Conteos y horas salen de una sola agregación agrupada por local; las horas
+    se recortan en la BD al rango y, por semana, a cada semana (una reserva
+    que cruza semanas suma en ambas). La tasa es horas reservadas / horas de
+    apertura (`SystemSettings.reservation_open_hour`–`reservation_close_hour`).
+    """
     Local = _get_model('labs', 'Local')
     LocalReservation = _get_model('labs', 'LocalReservation')
     if not (Local and LocalReservation):
         return Response({'detail': 'Módulo labs no disponible.'}, status=404)
 
+    date_range, error = _occupancy_range(request.query_params)
+    if error is not None:
+        return error
+    by_week = request.query_params.get('bucket') == 'week'
+    if by_week and date_range is None:
+        return Response({'error': 'bucket=week requiere date_from o date_to'}, status=400)
+
+    reservations = LocalReservation.objects.filter(local__is_active=True).order_by()
+    aggregates = {
+        'total_reservations': Count('pk'),
+        'approved': Count('pk', filter=Q(state='APROBADA')),
+        'finished': Count('pk', filter=Q(state='FINALIZADA')),
+        'rejected': Count('pk', filter=Q(state='RECHAZADA')),
+    }
+
+    # Semanas como (clave, inicio de semana, primer día, último día) dentro del rango
+    weeks = []
+    if date_range is not None:
+        date_from, date_to = date_range
+        range_start, range_end = _aware_day(date_from), _aware_day(date_to + timedelta(days=1))
+        reservations = reservations.filter(start_time__lt=range_end, end_time__gt=range_start)
+        aggregates['booked'] = _booked_between(range_start, range_end)
+        if by_week:
+            cursor = date_from - timedelta(days=date_from.weekday())
+            while cursor <= date_to:
+                first, last = max(cursor, date_from), min(cursor + timedelta(days=6), date_to)
+                weeks.append((f'week_{len(weeks)}', cursor, first, last))
+                cursor += timedelta(days=7)
+            if len(weeks) > OCCUPANCY_MAX_WEEKS:
+                return Response(
+                    {'error': f'bucket=week admite como máximo {OCCUPANCY_MAX_WEEKS} semanas'}, status=400,
+                )
+            for key, _, first, last in weeks:
+                aggregates[key] = _booked_between(_aware_day(first), _aware_day(last + timedelta(days=1)))
+
+    rows = {row['local_id']: row for row in reservations.values('local_id').annotate(**aggregates)}
+
+    daily_hours = _daily_open_hours()
     data = []
-    for local in Local.objects.filter(is_active=True):
-        reservations = LocalReservation.objects.filter(local=local)
-        data.append({
+    for local in Local.objects.filter(is_active=True).only('id', 'code', 'name', 'capacity').order_by('code'):
+        row = rows.get(local.pk, {})
+        item = {
             'local_id': str(local.pk),
             'code': local.code,
             'name': local.name,
             'capacity': local.capacity,
-            'total_reservations': reservations.count(),
-            'approved': reservations.filter(state='APROBADA').count(),
-            'finished': reservations.filter(state='FINALIZADA').count(),
-            'rejected': reservations.filter(state='RECHAZADA').count(),
-        })
+            'total_reservations': row.get('total_reservations', 0),
+            'approved': row.get('approved', 0),
+            'finished': row.get('finished', 0),
+            'rejected': row.get('rejected', 0),
+            'booked_hours': None,
+            'open_hours': None,
+            'occupancy_rate': None,
+        }
+        if date_range is not None:
+            open_hours = ((date_to - date_from).days + 1) * daily_hours
+            item['booked_hours'], item['occupancy_rate'] = _occupancy(row.get('booked'), open_hours)
+            item['open_hours'] = open_hours
+        if by_week:
+            item['weeks'] = []
+            for key, week_start, first, last in weeks:
+                week_open = ((last - first).days + 1) * daily_hours
+                week_booked, week_rate = _occupancy(row.get(key), week_open)
+                item['weeks'].append({
+                    'week_start': week_start.isoformat(),
+                    'booked_hours': week_booked,
+                    'open_hours': week_open,
+                    'occupancy_rate': week_rate,
+                })
+        data.append(item)
     return Response(data)
 
 
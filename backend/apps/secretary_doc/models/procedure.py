@@ -4,8 +4,10 @@ from apps.platform.models.procedure import Procedure
 from apps.platform.models.user import User
 from model_utils import FieldTracker
 
+from apps.audit.tracking import AuditTrackedMixin
 
-class SecretaryDocProcedure(Procedure):
+
+class SecretaryDocProcedure(AuditTrackedMixin, Procedure):
     """
     Modelo heredado de Procedure para solicitudes de secretaría docente.
     Contiene campos específicos para trámites de secretaría docente.
@@ -155,8 +157,8 @@ class SecretaryDocProcedure(Procedure):
         help_text=_("Último usuario que actualizó el trámite")
     )
     
-    # Rastreador de cambios
-    tracker = FieldTracker(fields=['state'])
+    # Rastreador de cambios (también alimenta los diffs de auditoría)
+    tracker = FieldTracker()
     
     class Meta:
         verbose_name = _("Trámite de Secretaría Docente")
@@ -3,6 +3,8 @@ from django.dispatch import receiver
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
+from apps.audit.services import log_event
+
 # Import models using the correct paths
 from .models import (
     SecretaryDocProcedure as Tramite,
@@ -50,6 +52,36 @@ def documento_post_save(sender, instance, created, **kwargs):
             usuario=instance.subido_por
         )
 
+@receiver(post_save, sender=Tramite)
+def tramite_post_save(sender, instance, created, **kwargs):
+    """
+    Registra en la bitácora la creación y los cambios del trámite.
+    Los valores previos salen del `tracker` del modelo (sin releer la fila).
+    """
+    if created:
+        log_event(
+            action='create',
+            resource=instance,
+            description='Trámite de secretaría docente creado',
+            metadata={'state': instance.state},
+        )
+        return
+
+    changes = instance.audit_changes()
+    if 'state' in changes:
+        log_event(
+            action='state_change',
+            resource=instance,
+            description='Trámite de secretaría docente cambió de estado',
+            metadata={
+                'old_state': changes['state']['old'],
+                'new_state': instance.state,
+                'changes': changes,
+            },
+        )
+    elif changes:
+        instance.log_update_event('Trámite de secretaría docente actualizado')
+
 # Importar las señales al cargar la aplicación
 def ready():
     # Este método se llama cuando la aplicación está lista
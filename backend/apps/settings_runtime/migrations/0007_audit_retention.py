@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-18 08:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('settings_runtime', '0006_uho_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='systemsettings',
+            name='audit_archive_format',
+            field=models.CharField(choices=[('jsonl', 'JSONL comprimido (gzip)'), ('parquet', 'Parquet')], default='jsonl', help_text='Formato de los archivos de bitácora archivada', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='systemsettings',
+            name='audit_hot_days',
+            field=models.PositiveSmallIntegerField(default=90, help_text='Días de bitácora en la tabla principal. En SQLite las entradas más antiguas pasan a tablas mensuales; en PostgreSQL la partición mensual ya aísla este rango.'),
+        ),
+        migrations.AddField(
+            model_name='systemsettings',
+            name='audit_retention_days',
+            field=models.PositiveIntegerField(default=730, help_text='Días que se conserva la bitácora en BD antes de archivarla y eliminarla (0 = conservar indefinidamente)'),
+        ),
+    ]
@@ -64,6 +64,29 @@ class SystemSettings(models.Model):
     signature_enabled = models.BooleanField(default=False)
     qr_verification_enabled = models.BooleanField(default=True)
 
+    # Bitácora de auditoría (ver apps.audit.partitions)
+    audit_hot_days = models.PositiveSmallIntegerField(
+        default=90,
+        help_text=_(
+            'Días de bitácora en la tabla principal. En SQLite las entradas más '
+            'antiguas pasan a tablas mensuales; en PostgreSQL la partición '
+            'mensual ya aísla este rango.'
+        ),
+    )
+    audit_retention_days = models.PositiveIntegerField(
+        default=730,
+        help_text=_(
+            'Días que se conserva la bitácora en BD antes de archivarla y '
+            'eliminarla (0 = conservar indefinidamente)'
+        ),
+    )
+    audit_archive_format = models.CharField(
+        max_length=10,
+        default='jsonl',
+        choices=(('jsonl', 'JSONL comprimido (gzip)'), ('parquet', 'Parquet')),
+        help_text=_('Formato de los archivos de bitácora archivada'),
+    )
+
     # Audit
     updated_at = models.DateTimeField(auto_now=True)
     updated_by = models.ForeignKey(
@@ -3,6 +3,9 @@ ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Producción: ``gunicorn config.asgi:application -k uvicorn.workers.UvicornWorker``
+(ver docs/OPERATIONS.md).
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
@@ -257,6 +257,26 @@ else:
     }
 
 
+# ============================================
+# CACHE
+# ============================================
+# Compartido entre workers: el índice de disponibilidad de locales, las
+# generaciones de calendarios/feeds y la configuración runtime se invalidan
+# desde cualquier proceso. Sin CACHE_URL se usa LocMemCache (un cache por
+# proceso, sólo para desarrollo con un único servidor).
+CACHE_URL = os.getenv('CACHE_URL', '' if DEBUG else 'redis://localhost:6379/2')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+# Índice de intervalos de `Local.is_available` (apps/labs/availability.py):
+# auto = sólo con un cache compartido entre procesos; on / off para forzarlo.
+LABS_INTERVAL_INDEX = os.getenv('LABS_INTERVAL_INDEX', 'auto').strip().lower()
+
+
 # ============================================
 # PASSWORD VALIDATION (endurecida)
 # ============================================
@@ -299,6 +319,10 @@ LOGIN_URL = 'Login'
 # EMAIL
 # ============================================
 EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+# Backend de los lotes de notificaciones (`send_email_batch_task`) cuando
+# EMAIL_BACKEND es el SMTP de Django: reutiliza sesiones entre envíos del
+# worker (ver apps/notifications/mail.py).
+NOTIFICATIONS_EMAIL_BACKEND = os.getenv('NOTIFICATIONS_EMAIL_BACKEND', 'apps.notifications.mail.PooledSMTPBackend')
 EMAIL_HOST = os.getenv('EMAIL_HOST', 'smtp.gmail.com')
 EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
 EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
@@ -306,6 +330,11 @@ EMAIL_PORT = int(os.getenv('EMAIL_PORT', '465'))
 EMAIL_USE_TLS = env_bool('EMAIL_USE_TLS', False)
 EMAIL_USE_SSL = env_bool('EMAIL_USE_SSL', True)
 DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', EMAIL_HOST_USER or 'noreply@uho.edu.cu')
+# Pool de sesiones SMTP por proceso: ociosas por destino, segundos de
+# inactividad y mensajes por sesión antes de reconectar.
+EMAIL_POOL_SIZE = int(os.getenv('EMAIL_POOL_SIZE', '2'))
+EMAIL_POOL_MAX_IDLE = float(os.getenv('EMAIL_POOL_MAX_IDLE', '60'))
+EMAIL_POOL_MAX_MESSAGES = int(os.getenv('EMAIL_POOL_MAX_MESSAGES', '500'))
 ALLOWED_REDIRECT_URLS = ['mailto://']
 
 # En desarrollo, si no hay credenciales SMTP reales, usar console backend
@@ -386,6 +415,58 @@ CELERY_TIMEZONE = TIME_ZONE
 CELERY_TASK_ALWAYS_EAGER = env_bool('CELERY_TASK_ALWAYS_EAGER', DEBUG)
 CELERY_TASK_EAGER_PROPAGATES = True
 
+# Tareas periódicas (celery -A config beat)
+CELERY_BEAT_SCHEDULE = {
+    'labs-advance-reservation-states': {
+        'task': 'labs.advance_reservation_states',
+        'schedule': float(os.getenv('RESERVATION_STATE_INTERVAL_SECONDS', '300')),
+    },
+    'audit-drain-spool': {
+        'task': 'audit.drain_spool',
+        'schedule': float(os.getenv('AUDIT_SPOOL_DRAIN_SECONDS', '60')),
+    },
+    'audit-maintain-storage': {
+        'task': 'audit.maintain_storage',
+        'schedule': float(os.getenv('AUDIT_MAINTENANCE_SECONDS', str(24 * 3600))),
+    },
+    'audit-refresh-rollups': {
+        'task': 'audit.refresh_rollups',
+        'schedule': float(os.getenv('AUDIT_ROLLUP_SECONDS', '300')),
+    },
+}
+
+
+# ============================================
+# NOTIFICACIONES EN TIEMPO REAL (SSE)
+# ============================================
+# Pub/sub de Redis compartido entre workers ASGI y Celery (ver
+# apps/notifications/realtime.py). Vacío = colas dentro del proceso, sólo
+# sirve en desarrollo con un único servidor.
+NOTIFICATIONS_PUBSUB_URL = os.getenv('NOTIFICATIONS_PUBSUB_URL', '' if DEBUG else CELERY_BROKER_URL)
+# Segundos entre comentarios keep-alive del stream
+NOTIFICATIONS_SSE_HEARTBEAT = float(os.getenv('NOTIFICATIONS_SSE_HEARTBEAT', '20'))
+# Duración máxima de un stream (el cliente reconecta): acota los streams de
+# clientes desconectados, que Django 4.2 no detecta.
+NOTIFICATIONS_SSE_MAX_AGE = float(os.getenv('NOTIFICATIONS_SSE_MAX_AGE', '300'))
+
+# ============================================
+# AUDITORÍA
+# ============================================
+# buffered | celery | spool | sync (ver apps/audit/writer.py)
+AUDIT_WRITE_MODE = os.getenv('AUDIT_WRITE_MODE', 'buffered')
+AUDIT_SPOOL_PATH = os.getenv('AUDIT_SPOOL_PATH') or str(BASE_DIR / 'logs' / 'audit-spool.jsonl')
+# SQLite: rotar a tablas mensuales a los `audit_hot_days` días. Las entradas
+# rotadas dejan de verse en el admin, la API y la exportación; por defecto
+# sólo se rotan al vencer la retención (ver apps/audit/partitions.py).
+AUDIT_SQLITE_ROTATION = env_bool('AUDIT_SQLITE_ROTATION', False)
+# Destino de los meses archivados por retención (ver apps/audit/partitions.py)
+AUDIT_ARCHIVE_DIR = os.getenv('AUDIT_ARCHIVE_DIR') or str(BASE_DIR / 'backups' / 'audit')
+# Horas que recalcula cada ejecución de audit.refresh_rollups (ver apps/audit/rollups.py)
+AUDIT_ROLLUP_LOOKBACK_HOURS = int(os.getenv('AUDIT_ROLLUP_LOOKBACK_HOURS', '3'))
+# Agregación de logins fallidos por (username, IP) (ver apps/audit/login_failures.py)
+AUDIT_LOGIN_FAILURE_WINDOW = float(os.getenv('AUDIT_LOGIN_FAILURE_WINDOW', '60'))
+AUDIT_LOGIN_FAILURE_MAX_SPAN = float(os.getenv('AUDIT_LOGIN_FAILURE_MAX_SPAN', '600'))
+
 
 # ============================================
 # DBBACKUP
@@ -1,7 +1,7 @@
 /**
  * Campanita de notificaciones (para navbar).
  *
- * Usa el hook compartido `useNotificationsPoll` (polling único cada 2 minutos).
+ * Usa el hook compartido `useNotificationsPoll` (stream SSE, con polling de respaldo).
  * Muestra el contador y un dropdown con las últimas 5 notificaciones.
  */
 import { useState } from 'react';
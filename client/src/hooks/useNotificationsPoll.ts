@@ -1,9 +1,14 @@
 /**
- * Hook único de polling de notificaciones.
+ * Hook único de notificaciones (contador + recientes).
  *
  * Antes existían dos intervalos paralelos (uno en `NotificationBell` y otro en `Navbar`),
  * ambos consultando el mismo endpoint cada 60s. Esto consolida los datos en un único
- * polling cada 120s y los expone vía un contexto ligero (módulo singleton + listeners).
+ * origen y los expone vía un contexto ligero (módulo singleton + listeners).
+ *
+ * Los cambios llegan por Server-Sent Events (`/notificaciones/stream/`): una carga
+ * inicial y después sólo eventos. Si el stream no está disponible (sin EventSource,
+ * token vencido, servidor WSGI) se vuelve al polling cada 120s y en cada vuelta se
+ * reintenta abrir el stream.
  */
 import { useEffect, useState } from 'react';
 import { notificationsService } from '../services/notifications.service';
@@ -21,6 +26,7 @@ type State = {
 const listeners = new Set<(s: State) => void>();
 let state: State = { recent: [], unreadCount: 0, loading: false };
 let intervalId: ReturnType<typeof setInterval> | null = null;
+let source: EventSource | null = null;
 let refCount = 0;
 
 function setState(next: Partial<State>) {
@@ -47,13 +53,58 @@ async function fetchOnce() {
   }
 }
 
-function start() {
+function openStream() {
+  const token = localStorage.getItem('access_token');
+  if (source || !token || typeof EventSource === 'undefined') return;
+  const es = new EventSource(notificationsService.streamUrl(token));
+  source = es;
+
+  es.addEventListener('unread', (e) => {
+    const { sin_leer } = JSON.parse((e as MessageEvent).data) as { sin_leer: number };
+    setState({ unreadCount: sin_leer });
+  });
+  es.addEventListener('notification', (e) => {
+    const n = JSON.parse((e as MessageEvent).data) as Notificacion;
+    setState({ recent: [n, ...state.recent.filter((r) => r.id !== n.id)].slice(0, MAX_RECENT) });
+  });
+  es.onopen = () => {
+    // Stream activo: el polling sobra
+    if (intervalId) {
+      clearInterval(intervalId);
+      intervalId = null;
+    }
+  };
+  es.onerror = () => {
+    // EventSource reconecta solo; si lo cerró (401, sin ASGI) volvemos al polling
+    if (es.readyState === EventSource.CLOSED) {
+      closeStream();
+      startPolling();
+    }
+  };
+}
+
+function closeStream() {
+  source?.close();
+  source = null;
+}
+
+function startPolling() {
   if (intervalId) return;
+  intervalId = setInterval(() => {
+    void fetchOnce();
+    openStream();
+  }, POLL_MS);
+}
+
+function start() {
+  if (source || intervalId) return;
   void fetchOnce();
-  intervalId = setInterval(() => void fetchOnce(), POLL_MS);
+  openStream();
+  if (!source) startPolling();
 }
 
 function stop() {
+  closeStream();
   if (intervalId) {
     clearInterval(intervalId);
     intervalId = null;
@@ -61,8 +112,8 @@ function stop() {
 }
 
 /**
- * Suscribe el componente al estado compartido del polling.
- * El intervalo se inicia con el primer subscriber y se detiene al irse el último.
+ * Suscribe el componente al estado compartido.
+ * El stream (o el polling) se inicia con el primer subscriber y se detiene al irse el último.
  */
 export function useNotificationsPoll() {
   const [snapshot, setSnapshot] = useState<State>(state);
@@ -16,30 +16,75 @@ export interface AuditLogEntry {
   created_at: string;
 }
 
+/** Página por cursor: seguir `next` / `previous`; `count` sólo con `count: 'approx'`. */
 export interface AuditLogList {
-  count: number;
   next: string | null;
   previous: string | null;
+  count?: number;
+  count_is_estimate?: boolean;
   results: AuditLogEntry[];
 }
 
+export type AuditSeriesInterval = 'hour' | 'day' | 'week' | 'month';
+export type AuditSeriesGroupBy = 'action' | 'resource_type' | 'user_type' | 'module';
+
+export interface AuditSeries {
+  key: string;
+  total: number;
+  points: { bucket: string; count: number }[];
+}
+
+export interface AuditTimeseries {
+  interval: AuditSeriesInterval;
+  group_by: AuditSeriesGroupBy;
+  date_from: string;
+  date_to: string;
+  series: AuditSeries[];
+}
+
 export const auditService = {
   async list(params?: {
-    page?: number;
+    cursor?: string;
     page_size?: number;
+    count?: 'approx';
     action?: string;
     user?: number;
     resource_type?: string;
     resource_id?: string;
     date_from?: string;
     date_to?: string;
+    /** Texto libre en descripción y metadatos */
+    q?: string;
+    /** Objeto JSON serializado: entradas cuyo metadata lo contiene */
+    metadata?: string;
   }): Promise<AuditLogList> {
     const { data } = await apiClient.get<AuditLogList>('/audit/logs/', { params });
     return data;
   },
 
-  async resourceHistory(appLabel: string, model: string, pk: string): Promise<AuditLogEntry[]> {
-    const { data } = await apiClient.get<AuditLogEntry[]>(
+  /** Series de actividad desde los resúmenes horarios (tableros). */
+  async timeseries(params?: {
+    interval?: AuditSeriesInterval;
+    group_by?: AuditSeriesGroupBy;
+    date_from?: string;
+    date_to?: string;
+    action?: string;
+    resource_type?: string;
+    user_type?: string;
+  }): Promise<AuditTimeseries> {
+    const { data } = await apiClient.get<AuditTimeseries>('/audit/logs/timeseries/', { params });
+    return data;
+  },
+
+  /** Sigue un link `next` / `previous` de una página anterior. */
+  async page(url: string): Promise<AuditLogList> {
+    const { data } = await apiClient.get<AuditLogList>(url);
+    return data;
+  },
+
+  /** Primera página del historial de un recurso; seguir `next` con `page()`. */
+  async resourceHistory(appLabel: string, model: string, pk: string): Promise<AuditLogList> {
+    const { data } = await apiClient.get<AuditLogList>(
       `/audit/logs/resource/${appLabel}/${model}/${pk}/`,
     );
     return data;
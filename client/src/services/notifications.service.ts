@@ -32,4 +32,13 @@ export const notificationsService = {
   async markAllAsRead(): Promise<void> {
     await apiClient.post(`${BASE_URL}/marcar_todas_leidas/`);
   },
+
+  /**
+   * URL del stream SSE. `EventSource` no envía cabeceras: el token de acceso
+   * va como query param.
+   */
+  streamUrl(token: string): string {
+    const baseUrl = (import.meta as unknown as { env: Record<string, string> }).env?.VITE_API_URL || '/api/v1';
+    return `${baseUrl}${BASE_URL}/stream/?token=${encodeURIComponent(token)}`;
+  },
 };
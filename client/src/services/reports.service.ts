@@ -34,6 +34,16 @@ export interface LocalOccupancyRow {
   approved: number;
   finished: number;
   rejected: number;
+  // null sin date_from / date_to (conteos de todo el histórico)
+  booked_hours: number | null;
+  open_hours: number | null;
+  occupancy_rate: number | null;
+  weeks?: {
+    week_start: string;
+    booked_hours: number;
+    open_hours: number;
+    occupancy_rate: number;
+  }[];
 }
 
 export type ReportFilters = {
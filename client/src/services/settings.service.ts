@@ -35,6 +35,9 @@ export interface FullSystemSettings extends PublicSystemSettings {
   reservation_advance_days: number;
   signature_enabled: boolean;
   qr_verification_enabled: boolean;
+  audit_hot_days: number;
+  audit_retention_days: number;
+  audit_archive_format: 'jsonl' | 'parquet';
   updated_at: string;
   updated_by: number | null;
 }